@@ -18,6 +18,41 @@ def create_app(config_name=None):
     # Load config
     app.config.from_object(get_config(config_name))
 
+    # Configure the process-wide market data caches
+    from app.services import data_service
+    provider = app.config['DATA_PROVIDER']
+    provider_options = {
+        'local': {'root': app.config['DATA_LOCAL_DIR']},
+        'synthetic': {'seed': app.config['DATA_SYNTHETIC_SEED']},
+    }.get(provider, {})
+    data_service.configure(
+        memory_cache_bytes=app.config['DATA_MEMORY_CACHE_MB'] * 1024 * 1024,
+        use_mmap=app.config['DATA_MMAP_CACHE'],
+        provider=provider,
+        provider_options=provider_options,
+        intraday_base=app.config['DATA_INTRADAY_BASE'],
+        compact_dtypes=app.config['DATA_COMPACT_DTYPES'],
+        refresh_ttl=app.config['DATA_CACHE_TTL_HOURS'] * 3600,
+        refresh_days=app.config['DATA_CACHE_REFRESH_DAYS'],
+        disk_cache_bytes=app.config['DATA_CACHE_MAX_MB'] * 1024 * 1024
+    )
+
+    # Size and limit the strategy sandbox (its worker pool starts on first use)
+    from app.utils import sandbox
+    sandbox.configure(
+        workers=app.config['SANDBOX_WORKERS'],
+        max_tasks=app.config['SANDBOX_MAX_TASKS_PER_WORKER'],
+        shared_memory_bytes=app.config['SANDBOX_SHARED_MEMORY_MB'] * 1024 * 1024,
+        indicator_cache_bytes=app.config['SANDBOX_INDICATOR_CACHE_MB'] * 1024 * 1024,
+        fast_indicators=app.config['SANDBOX_FAST_INDICATORS'],
+        timeout_seconds=app.config['CODE_TIMEOUT_SECONDS'],
+        cpu_seconds=app.config['SANDBOX_CPU_SECONDS'],
+        memory_bytes=app.config['SANDBOX_MEMORY_MB'] * 1024 * 1024,
+        trace_allocations=app.config['SANDBOX_TRACE_ALLOCATIONS'],
+        max_estimated_seconds=app.config['SANDBOX_MAX_ESTIMATED_SECONDS'],
+        jit_loops=app.config['SANDBOX_JIT_LOOPS']
+    )
+
     # Enable CORS for API routes
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
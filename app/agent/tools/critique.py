@@ -2,7 +2,8 @@
 Critique strategy tool for evaluating draft strategies.
 
 Uses the LLM to evaluate a draft strategy against a quality
-rubric and determine if refinement is needed.
+rubric and determine if refinement is needed. The draft's code is also
+checked statically for row-wise Python that would make backtests slow.
 """
 
 import json
@@ -21,6 +22,13 @@ from app.agent.types import (
     LLMCall,
 )
 from app.agent.prompts import get_critique_prompt
+from app.utils.code_cost import analyze_cost
+
+
+# Bars the code cost is judged on (about a year of 5m bars), and the
+# estimated run time above which the code must be vectorized
+COST_REVIEW_BARS = 20000
+COST_REVIEW_MAX_SECONDS = 1.0
 
 
 class CritiqueTool(BaseTool):
@@ -28,7 +36,8 @@ class CritiqueTool(BaseTool):
     Evaluate a draft strategy against quality criteria.
 
     Uses LLM to assess whether the strategy meets quality
-    standards or needs refinement.
+    standards or needs refinement, and adds a VECTORIZED criterion
+    from the static cost analysis of the draft's code.
     """
 
     def __init__(self, anthropic_client: anthropic.Anthropic, model: str = 'claude-sonnet-4-20250514'):
@@ -120,7 +129,8 @@ class CritiqueTool(BaseTool):
         )
 
         # Parse response
-        return self._parse_response(raw_text, iteration)
+        result = self._parse_response(raw_text, iteration)
+        return self._review_cost(result, draft_strategy)
 
     def _parse_response(self, raw_text: str, iteration: int) -> CritiqueResult:
         """
@@ -179,3 +189,59 @@ class CritiqueTool(BaseTool):
             refinement_instructions=data.get('refinement_instructions'),
             iteration=iteration
         )
+
+    def _review_cost(self, result: CritiqueResult, draft_strategy: DraftStrategy) -> CritiqueResult:
+        """
+        Add the static cost analysis of the draft's code to the critique.
+
+        Row-wise code estimated to take longer than COST_REVIEW_MAX_SECONDS
+        on COST_REVIEW_BARS bars fails the critique, so it gets refined;
+        cheaper findings are noted as PARTIAL.
+
+        Args:
+            result: Critique parsed from the LLM response.
+            draft_strategy: Strategy whose code is analyzed.
+
+        Returns:
+            The critique with a VECTORIZED evaluation added.
+        """
+        if not draft_strategy.code:
+            return result
+
+        try:
+            report = analyze_cost(draft_strategy.code)
+        except SyntaxError:
+            # Left to the sandbox, which reports it when the code runs
+            return result
+
+        if not report:
+            result.evaluations['VECTORIZED'] = CritiqueEvaluation(
+                criterion='VECTORIZED',
+                status=CritiqueStatus.PASS,
+                notes='No row-wise loops, scalar writes or apply lambdas'
+            )
+            return result
+
+        estimate = report.estimate_seconds(COST_REVIEW_BARS)
+        warnings = report.warnings(COST_REVIEW_BARS)
+        notes = "; ".join(f"line {w['line']} `{w['code']}`: {w['message']}" for w in warnings[:5])
+        if len(warnings) > 5:
+            notes += f" (and {len(warnings) - 5} more)"
+        notes = f"Estimated {estimate:.1f}s of row-wise Python on {COST_REVIEW_BARS} bars. {notes}"
+
+        too_slow = estimate > COST_REVIEW_MAX_SECONDS
+        result.evaluations['VECTORIZED'] = CritiqueEvaluation(
+            criterion='VECTORIZED',
+            status=CritiqueStatus.FAIL if too_slow else CritiqueStatus.PARTIAL,
+            notes=notes
+        )
+
+        if too_slow:
+            suggestions = list(dict.fromkeys(w['suggestion'] for w in warnings))
+            instructions = f"Vectorize the code. {notes} " + " ".join(f"{s}." for s in suggestions)
+            result.overall_pass = False
+            result.refinement_instructions = "\n".join(
+                part for part in (result.refinement_instructions, instructions) if part
+            )
+
+        return result
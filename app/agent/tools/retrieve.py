@@ -16,11 +16,11 @@ class RetrieveTool(BaseTool):
     """
     Search the knowledge base for relevant documents.
 
-    Supports filtering by category (indicators, price_action)
+    Supports filtering by category (indicators, price_action, helpers)
     and returns structured RetrievedDocument objects.
     """
 
-    VALID_CATEGORIES = ['indicators', 'price_action', 'all']
+    VALID_CATEGORIES = ['indicators', 'price_action', 'helpers', 'all']
 
     def __init__(self, rag_service: RAGService):
         """
@@ -35,7 +35,7 @@ class RetrieveTool(BaseTool):
     def schema(self) -> ToolSchema:
         return ToolSchema(
             name='retrieve',
-            description='Search the knowledge base for relevant documents about indicators or price action concepts',
+            description='Search the knowledge base for relevant documents about indicators, price action concepts or strategy helpers',
             parameters={
                 'query': {
                     'type': 'string',
@@ -69,7 +69,7 @@ class RetrieveTool(BaseTool):
 
         Args:
             query: Search query string.
-            category: Category filter (indicators, price_action, all).
+            category: Category filter (indicators, price_action, helpers, all).
             top_k: Maximum documents to return.
 
         Returns:
@@ -22,6 +22,28 @@ class BaseConfig:
     # Backtest settings
     CODE_TIMEOUT_SECONDS = 10
     MAX_BACKTEST_YEARS = 10
+    SANDBOX_WORKERS = int(os.getenv('SANDBOX_WORKERS', '0'))  # strategy worker processes (0 = one per CPU)
+    SANDBOX_MAX_TASKS_PER_WORKER = int(os.getenv('SANDBOX_MAX_TASKS_PER_WORKER', '200'))
+    SANDBOX_SHARED_MEMORY_MB = int(os.getenv('SANDBOX_SHARED_MEMORY_MB', '512'))  # frames shared with workers
+    SANDBOX_INDICATOR_CACHE_MB = int(os.getenv('SANDBOX_INDICATOR_CACHE_MB', '128'))  # memoized pandas-ta results per worker
+    SANDBOX_FAST_INDICATORS = os.getenv('SANDBOX_FAST_INDICATORS', '1') == '1'  # NumPy versions of common indicators
+    SANDBOX_CPU_SECONDS = float(os.getenv('SANDBOX_CPU_SECONDS', '0'))  # CPU time per run (0 = CODE_TIMEOUT_SECONDS)
+    SANDBOX_MEMORY_MB = int(os.getenv('SANDBOX_MEMORY_MB', '2048'))  # memory a run may allocate (0 = unlimited)
+    SANDBOX_TRACE_ALLOCATIONS = os.getenv('SANDBOX_TRACE_ALLOCATIONS', '1') == '1'  # report allocations (tracemalloc)
+    SANDBOX_MAX_ESTIMATED_SECONDS = float(os.getenv('SANDBOX_MAX_ESTIMATED_SECONDS', '0'))  # reject slow row-wise code up front (0 = never)
+    SANDBOX_JIT_LOOPS = os.getenv('SANDBOX_JIT_LOOPS', '0') == '1'  # compile row loops over NumPy arrays (needs numba)
+
+    # Market data settings
+    DATA_MEMORY_CACHE_MB = int(os.getenv('DATA_MEMORY_CACHE_MB', '256'))
+    DATA_MMAP_CACHE = os.getenv('DATA_MMAP_CACHE', '1') == '1'
+    DATA_PROVIDER = os.getenv('DATA_PROVIDER', 'yahoo')  # yahoo, local, synthetic
+    DATA_LOCAL_DIR = os.getenv('DATA_LOCAL_DIR', 'data/local')
+    DATA_SYNTHETIC_SEED = int(os.getenv('DATA_SYNTHETIC_SEED', '42'))
+    DATA_INTRADAY_BASE = os.getenv('DATA_INTRADAY_BASE', '5m')  # coarser intraday bars are resampled from it
+    DATA_COMPACT_DTYPES = os.getenv('DATA_COMPACT_DTYPES', '1') == '1'  # float32 prices / int32 volume in memory
+    DATA_CACHE_TTL_HOURS = float(os.getenv('DATA_CACHE_TTL_HOURS', '12'))  # re-fetch recent bars after this (0 = never)
+    DATA_CACHE_REFRESH_DAYS = int(os.getenv('DATA_CACHE_REFRESH_DAYS', '5'))
+    DATA_CACHE_MAX_MB = int(os.getenv('DATA_CACHE_MAX_MB', '2048'))  # disk budget per provider (0 = unbounded)
 
 class DevelopmentConfig(BaseConfig):
     DEBUG = True
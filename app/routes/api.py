@@ -4,6 +4,8 @@ from pathlib import Path
 from flask import Blueprint, jsonify, request, current_app
 from app.services.llm_service import LLMService
 from app.services.backtest_service import BacktestService
+from app.services.intervals import INTERVAL_MINUTES
+from app.utils.costs import parse_costs
 from app.agent.orchestrator import create_agent
 from app.agent.tracer import AgentTracer
 from datetime import datetime
@@ -153,8 +155,21 @@ def run_backtest():
   """
   Run backtest on strategy code.
 
-  Request: {"code": "def strategy(df):...", "ticker": "SPY", "start": "2020-01-01", "end": "2024-01-01"}
-  Response: {"success": true, "metrics": {...}, "equity_curve": [...], "error": null}
+  Request: {"code": "def strategy(df):...", "ticker": "SPY", "start": "2020-01-01", "end": "2024-01-01",
+            "interval": "1d", "costs": {"commission_bps": 1, "slippage_bps": 2, "spread_bps": 1,
+            "borrow_rate": 0.03}, "rolling_window": 63}
+           (interval is optional, e.g. "5m", "1h", "1wk"; costs is optional, see app.utils.costs
+            for every setting; without it fills are frictionless at the close; rolling_window is
+            optional, the bars in each window of the rolling metrics, a quarter year by default)
+  Response: {"success": true, "metrics": {...}, "equity_curve": [...], "trade_metrics": {...},
+             "trades": {"entry_index": [...], "exit_index": [...], "side": [...], "return": [...], ...},
+             "rolling": {"window": 63, "points": [{"date": ..., "sharpe_ratio": ..., "volatility": ...,
+                         "max_drawdown": ..., "win_rate": ...}, ...]},
+             "error": null,
+             "trace": {"data_seconds": ..., "execution": {"wall_seconds": ..., "cpu_seconds": ...,
+                       "peak_rss_bytes": ..., "alloc_peak_bytes": ...},
+                       "cost": {"estimated_seconds": ..., "warnings": [{"kind": "row_loop", "line": ...,
+                                "message": ..., "suggestion": ..., ...}]}, "metrics_seconds": ...}}
   """
   data = request.get_json()
 
@@ -198,13 +213,46 @@ def run_backtest():
           'error': f'Invalid date format: {e}'
       }), 400
 
+  try:
+      costs = parse_costs(data.get('costs'))
+  except ValueError as e:
+      return jsonify({
+          'success': False,
+          'metrics': None,
+          'equity_curve': None,
+          'error': str(e)
+      }), 400
+
+  interval = data.get('interval', '1d')
+  if not isinstance(interval, str) or interval not in INTERVAL_MINUTES:
+      return jsonify({
+          'success': False,
+          'metrics': None,
+          'equity_curve': None,
+          'error': f"interval must be one of: {', '.join(INTERVAL_MINUTES)}"
+      }), 400
+
+  rolling_window = data.get('rolling_window')
+  if rolling_window is not None and (
+      isinstance(rolling_window, bool) or not isinstance(rolling_window, int) or rolling_window < 2
+  ):
+      return jsonify({
+          'success': False,
+          'metrics': None,
+          'equity_curve': None,
+          'error': 'rolling_window must be an integer of at least 2 bars'
+      }), 400
+
   # Run backtest
   backtest = BacktestService()
   result = backtest.run_backtest(
       code=data['code'],
       ticker=data['ticker'].upper(),
       start=data['start'],
-      end=data['end']
+      end=data['end'],
+      interval=interval,
+      costs=costs,
+      rolling_window=rolling_window
   )
 
   return jsonify(result)
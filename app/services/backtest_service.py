@@ -1,15 +1,20 @@
 """Service for running backtests on generated strategies."""
 
+import time
+
 from app.services.data_service import DataService
+from app.services.intervals import periods_per_year
 from app.utils.sandbox import execute_strategy
-from app.utils.metrics import calculate_metrics, calculate_equity_curve
+from app.utils.metrics import calculate_performance, bar_date_format
+from app.utils.trades import trade_ledger, trade_metrics, ledger_columns
+from app.utils.rolling_metrics import rolling_metrics, rolling_points, default_window
 
 
 class BacktestService:
   def __init__(self):
       self.data_service = DataService()
 
-  def run_backtest(self, code, ticker, start, end):
+  def run_backtest(self, code, ticker, start, end, interval='1d', costs=None, rolling_window=None):
       """
       Run a backtest on generated strategy code.
 
@@ -18,51 +23,80 @@ class BacktestService:
           ticker: Stock symbol
           start: Start date 'YYYY-MM-DD'
           end: End date 'YYYY-MM-DD'
+          interval: Bar interval ('5m', '1h', '1d', '1wk', ...)
+          costs: Trading cost settings from app.utils.costs.parse_costs
+              (commission, slippage, spread, borrow, financing); None
+              for frictionless fills at the close
+          rolling_window: Bars in each window of the rolling metrics
+              (default: a quarter of a year of bars)
 
       Returns:
-          dict with: success, metrics, equity_curve, error
+          dict with: success, metrics, equity_curve, trade_metrics, trades
+          (the trade ledger as columns), rolling (rolling Sharpe ratio,
+          volatility, max drawdown and win rate points), error, trace (seconds
+          spent per step, the sandbox run's resource usage, and the static
+          cost estimate and warnings for the strategy code)
       """
+      trace = {}
+
       # Fetch market data
-      data_result = self.data_service.get_data(ticker, start, end)
+      step_start = time.perf_counter()
+      data_result = self.data_service.get_data(ticker, start, end, interval=interval)
+      trace['data_seconds'] = _elapsed(step_start)
 
       if not data_result['success']:
           return {
               'success': False,
               'metrics': None,
               'equity_curve': None,
-              'error': f"Data error: {data_result['error']}"
+              'error': f"Data error: {data_result['error']}",
+              'trace': trace
           }
 
       df = data_result['data']
 
       # Execute strategy in sandbox
       exec_result = execute_strategy(code, df)
+      trace['execution'] = exec_result['resources']
+      trace['cost'] = exec_result['cost']
 
       if not exec_result['success']:
           return {
               'success': False,
               'metrics': None,
               'equity_curve': None,
-              'error': f"Execution error: {exec_result['error']}"
+              'error': f"Execution error: {exec_result['error']}",
+              'trace': trace
           }
 
       signals = exec_result['signals']
 
       # Calculate metrics
       try:
-          metrics = calculate_metrics(df, signals)
-          equity_curve = calculate_equity_curve(df, signals)
+          step_start = time.perf_counter()
+          periods = periods_per_year(interval)
+          metrics, equity_curve = calculate_performance(df, signals, periods, costs)
+          ledger = trade_ledger(df, signals, costs, periods)
+          window = rolling_window or default_window(periods)
+          rolling = rolling_metrics(df, signals, window, periods, costs)
+          date_format = bar_date_format(df.index)
+          trace['metrics_seconds'] = _elapsed(step_start)
 
           return {
               'success': True,
               'metrics': metrics,
               'equity_curve': equity_curve,
+              'trade_metrics': trade_metrics(ledger),
+              'trades': ledger_columns(ledger),
+              'rolling': {'window': window, 'points': rolling_points(rolling)},
               'error': None,
               'data_points': len(df),
+              'interval': interval,
               'date_range': {
-                  'start': df.index[0].strftime('%Y-%m-%d'),
-                  'end': df.index[-1].strftime('%Y-%m-%d')
-              }
+                  'start': df.index[0].strftime(date_format),
+                  'end': df.index[-1].strftime(date_format)
+              },
+              'trace': trace
           }
 
       except Exception as e:
@@ -70,5 +104,10 @@ class BacktestService:
               'success': False,
               'metrics': None,
               'equity_curve': None,
-              'error': f"Metrics error: {str(e)}"
-          }
\ No newline at end of file
+              'error': f"Metrics error: {str(e)}",
+              'trace': trace
+          }
+
+
+def _elapsed(start):
+  return round(time.perf_counter() - start, 6)
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""Columnar on-disk store for cached OHLCV bars."""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.services.cache_manifest import manifest_for
+
+
+METADATA_KEY = b'strategy_builder'
+LEGACY_CSV_PATTERN = r'^{ticker}_(\d{{4}}-\d{{2}}-\d{{2}})_(\d{{4}}-\d{{2}}-\d{{2}})\.csv$'
+
+# One lock per dataset file so read-merge-write cycles in this process
+# don't overwrite each other
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+  with _path_locks_guard:
+      return _path_locks.setdefault(str(path), threading.Lock())
+
+
+class BarStore:
+  """
+  One Parquet dataset per ticker/interval.
+
+  Each file holds the full cached history for a ticker plus the list of
+  date ranges that have actually been fetched (``coverage``). Ranges are
+  half-open ``[start, end)`` to match yfinance's ``end`` semantics, and
+  are kept in the file's schema metadata so a read never needs to parse
+  dates or scan the bars to know what is cached.
+
+  Every write is also recorded in the directory's manifest (see
+  ``cache_manifest``), which drives TTL refresh and disk-budget eviction.
+  """
+
+  def __init__(self, root):
+      self.root = Path(root)
+      self.root.mkdir(parents=True, exist_ok=True)
+      self.manifest = manifest_for(self.root)
+
+  def path_for(self, ticker, interval='1d'):
+      return self.root / f"{ticker}_{interval}.parquet"
+
+  def read(self, ticker, interval='1d'):
+      """
+      Load the cached history for a ticker.
+
+      Returns:
+          (DataFrame, coverage) or (None, []) if nothing is cached
+      """
+      path = self.path_for(ticker, interval)
+      if not path.exists():
+          return None, []
+
+      table = pq.read_table(path)
+      meta = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b'{}'))
+      coverage = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in meta.get('coverage', [])]
+
+      return table.to_pandas(), coverage
+
+  def write(self, ticker, df, coverage, interval='1d', refreshed=True):
+      """
+      Replace the cached history for a ticker.
+
+      Args:
+          refreshed: Whether the newest bars in ``df`` were just fetched
+              (False when only older ranges were added)
+      """
+      table = pa.Table.from_pandas(df, preserve_index=True)
+      meta = dict(table.schema.metadata or {})
+      meta[METADATA_KEY] = json.dumps({
+          'interval': interval,
+          'coverage': [[s.isoformat(), e.isoformat()] for s, e in coverage],
+      }).encode()
+
+      # Write then rename, so concurrent readers see the old or the new
+      # file but never a partially written one
+      path = self.path_for(ticker, interval)
+      tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:12]}.tmp")
+      try:
+          pq.write_table(table.replace_schema_metadata(meta), tmp)
+          os.replace(tmp, path)
+      finally:
+          if tmp.exists():
+              tmp.unlink()
+
+      self.manifest.record(ticker, interval, path.name, coverage, path.stat().st_size, refreshed)
+
+  def merge(self, ticker, df, ranges, interval='1d'):
+      """
+      Merge freshly fetched bars covering ``ranges`` into the store.
+
+      Args:
+          df: Normalized bars (may be empty if the ranges had no trading)
+          ranges: List of ``(start, end)`` pairs the fetch covered
+
+      Returns:
+          (DataFrame, coverage) after the merge
+      """
+      with _lock_for(self.path_for(ticker, interval)):
+          cached, coverage = self.read(ticker, interval)
+
+          if cached is not None and len(cached):
+              # New bars win over cached ones for the same timestamp
+              df = pd.concat([cached, df]) if len(df) else cached
+              df = df[~df.index.duplicated(keep='last')].sort_index()
+
+          ranges = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in ranges]
+          coverage = merge_ranges(coverage + ranges)
+          refreshed = bool(ranges) and max(e for _, e in ranges) >= coverage[-1][1]
+          self.write(ticker, df, coverage, interval, refreshed)
+
+      return df, coverage
+
+  def touch(self, ticker, interval='1d'):
+      """Mark a dataset as used, for LRU eviction."""
+      self.manifest.touch(ticker, interval)
+
+  def remove(self, ticker, interval='1d'):
+      """Delete a dataset and its manifest entry."""
+      path = self.path_for(ticker, interval)
+      with _lock_for(path):
+          path.unlink(missing_ok=True)
+          self.manifest.remove(ticker, interval)
+
+  def evict(self, max_bytes=None, max_idle=None, tickers=None, keep=(), dry_run=False, remove_all=False):
+      """
+      Delete datasets, least recently used first.
+
+      Args:
+          max_bytes: Remove datasets until the directory fits this budget
+          max_idle: Also remove datasets not used for this many seconds
+          tickers: Only consider these tickers
+          keep: (ticker, interval) pairs never to remove
+          dry_run: Only report what would be removed
+          remove_all: Remove every (matching) dataset; takes no limits
+
+      Returns:
+          List of removed (ticker, interval) pairs
+
+      Raises:
+          ValueError: If neither a limit nor remove_all is given, or both are
+      """
+      limited = max_bytes is not None or max_idle is not None
+      if limited == bool(remove_all):
+          raise ValueError('give max_bytes and/or max_idle, or remove_all=True')
+
+      entries = [
+          e for e in self.manifest.entries()
+          if (tickers is None or e['ticker'] in tickers) and (e['ticker'], e['interval']) not in keep
+      ]
+      total = self.manifest.total_bytes()
+      idle_before = time.time() - max_idle if max_idle is not None else None
+
+      removed = []
+      for entry in entries:
+          over_budget = max_bytes is not None and total > max_bytes
+          idle = idle_before is not None and entry['accessed_at'] < idle_before
+          if not (remove_all or over_budget or idle):
+              continue
+
+          if not dry_run:
+              self.remove(entry['ticker'], entry['interval'])
+          total -= entry['bytes']
+          removed.append((entry['ticker'], entry['interval']))
+
+      return removed
+
+  def reindex(self):
+      """
+      Add datasets written before the manifest existed.
+
+      Only the Parquet footers are read.
+
+      Returns:
+          Number of datasets added
+      """
+      known = {(e['ticker'], e['interval']) for e in self.manifest.entries()}
+      added = 0
+
+      for path in self.root.glob('*.parquet'):
+          meta = json.loads((pq.read_schema(path).metadata or {}).get(METADATA_KEY, b'{}'))
+          interval = meta.get('interval', '1d')
+          ticker = path.stem[:-len(interval) - 1] if path.stem.endswith(f"_{interval}") else path.stem
+          if (ticker, interval) in known:
+              continue
+
+          coverage = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in meta.get('coverage', [])]
+          stat = path.stat()
+          self.manifest.record(ticker, interval, path.name, coverage, stat.st_size, refreshed=True, at=stat.st_mtime)
+          added += 1
+
+      return added
+
+  def migrate_legacy_csv(self, ticker):
+      """
+      Fold per-range ``{ticker}_{start}_{end}.csv`` files into the store.
+
+      The CSVs are parsed once, merged into the ticker's daily dataset and
+      deleted, so data downloaded before the Parquet store existed is kept.
+
+      Returns:
+          Number of files migrated
+      """
+      pattern = re.compile(LEGACY_CSV_PATTERN.format(ticker=re.escape(ticker)))
+      migrated = 0
+
+      for path in sorted(self.root.glob(f"{ticker}_*.csv")):
+          match = pattern.match(path.name)
+          if not match:
+              continue
+
+          try:
+              df = normalize_bars(pd.read_csv(path, index_col=0, parse_dates=True))
+          except Exception:
+              # Leave unreadable files alone rather than lose them
+              continue
+
+          self.merge(ticker, df, [(match.group(1), match.group(2))])
+          path.unlink()
+          migrated += 1
+
+      return migrated
+
+
+def merge_ranges(ranges):
+  """Union overlapping or touching ``[start, end)`` ranges."""
+  merged = []
+  for start, end in sorted(ranges):
+      if merged and start <= merged[-1][1]:
+          merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+      else:
+          merged.append((start, end))
+  return merged
+
+
+def missing_ranges(coverage, start, end):
+  """Parts of ``[start, end)`` that no cached range covers."""
+  missing = []
+  cursor = pd.Timestamp(start)
+  end = pd.Timestamp(end)
+
+  for s, e in merge_ranges(coverage):
+      if e <= cursor:
+          continue
+      if s >= end:
+          break
+      if s > cursor:
+          missing.append((cursor, s))
+      cursor = max(cursor, e)
+
+  if cursor < end:
+      missing.append((cursor, end))
+
+  return missing
+
+
+def normalize_bars(df):
+  """
+  Coerce a downloaded or legacy frame into the stored schema.
+
+  Flattens yfinance's MultiIndex columns, enforces a sorted, tz-naive
+  DatetimeIndex and gives prices/volume fixed dtypes so the columnar
+  file round-trips without any parsing.
+  """
+  df = df.copy()
+
+  if isinstance(df.columns, pd.MultiIndex):
+      df.columns = df.columns.get_level_values(0)
+
+  df.index = pd.DatetimeIndex(df.index)
+  if df.index.tz is not None:
+      df.index = df.index.tz_localize(None)
+  df.index.name = 'Date'
+  df = df[~df.index.duplicated(keep='last')].sort_index()
+
+  for col in ('Open', 'High', 'Low', 'Close'):
+      if col in df.columns:
+          df[col] = df[col].astype('float64')
+
+  if 'Volume' in df.columns:
+      df['Volume'] = df['Volume'].fillna(0).astype('int64')
+
+  return df
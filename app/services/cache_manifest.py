@@ -0,0 +1,172 @@
+"""SQLite index of the datasets in a bar cache directory."""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+
+MANIFEST_NAME = 'manifest.sqlite'
+
+# Last-access times are buffered and written at most this often, so cache
+# hits do not turn into SQLite writes
+TOUCH_FLUSH_SECONDS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    path TEXT NOT NULL,
+    coverage TEXT NOT NULL,
+    covered_from TEXT,
+    covered_to TEXT,
+    bytes INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    refreshed_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (ticker, interval)
+)
+"""
+
+_manifests = {}
+_manifests_guard = threading.Lock()
+
+
+def manifest_for(root):
+  """Process-wide manifest for a cache directory (buffers are shared)."""
+  path = Path(root) / MANIFEST_NAME
+  with _manifests_guard:
+      key = str(path.resolve())
+      if key not in _manifests:
+          _manifests[key] = CacheManifest(path)
+      return _manifests[key]
+
+
+class CacheManifest:
+  """
+  One row per cached ticker/interval dataset.
+
+  Records what each file covers, its size, when bars were last fetched
+  (``fetched_at``), when the most recent bars were last fetched
+  (``refreshed_at``, drives TTL refresh) and when it was last used
+  (``accessed_at``, drives LRU eviction). Times are Unix seconds.
+
+  Every operation opens its own short-lived connection in WAL mode, so
+  threads and gunicorn workers can share the file.
+  """
+
+  def __init__(self, path):
+      self.path = Path(path)
+      self.path.parent.mkdir(parents=True, exist_ok=True)
+      self._touches = {}
+      self._touch_lock = threading.Lock()
+      self._last_flush = time.time()
+
+      with self._connect() as db:
+          db.execute('PRAGMA journal_mode=WAL')
+          db.execute(_SCHEMA)
+
+  @contextmanager
+  def _connect(self):
+      """Connection that commits on success and is always closed."""
+      db = sqlite3.connect(self.path, timeout=30)
+      db.row_factory = sqlite3.Row
+      try:
+          with db:
+              yield db
+      finally:
+          db.close()
+
+  def record(self, ticker, interval, path, coverage, nbytes, refreshed, at=None):
+      """
+      Upsert a dataset after it was written.
+
+      Args:
+          coverage: Merged ``[start, end)`` ranges in the file
+          nbytes: File size
+          refreshed: Whether this write fetched the newest covered bars
+          at: Time of the write (default: now)
+      """
+      now = time.time() if at is None else at
+      start = coverage[0][0].isoformat() if coverage else None
+      end = coverage[-1][1].isoformat() if coverage else None
+
+      with self._connect() as db:
+          db.execute(
+              """
+              INSERT INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+              ON CONFLICT (ticker, interval) DO UPDATE SET
+                  path = excluded.path,
+                  coverage = excluded.coverage,
+                  covered_from = excluded.covered_from,
+                  covered_to = excluded.covered_to,
+                  bytes = excluded.bytes,
+                  fetched_at = excluded.fetched_at,
+                  refreshed_at = CASE WHEN ? THEN excluded.refreshed_at ELSE refreshed_at END,
+                  accessed_at = excluded.accessed_at
+              """,
+              (ticker, interval, str(path), _dump_coverage(coverage), start, end,
+               int(nbytes), now, now, now, bool(refreshed))
+          )
+
+  def touch(self, ticker, interval):
+      """Note an access; buffered until the next flush."""
+      now = time.time()
+      with self._touch_lock:
+          self._touches[(ticker, interval)] = now
+          due = now - self._last_flush >= TOUCH_FLUSH_SECONDS
+
+      if due:
+          self.flush()
+
+  def flush(self):
+      """Write buffered access times."""
+      with self._touch_lock:
+          touches, self._touches = self._touches, {}
+          self._last_flush = time.time()
+
+      if touches:
+          with self._connect() as db:
+              db.executemany(
+                  'UPDATE datasets SET accessed_at = MAX(accessed_at, ?) WHERE ticker = ? AND interval = ?',
+                  [(at, ticker, interval) for (ticker, interval), at in touches.items()]
+              )
+
+  def get(self, ticker, interval):
+      """Row for a dataset as a dict, or None."""
+      with self._connect() as db:
+          row = db.execute(
+              'SELECT * FROM datasets WHERE ticker = ? AND interval = ?', (ticker, interval)
+          ).fetchone()
+      return _row_dict(row) if row else None
+
+  def entries(self):
+      """All rows, least recently accessed first."""
+      self.flush()
+      with self._connect() as db:
+          rows = db.execute('SELECT * FROM datasets ORDER BY accessed_at, ticker, interval').fetchall()
+      return [_row_dict(row) for row in rows]
+
+  def total_bytes(self):
+      with self._connect() as db:
+          return db.execute('SELECT COALESCE(SUM(bytes), 0) FROM datasets').fetchone()[0]
+
+  def remove(self, ticker, interval):
+      with self._touch_lock:
+          self._touches.pop((ticker, interval), None)
+      with self._connect() as db:
+          db.execute('DELETE FROM datasets WHERE ticker = ? AND interval = ?', (ticker, interval))
+
+
+def _dump_coverage(coverage):
+  return json.dumps([[s.isoformat(), e.isoformat()] for s, e in coverage])
+
+
+def _row_dict(row):
+  entry = dict(row)
+  entry['coverage'] = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in json.loads(entry['coverage'])]
+  return entry
@@ -1,17 +1,174 @@
 """Service for fetching market data."""
 
-import yfinance as yf
+import time
+import weakref
+
 import pandas as pd
-from pathlib import Path
 from datetime import datetime
+from pathlib import Path
+
+from app.services.bar_store import BarStore, missing_ranges
+from app.services.compact import compact_bars
+from app.services.intervals import source_interval, validate_interval
+from app.services.mmap_store import MmapStore
+from app.services.providers import get_provider
+from app.services.resample import resample_bars
+from app.utils.lru import ByteLRUCache
+from app.utils.single_flight import SingleFlight
+
+
+DEFAULT_MEMORY_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def _history_nbytes(entry):
+  df, _ = entry
+  return df.memory_usage(index=True, deep=True).sum()
+
+
+# Parsed histories shared by every DataService in this process, keyed by
+# (cache_dir, ticker, interval). Frames stored here are read-only.
+_memory_cache = ByteLRUCache(DEFAULT_MEMORY_CACHE_BYTES, _history_nbytes)
+
+# In-flight downloads, so concurrent identical requests share one fetch
+_inflight = SingleFlight()
+
+# Defaults for DataService instances created without explicit settings
+_defaults = {
+    'use_mmap': True,
+    'provider': 'yahoo',
+    'provider_options': {},
+    'intraday_base': '5m',
+    'compact': True,
+    'refresh_ttl': 12 * 3600,
+    'refresh_days': 5,
+    'disk_cache_bytes': None,
+}
+
+
+def configure(
+    memory_cache_bytes=None,
+    use_mmap=None,
+    provider=None,
+    provider_options=None,
+    intraday_base=None,
+    compact_dtypes=None,
+    refresh_ttl=None,
+    refresh_days=None,
+    disk_cache_bytes=None
+):
+  """
+  Apply app config to the data layer. Called once from create_app.
+
+  Args:
+      memory_cache_bytes: Byte budget of the process-wide history cache
+      use_mmap: Share histories between workers as memory-mapped files
+      provider: Default market data provider name ('yahoo', 'local', 'synthetic')
+      provider_options: Keyword arguments for that provider
+      intraday_base: Finest intraday interval to store; coarser intraday
+          intervals are resampled from it
+      compact_dtypes: Hold cached histories as float32 prices and int32
+          volume where that is precise enough (see app.services.compact)
+      refresh_ttl: Seconds after which the most recent cached bars are
+          fetched again, since providers revise them (0 = never)
+      refresh_days: How many days of bars count as recent
+      disk_cache_bytes: Disk budget per cache directory; least recently
+          used datasets are deleted beyond it (0 = unbounded)
+  """
+  if memory_cache_bytes is not None:
+      _memory_cache.resize(memory_cache_bytes)
+  if use_mmap is not None:
+      _defaults['use_mmap'] = bool(use_mmap)
+  if provider is not None:
+      get_provider(provider, **(provider_options or {}))  # fail fast on bad config
+      _defaults['provider'] = provider
+      _defaults['provider_options'] = dict(provider_options or {})
+  if intraday_base is not None:
+      _defaults['intraday_base'] = validate_interval(intraday_base)
+  if compact_dtypes is not None:
+      _defaults['compact'] = bool(compact_dtypes)
+  if refresh_ttl is not None:
+      _defaults['refresh_ttl'] = refresh_ttl or None
+  if refresh_days is not None:
+      _defaults['refresh_days'] = refresh_days
+  if disk_cache_bytes is not None:
+      _defaults['disk_cache_bytes'] = disk_cache_bytes or None
+
+
+def prune_cache(cache_dir, max_bytes=None, max_idle=None, tickers=None, keep=(), dry_run=False, remove_all=False):
+  """
+  Delete cached datasets in one cache directory, least recently used first.
+
+  Removes the Parquet files and their memory-mapped copies. Either a
+  limit or ``remove_all`` (every dataset of ``tickers``, if given) must
+  be given.
+
+  Args:
+      cache_dir: Directory holding a BarStore (one provider namespace)
+      max_bytes: Disk budget to shrink to
+      max_idle: Remove datasets unused for this many seconds
+      tickers: Only consider these tickers
+      keep: (ticker, interval) pairs never to remove
+      dry_run: Only report what would be removed
+      remove_all: Remove every dataset not in ``keep``, without limits
+
+  Returns:
+      List of removed (ticker, interval) pairs
+
+  Raises:
+      ValueError: If neither a limit nor remove_all is given, or both are
+  """
+  cache_dir = Path(cache_dir)
+  removed = BarStore(cache_dir).evict(max_bytes, max_idle, tickers, keep, dry_run, remove_all)
+  if dry_run:
+      return removed
+
+  mmap_stores = [MmapStore(path) for path in (cache_dir / 'mmap', cache_dir / 'mmap_f64') if path.is_dir()]
+  for ticker, interval in removed:
+      for mmap_store in mmap_stores:
+          mmap_store.remove(ticker, interval)
+
+  return removed
+
+
+def memory_cache_stats():
+  """Hit/miss/eviction counters of the process-wide history cache."""
+  return _memory_cache.stats()
 
 
 class DataService:
-  def __init__(self, cache_dir='data/cache'):
+  def __init__(
+      self,
+      cache_dir='data/cache',
+      memory_cache=None,
+      use_mmap=None,
+      provider=None,
+      intraday_base=None,
+      compact=None
+  ):
+      if provider is None:
+          provider = get_provider(_defaults['provider'], **_defaults['provider_options'])
+      self.provider = provider
+
+      # Each provider caches in its own namespace so synthetic or local bars
+      # never mix with real ones
       self.cache_dir = Path(cache_dir)
-      self.cache_dir.mkdir(parents=True, exist_ok=True)
+      if provider.cache_namespace:
+          self.cache_dir = self.cache_dir / provider.cache_namespace
+
+      # Parquet keeps full precision; the dtype policy only applies to the
+      # in-memory and memory-mapped copies, which are kept apart per policy
+      self.compact = _defaults['compact'] if compact is None else compact
+      self.store = BarStore(self.cache_dir)
+      self.memory_cache = memory_cache if memory_cache is not None else _memory_cache
+      self.use_mmap = _defaults['use_mmap'] if use_mmap is None else use_mmap
+      mmap_dir = self.cache_dir / ('mmap' if self.compact else 'mmap_f64')
+      self.mmap_store = MmapStore(mmap_dir) if self.use_mmap else None
+      self.intraday_base = intraday_base or _defaults['intraday_base']
+      self.refresh_ttl = _defaults['refresh_ttl']
+      self.refresh_days = _defaults['refresh_days']
+      self.disk_cache_bytes = _defaults['disk_cache_bytes']
 
-  def get_data(self, ticker, start, end, use_cache=True):
+  def get_data(self, ticker, start, end, use_cache=True, interval='1d'):
       """
       Fetch OHLCV data for a ticker.
 
@@ -20,47 +177,339 @@ class DataService:
           start: Start date 'YYYY-MM-DD'
           end: End date 'YYYY-MM-DD'
           use_cache: Whether to cache results
+          interval: Bar interval ('1m', '5m', '15m', '1h', '4h', '1d', '1wk', ...)
 
       Returns:
           dict with: success, data (DataFrame), error
       """
-      # Validate dates
+      start_dt, end_dt, error = _parse_range(start, end, interval)
+      if error:
+          return {'success': False, 'data': None, 'error': error}
+
+      # Coarser intervals are resampled from the finest stored one that
+      # the provider still serves for this range
+      try:
+          source = source_interval(interval, self.intraday_base, start_dt, self.provider.intraday_history)
+      except ValueError as e:
+          return {'success': False, 'data': None, 'error': str(e)}
+
+      history, error = self._history(ticker, source, start_dt, end_dt, use_cache)
+      if error:
+          return {'success': False, 'data': None, 'error': error}
+
+      if interval != source:
+          history = self._resampled(ticker, interval, source, history, use_cache)
+
+      return self._slice_result(ticker, history, start_dt, end_dt)
+
+  def get_data_many(self, tickers, start, end, use_cache=True, interval='1d'):
+      """
+      Fetch OHLCV data for several tickers at once.
+
+      Cache hits are served locally. Everything still missing is pulled with
+      one batched provider call per distinct missing date range (usually
+      just one), and each ticker's bars are merged into its own cache.
+
+      Args:
+          tickers: Iterable of stock symbols
+          start: Start date 'YYYY-MM-DD'
+          end: End date 'YYYY-MM-DD'
+          use_cache: Whether to cache results
+          interval: Bar interval, as for get_data
+
+      Returns:
+          dict of ticker -> dict with: success, data (DataFrame), error.
+          A bad symbol only fails its own entry.
+      """
+      tickers = list(dict.fromkeys(tickers))
+
+      start_dt, end_dt, error = _parse_range(start, end, interval)
+      if error:
+          return {t: {'success': False, 'data': None, 'error': error} for t in tickers}
+
       try:
-          start_dt = datetime.strptime(start, '%Y-%m-%d')
-          end_dt = datetime.strptime(end, '%Y-%m-%d')
+          source = source_interval(interval, self.intraday_base, start_dt, self.provider.intraday_history)
       except ValueError as e:
-          return {'success': False, 'data': None, 'error': f'Invalid date: {e}'}
+          return {t: {'success': False, 'data': None, 'error': str(e)} for t in tickers}
+
+      histories = {}
+      pending = {}
+      for ticker in tickers:
+          cached, missing = self._plan(ticker, source, start_dt, end_dt, use_cache)
+          if missing:
+              pending[ticker] = (cached, missing)
+          else:
+              histories[ticker] = (cached, None)
+
+      # Group tickers that are missing the same range into one download
+      batches = {}
+      for ticker, (_, missing) in pending.items():
+          for segment in missing:
+              batches.setdefault(segment, []).append(ticker)
+
+      parts = {ticker: [] for ticker in pending}
+      failed = {}
+      for (s, e), batch in batches.items():
+          try:
+              frames = self.provider.fetch_many(batch, s, e, source)
+          except Exception as ex:
+              failed.update({ticker: str(ex) for ticker in batch})
+              continue
+
+          for ticker in batch:
+              parts[ticker].append(frames.get(ticker, pd.DataFrame()))
+
+      for ticker, (cached, missing) in pending.items():
+          if ticker in failed:
+              histories[ticker] = (None, failed[ticker])
+              continue
+
+          try:
+              histories[ticker] = self._complete(ticker, source, cached, missing, parts[ticker], use_cache)
+          except Exception as ex:
+              histories[ticker] = (None, str(ex))
+
+      results = {}
+      for ticker in tickers:
+          history, error = histories[ticker]
+          if error:
+              results[ticker] = {'success': False, 'data': None, 'error': error}
+              continue
+
+          if interval != source:
+              history = self._resampled(ticker, interval, source, history, use_cache)
+          results[ticker] = self._slice_result(ticker, history, start_dt, end_dt)
+
+      return results
+
+  def _history(self, ticker, interval, start_dt, end_dt, use_cache):
+      """
+      Cached history for a ticker, extended to cover [start, end).
+
+      Returns:
+          (DataFrame, error). The frame is the full history, not a slice,
+          and is shared (read-only) when it comes from the cache.
+      """
+      # Work out which parts of the request are not cached yet
+      cached, missing = self._plan(ticker, interval, start_dt, end_dt, use_cache)
+      if not missing:
+          return cached, None
+
+      def fetch():
+          # Fetch only the missing head/tail/gaps from the provider
+          try:
+              parts = [self.provider.fetch(ticker, s, e, interval) for s, e in missing]
+              return self._complete(ticker, interval, cached, missing, parts, use_cache)
 
-      if start_dt >= end_dt:
-          return {'success': False, 'data': None, 'error': 'Start must be before end'}
+          except Exception as e:
+              return None, str(e)
 
-      # Check cache
-      cache_key = f"{ticker}_{start}_{end}.csv"
-      cache_path = self.cache_dir / cache_key
+      if not use_cache:
+          return fetch()
 
-      if use_cache and cache_path.exists():
+      # Concurrent requests for the same ticker/range wait for one download
+      key = self._memory_key(ticker, interval) + (start_dt, end_dt)
+      result, _ = _inflight.do(key, fetch)
+      return result
+
+  def _plan(self, ticker, interval, start_dt, end_dt, use_cache):
+      """
+      Load what is cached for a ticker and list the ranges still to fetch.
+
+      Returns:
+          (cached DataFrame or None, list of missing (start, end) ranges)
+      """
+      if not use_cache:
+          return None, [(start_dt, end_dt)]
+
+      self.store.touch(ticker, interval)
+
+      # In-memory history first, then the memory-mapped copy shared with
+      # other workers, then Parquet in case either is behind the dataset
+      key = self._memory_key(ticker, interval)
+      entry = self.memory_cache.get(key)
+      if entry is not None:
+          cached, coverage = entry
+          missing = missing_ranges(self._fresh(ticker, interval, coverage, end_dt), start_dt, end_dt)
+          if not missing:
+              return cached, missing
+
+      cached, coverage = None, []
+      if self.mmap_store is not None:
+          cached, coverage = self.mmap_store.load(ticker, interval)
+
+      if cached is None or missing_ranges(coverage, start_dt, end_dt):
           try:
-              df = pd.read_csv(cache_path, index_col=0, parse_dates=True)
-              return {'success': True, 'data': df, 'error': None}
+              if interval == '1d' and self.store.manifest.get(ticker, interval) is None:
+                  self.store.migrate_legacy_csv(ticker)
+              disk, disk_coverage = self.store.read(ticker, interval)
           except Exception:
+              disk, disk_coverage = None, []
+
+          if disk is not None:
+              cached, coverage = self._share(ticker, interval, disk, disk_coverage), disk_coverage
+
+      if cached is not None:
+          self.memory_cache.put(key, (cached, coverage))
+
+      return cached, missing_ranges(self._fresh(ticker, interval, coverage, end_dt), start_dt, end_dt)
+
+  def _fresh(self, ticker, interval, coverage, end_dt):
+      """
+      Drop recent bars from ``coverage`` once they are due for a refresh.
+
+      Providers revise the last few sessions (late prints, adjustments),
+      so bars within ``refresh_days`` of their fetch are re-fetched when
+      that fetch is older than ``refresh_ttl``. Older bars are final.
+      """
+      if not coverage or self.refresh_ttl is None:
+          return coverage
+
+      # Cheap pre-check: requests that stop before the recent bars never
+      # need the manifest
+      if end_dt <= coverage[-1][1] - pd.Timedelta(days=self.refresh_days):
+          return coverage
+
+      entry = self.store.manifest.get(ticker, interval)
+      if entry is None or time.time() - entry['refreshed_at'] < self.refresh_ttl:
+          return coverage
+
+      settled = pd.Timestamp.fromtimestamp(entry['refreshed_at']).normalize()
+      settled -= pd.Timedelta(days=self.refresh_days)
+      return [(s, min(e, settled)) for s, e in coverage if s < settled]
+
+  def _share(self, ticker, interval, df, coverage):
+      """
+      Turn a freshly loaded or merged history into a shareable frame.
+
+      With mmap enabled the history is published as column files and the
+      returned frame maps them, so other workers reuse the same pages.
+      Otherwise (or if publishing fails) it is a read-only private copy.
+      """
+      if self.compact:
+          df = compact_bars(df)
+
+      if self.mmap_store is not None:
+          try:
+              if self.mmap_store.publish(ticker, df, coverage, interval):
+                  shared, _ = self.mmap_store.load(ticker, interval)
+                  if shared is not None:
+                      return shared
+          except OSError:
               pass
 
-      # Fetch from yfinance
-      try:
-          df = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=True)
+      return _freeze(df)
+
+  def _resampled(self, ticker, interval, source, history, use_cache):
+      """
+      Resample the ``source`` interval's history to ``interval``, memoized
+      per source frame.
+
+      The derived frame is cached together with a weak reference to the
+      history it was built from, so it is rebuilt as soon as that history
+      is extended or reloaded. Its key names the source interval: the same
+      interval can also be stored natively (see source_interval), under
+      the plain key.
+      """
+      key = self._memory_key(ticker, interval) + ('resampled', source)
+
+      if use_cache:
+          entry = self.memory_cache.get(key)
+          if entry is not None and entry[1]() is history:
+              return entry[0]
+
+      derived = resample_bars(history, interval)
+      derived = _freeze(compact_bars(derived) if self.compact else derived)
+
+      if use_cache:
+          self.memory_cache.put(key, (derived, weakref.ref(history)))
+
+      return derived
+
+  def _memory_key(self, ticker, interval='1d'):
+      return (str(self.cache_dir.resolve()), ticker, interval, self.compact)
+
+  def _complete(self, ticker, interval, cached, missing, parts, use_cache):
+      """
+      Merge freshly downloaded parts into the cache.
+
+      Returns:
+          (full history DataFrame, error)
+      """
+      parts = [p for p in parts if not p.empty]
+
+      if not parts and cached is None:
+          return None, f'No data for {ticker}'
+
+      df = pd.concat(parts) if parts else cached.iloc[:0]
+
+      # Cache it, without claiming bars for days that are not over yet
+      if use_cache:
+          today = pd.Timestamp.today().normalize()
+          fetched = [(s, min(e, today)) for s, e in missing if s < today]
+          df, coverage = self.store.merge(ticker, df, fetched, interval)
+          df = self._share(ticker, interval, df, coverage)
+          self.memory_cache.put(self._memory_key(ticker, interval), (df, coverage))
+
+          if self.disk_cache_bytes is not None:
+              prune_cache(self.cache_dir, self.disk_cache_bytes, keep={(ticker, interval)})
+      elif self.compact:
+          df = compact_bars(df)
+
+      return df, None
+
+  def _slice_result(self, ticker, df, start_dt, end_dt):
+      """
+      Cut the requested [start, end) window out of a cached history.
+
+      The window is a positional slice, so for cached histories it is a
+      view onto the shared read-only columns rather than a copy.
+      """
+      lo, hi = df.index.searchsorted([start_dt, end_dt])
+      df = df.iloc[lo:hi].copy(deep=False)
+
+      if df.empty:
+          return {'success': False, 'data': None, 'error': f'No data for {ticker}'}
+
+      return {'success': True, 'data': df, 'error': None}
+
+
+def _parse_range(start, end, interval='1d'):
+  """
+  Validate a 'YYYY-MM-DD' date range and bar interval.
+
+  Returns:
+      (start_dt, end_dt, error) where error is None if the range is valid
+  """
+  try:
+      start_dt = datetime.strptime(start, '%Y-%m-%d')
+      end_dt = datetime.strptime(end, '%Y-%m-%d')
+  except ValueError as e:
+      return None, None, f'Invalid date: {e}'
+
+  if start_dt >= end_dt:
+      return None, None, 'Start must be before end'
+
+  try:
+      validate_interval(interval)
+  except ValueError as e:
+      return None, None, str(e)
 
-          if df.empty:
-              return {'success': False, 'data': None, 'error': f'No data for {ticker}'}
+  return start_dt, end_dt, None
 
-          # Flatten multi-level columns if present
-          if isinstance(df.columns, pd.MultiIndex):
-              df.columns = df.columns.get_level_values(0)
 
-          # Cache it
-          if use_cache:
-              df.to_csv(cache_path)
+def _freeze(df):
+  """
+  Rebuild a frame on read-only column arrays.
 
-          return {'success': True, 'data': df, 'error': None}
+  Cached histories are shared between requests, so in-place writes from
+  callers must fail instead of silently corrupting the cache. Adding or
+  replacing columns on a returned frame is still fine.
+  """
+  columns = {}
+  for col in df.columns:
+      values = df[col].to_numpy(copy=True)
+      values.flags.writeable = False
+      columns[col] = values
 
-      except Exception as e:
-          return {'success': False, 'data': None, 'error': str(e)}
\ No newline at end of file
+  return pd.DataFrame(columns, index=df.index, copy=False)
@@ -0,0 +1,137 @@
+"""Bar interval definitions shared by the data layer."""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Regular US equity session used to lay out intraday bars
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+SESSION_MINUTES = 390
+TRADING_DAYS_PER_YEAR = 252
+
+# Interval string -> bar length in minutes (None = not intraday). These are
+# yfinance's names; '4h' has no yfinance equivalent and is always derived.
+INTERVAL_MINUTES = {
+    '1m': 1,
+    '2m': 2,
+    '5m': 5,
+    '15m': 15,
+    '30m': 30,
+    '1h': 60,
+    '4h': 240,
+    '1d': None,
+    '1wk': None,
+}
+
+
+# Intervals that can only be built by resampling a finer one
+DERIVED_ONLY = {'4h'}
+
+
+def validate_interval(interval):
+  if interval not in INTERVAL_MINUTES:
+      raise ValueError(f"Unsupported interval '{interval}'. Use one of: {', '.join(INTERVAL_MINUTES)}")
+  return interval
+
+
+def is_intraday(interval):
+  return INTERVAL_MINUTES[validate_interval(interval)] is not None
+
+
+def bars_per_day(interval):
+  """Bars in one regular session (the last intraday bar may be partial)."""
+  minutes = INTERVAL_MINUTES[validate_interval(interval)]
+  return math.ceil(SESSION_MINUTES / minutes) if minutes else 1
+
+
+def periods_per_year(interval):
+  """Bars per year, used to annualize returns and volatility."""
+  if interval == '1wk':
+      return 52
+  return TRADING_DAYS_PER_YEAR * bars_per_day(interval)
+
+
+def source_interval(interval, intraday_base='5m', start=None, history_days=None):
+  """
+  Interval to fetch and store in order to serve ``interval``.
+
+  Intraday intervals that are whole multiples of ``intraday_base`` are
+  derived from it, weekly bars from daily bars, so only the finest data is
+  downloaded. Daily bars are fetched natively since providers keep far
+  longer daily histories than intraday ones.
+
+  Providers only keep a limited window of intraday bars (see
+  MarketDataProvider.intraday_history). When ``start`` lies before the
+  base interval's window, the finest coarser interval that still reaches
+  back to it is used instead: another multiple of the base that divides
+  ``interval``, or ``interval`` itself (e.g. 1h bars two years back,
+  where 5m bars only cover 60 days).
+
+  Args:
+      interval: Interval to serve
+      intraday_base: Finest intraday interval to store
+      start: First bar wanted (None to ignore history limits)
+      history_days: Interval -> days back the provider serves; intervals
+          not listed are unlimited
+  """
+  validate_interval(interval)
+  base_minutes = INTERVAL_MINUTES[validate_interval(intraday_base)]
+
+  if interval == '1wk':
+      return '1d'
+
+  minutes = INTERVAL_MINUTES[interval]
+  candidates = []
+  if minutes is not None and minutes > base_minutes and minutes % base_minutes == 0:
+      # The base, then coarser intervals it can stand in for, finest first
+      candidates = [
+          name for name, m in INTERVAL_MINUTES.items()
+          if m is not None and base_minutes <= m < minutes and minutes % m == 0 and m % base_minutes == 0
+      ]
+  if interval not in DERIVED_ONLY:
+      candidates.append(interval)
+
+  if not candidates:
+      raise ValueError(f"Interval '{interval}' cannot be built from '{intraday_base}' bars")
+  if start is None or not history_days:
+      return candidates[0]
+
+  def reach(name):
+      days = history_days.get(name)
+      return pd.Timestamp.min if days is None else pd.Timestamp.today().normalize() - pd.Timedelta(days=days)
+
+  for name in candidates:
+      if reach(name) <= pd.Timestamp(start):
+          return name
+  # Nothing reaches back far enough; the longest history gets closest
+  return min(candidates, key=reach)
+
+
+def bar_calendar(start, end, interval='1d'):
+  """
+  Timestamps of the bars in ``[start, end)`` on a plain weekday calendar.
+
+  Intraday bars are stamped at their open within the regular session,
+  daily bars at midnight and weekly bars on Mondays, like yfinance.
+  Exchange holidays are ignored.
+  """
+  start = pd.Timestamp(start)
+  end = pd.Timestamp(end)
+  minutes = INTERVAL_MINUTES[validate_interval(interval)]
+
+  if interval == '1wk':
+      days = pd.date_range(start.normalize(), end, freq='W-MON')
+  else:
+      days = pd.bdate_range(start.normalize(), end)
+
+  if minutes is None:
+      stamps = days
+  else:
+      offsets = SESSION_OPEN + pd.to_timedelta(np.arange(0, SESSION_MINUTES, minutes), unit='min')
+      stamps = pd.DatetimeIndex(
+          (days.values[:, None] + offsets.values[None, :]).ravel()
+      )
+
+  return stamps[(stamps >= start) & (stamps < end)]
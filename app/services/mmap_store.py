@@ -0,0 +1,106 @@
+"""Memory-mapped OHLCV columns shared between worker processes."""
+
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class MmapStore:
+  """
+  Per-ticker OHLCV histories as memory-mapped ``.npy`` column files.
+
+  Every gunicorn worker that loads a ticker maps the same files, so the
+  bars live once in the OS page cache instead of once per process, and a
+  freshly forked worker can build a DataFrame without parsing anything.
+
+  Each publish writes a new version directory and then atomically swaps a
+  small JSON pointer to it. Readers that still map an older version keep
+  working (the pages stay alive until they are unmapped); new readers see
+  the new one.
+  """
+
+  def __init__(self, root):
+      self.root = Path(root)
+      self.root.mkdir(parents=True, exist_ok=True)
+
+  def _pointer(self, ticker, interval):
+      return self.root / f"{ticker}_{interval}.json"
+
+  def publish(self, ticker, df, coverage, interval='1d'):
+      """
+      Write a ticker's history as column files and make it current.
+
+      Returns:
+          False if the frame has columns that cannot be memory-mapped
+      """
+      if any(dtype == object for dtype in df.dtypes):
+          return False
+
+      version = uuid.uuid4().hex[:12]
+      target = self.root / f"{ticker}_{interval}.{version}"
+      target.mkdir()
+
+      index = df.index.values.astype('datetime64[ns]').view('int64')
+      np.save(target / 'index.npy', index)
+      for i, col in enumerate(df.columns):
+          # Positional file names: column labels need not be path-safe
+          np.save(target / f"col{i}.npy", df[col].to_numpy())
+
+      pointer = self._pointer(ticker, interval)
+      tmp = pointer.with_name(f"{pointer.name}.{version}.tmp")
+      tmp.write_text(json.dumps({
+          'version': target.name,
+          'columns': [str(col) for col in df.columns],
+          'index_name': df.index.name,
+          'coverage': [[s.isoformat(), e.isoformat()] for s, e in coverage],
+      }))
+      os.replace(tmp, pointer)
+
+      self._remove_old_versions(ticker, interval, keep=target.name)
+      return True
+
+  def load(self, ticker, interval='1d'):
+      """
+      Map the current version of a ticker's history.
+
+      Returns:
+          (DataFrame, coverage) with read-only, zero-copy columns, or
+          (None, []) if nothing is published or it was just replaced
+      """
+      try:
+          meta = json.loads(self._pointer(ticker, interval).read_text())
+          source = self.root / meta['version']
+
+          index = _map(source / 'index.npy')
+          columns = {col: _map(source / f"col{i}.npy") for i, col in enumerate(meta['columns'])}
+      except (FileNotFoundError, ValueError, KeyError):
+          return None, []
+
+      df = pd.DataFrame(
+          columns,
+          index=pd.DatetimeIndex(index.view('datetime64[ns]'), name=meta['index_name']),
+          copy=False
+      )
+      coverage = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in meta['coverage']]
+
+      return df, coverage
+
+  def remove(self, ticker, interval='1d'):
+      """Unpublish a ticker's history. Readers that still map it keep working."""
+      self._pointer(ticker, interval).unlink(missing_ok=True)
+      self._remove_old_versions(ticker, interval, keep=None)
+
+  def _remove_old_versions(self, ticker, interval, keep):
+      for path in self.root.glob(f"{ticker}_{interval}.*"):
+          if path.is_dir() and path.name != keep:
+              shutil.rmtree(path, ignore_errors=True)
+
+
+def _map(path):
+  """Read-only mapping of a .npy file as a plain ndarray view."""
+  return np.load(path, mmap_mode='r').view(np.ndarray)
@@ -0,0 +1,36 @@
+"""
+Market data providers.
+
+Available providers:
+    - YahooProvider: Live bars from yfinance (default)
+    - LocalDirectoryProvider: Parquet/CSV files from a drop folder
+    - SyntheticProvider: Seeded regime-switching GBM bars for offline use
+"""
+
+from app.services.providers.base import MarketDataProvider
+from app.services.providers.yahoo import YahooProvider
+from app.services.providers.local import LocalDirectoryProvider
+from app.services.providers.synthetic import SyntheticProvider
+
+PROVIDERS = {
+    YahooProvider.name: YahooProvider,
+    LocalDirectoryProvider.name: LocalDirectoryProvider,
+    SyntheticProvider.name: SyntheticProvider,
+}
+
+
+def get_provider(name, **options):
+  """Instantiate a provider by name ('yahoo', 'local' or 'synthetic')."""
+  if name not in PROVIDERS:
+      raise ValueError(f"Unknown data provider '{name}'. Use one of: {', '.join(PROVIDERS)}")
+  return PROVIDERS[name](**options)
+
+
+__all__ = [
+    'MarketDataProvider',
+    'YahooProvider',
+    'LocalDirectoryProvider',
+    'SyntheticProvider',
+    'PROVIDERS',
+    'get_provider',
+]
@@ -0,0 +1,65 @@
+"""Base interface for market data providers."""
+
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+
+class MarketDataProvider(ABC):
+  """
+  Source of OHLCV bars behind DataService.
+
+  Providers return bars already passed through ``normalize_bars`` for the
+  half-open range ``[start, end)``, or an empty DataFrame if there are
+  none. Caching, slicing and coalescing are DataService's job.
+  """
+
+  # Short identifier, used in config and cache paths
+  name = 'base'
+
+  # Intraday interval -> days back from today the provider serves bars
+  # for; intervals not listed have no limit
+  intraday_history = {}
+
+  @property
+  def cache_namespace(self):
+      """
+      Subdirectory of the data cache for this provider's bars, or None to
+      use the cache root. Providers whose output depends on settings
+      (like a seed) must include them so caches never mix.
+      """
+      return self.name
+
+  @abstractmethod
+  def fetch(self, ticker, start, end, interval='1d'):
+      """
+      Fetch bars for one ticker.
+
+      Args:
+          ticker: Symbol
+          start: Inclusive start (Timestamp or datetime)
+          end: Exclusive end (Timestamp or datetime)
+          interval: Bar interval, e.g. '1d', '5m'
+
+      Returns:
+          Normalized OHLCV DataFrame (possibly empty)
+      """
+      pass
+
+  def fetch_many(self, tickers, start, end, interval='1d'):
+      """
+      Fetch bars for several tickers over the same range.
+
+      Providers with a real batch API override this. The default fetches
+      one ticker at a time and reports failures as empty frames.
+
+      Returns:
+          dict of ticker -> normalized OHLCV DataFrame (possibly empty)
+      """
+      frames = {}
+      for ticker in tickers:
+          try:
+              frames[ticker] = self.fetch(ticker, start, end, interval)
+          except Exception:
+              frames[ticker] = pd.DataFrame()
+      return frames
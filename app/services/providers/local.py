@@ -0,0 +1,45 @@
+"""Market data provider backed by a local drop folder."""
+
+from pathlib import Path
+
+import pandas as pd
+
+from app.services.bar_store import normalize_bars
+from app.services.providers.base import MarketDataProvider
+
+
+class LocalDirectoryProvider(MarketDataProvider):
+  """
+  Bars read from Parquet or CSV files in a directory.
+
+  For ticker ``SPY`` and interval ``5m`` the first existing file of
+  ``SPY_5m.parquet``, ``SPY_5m.csv`` is used; daily bars may also be named
+  plain ``SPY.parquet`` / ``SPY.csv``. CSVs need the timestamp in the first
+  column and the usual Open/High/Low/Close/Volume headers.
+  """
+
+  name = 'local'
+
+  def __init__(self, root='data/local'):
+      self.root = Path(root)
+
+  def _candidates(self, ticker, interval):
+      stems = [f"{ticker}_{interval}"]
+      if interval == '1d':
+          stems.append(ticker)
+      return [self.root / f"{stem}{ext}" for stem in stems for ext in ('.parquet', '.csv')]
+
+  def fetch(self, ticker, start, end, interval='1d'):
+      for path in self._candidates(ticker, interval):
+          if not path.exists():
+              continue
+
+          if path.suffix == '.parquet':
+              df = pd.read_parquet(path)
+          else:
+              df = pd.read_csv(path, index_col=0, parse_dates=True)
+
+          df = normalize_bars(df)
+          return df[(df.index >= start) & (df.index < end)]
+
+      return pd.DataFrame()
@@ -0,0 +1,64 @@
+"""Yahoo Finance market data provider."""
+
+import yfinance as yf
+import pandas as pd
+
+from app.services.bar_store import normalize_bars
+from app.services.providers.base import MarketDataProvider
+
+
+class YahooProvider(MarketDataProvider):
+  """Bars from yfinance with split/dividend-adjusted prices."""
+
+  name = 'yahoo'
+
+  # yfinance's limits on intraday history
+  intraday_history = {'1m': 30, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '1h': 730}
+
+  @property
+  def cache_namespace(self):
+      # Yahoo bars predate providers and live at the cache root
+      return None
+
+  def fetch(self, ticker, start, end, interval='1d'):
+      df = yf.download(
+          ticker,
+          start=start.strftime('%Y-%m-%d'),
+          end=end.strftime('%Y-%m-%d'),
+          interval=interval,
+          progress=False,
+          auto_adjust=True
+      )
+
+      if df.empty:
+          return df
+
+      return normalize_bars(df)
+
+  def fetch_many(self, tickers, start, end, interval='1d'):
+      """
+      Download several tickers in one yfinance call.
+
+      Tickers yfinance could not resolve come back as empty frames.
+      """
+      df = yf.download(
+          tickers,
+          start=start.strftime('%Y-%m-%d'),
+          end=end.strftime('%Y-%m-%d'),
+          interval=interval,
+          progress=False,
+          auto_adjust=True,
+          group_by='ticker',
+          threads=True
+      )
+
+      frames = {}
+      for ticker in tickers:
+          if df.empty or ticker not in df.columns.get_level_values(0):
+              frames[ticker] = pd.DataFrame()
+              continue
+
+          bars = df[ticker].dropna(how='all')
+          frames[ticker] = normalize_bars(bars) if not bars.empty else bars
+
+      return frames
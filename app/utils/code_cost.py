@@ -0,0 +1,385 @@
+"""Static estimate of how strategy code scales with the number of bars."""
+
+import ast
+
+
+# Measured per-call costs (seconds, pandas 2.x on one core); they only
+# need to be right to within a small factor
+STATEMENT_SECONDS = 1e-7
+# Share of iterations assumed to take each branch of an if/else
+BRANCH_WEIGHT = 0.5
+SCALAR_COSTS = {
+    # accessor: (read, write)
+    'iloc': (6e-6, 35e-6),
+    'loc': (6e-6, 35e-6),
+    'at': (2e-6, 22e-6),
+    'iat': (2e-6, 22e-6),
+}
+ROW_ITERATORS = {
+    'iterrows': 35e-6,
+    'itertuples': 1e-6,
+}
+APPLY_METHODS = {'apply', 'map', 'applymap', 'transform', 'agg', 'aggregate'}
+WINDOW_METHODS = {'rolling', 'expanding', 'ewm', 'resample', 'groupby'}
+ELEMENT_APPLY_SECONDS = 5e-7
+ROW_APPLY_SECONDS = 5e-6
+WINDOW_APPLY_SECONDS = {True: 3e-6, False: 45e-6}  # by raw=
+
+# len() of these is a parameter count, not a bar count
+LITERALS = (ast.List, ast.Tuple, ast.Dict, ast.Set)
+
+# What each kind of finding means and how to avoid it
+ADVICE = {
+    'row_loop': (
+        'Python loop over every bar',
+        'Compute the rule for all bars at once with Series operations '
+        '(shift, rolling, cumsum, np.where, ffill) instead of iterating'
+    ),
+    'scalar_write': (
+        'Scalar write inside a per-bar loop',
+        'Build the whole column in one expression (boolean masks, np.where, '
+        'ffill) instead of assigning one element at a time'
+    ),
+    'apply': (
+        'apply/map with a Python function runs it once per element',
+        'Use the built-in vectorized equivalent (column arithmetic, '
+        'rolling().max(), np.where) instead of a lambda'
+    ),
+}
+
+
+class CostReport:
+  """
+  Row-wise constructs found in strategy code and what they cost.
+
+  Each finding is a dict with:
+      kind: 'row_loop', 'scalar_write' or 'apply'
+      line: Line number in the source
+      code: That source line
+      order: Power of the bar count the cost grows with (1 for a loop
+          over the bars, 2 for such a loop inside another one)
+      seconds_per_bar: Coefficient c of the cost c * bars ** order
+      message, suggestion: What was found and how to vectorize it
+  """
+
+  def __init__(self, findings):
+      self.findings = findings
+
+  def estimate_seconds(self, bars):
+      """Estimated run time of the flagged constructs on ``bars`` bars."""
+      return sum(f['seconds_per_bar'] * bars ** f['order'] for f in self.findings)
+
+  def warnings(self, bars=None):
+      """
+      The findings as structured warnings, worst first.
+
+      With ``bars``, each warning also carries ``estimated_seconds`` for
+      a frame of that many bars.
+      """
+      warnings = [dict(f) for f in self.findings]
+      if bars is not None:
+          for warning in warnings:
+              warning['estimated_seconds'] = warning['seconds_per_bar'] * bars ** warning['order']
+      return sorted(warnings, key=lambda w: (-w['order'], -w['seconds_per_bar'], w['line']))
+
+  def __bool__(self):
+      return bool(self.findings)
+
+  def __repr__(self):
+      return f"CostReport(findings={len(self.findings)})"
+
+
+def analyze_cost(code, tree=None):
+  """
+  Find per-bar Python work in strategy code without running it.
+
+  Flags loops over the bars (``for i in range(len(df))``, ``iterrows``,
+  comprehensions and ``while`` loops bounded by ``len(df)``), scalar
+  ``.iloc``/``.loc``/``.at``/``.iat`` writes inside them, and ``apply``
+  (or ``map``, ``transform``, ``rolling().apply``) with a lambda or a
+  function defined in the code. Scalar reads and statements in a loop
+  add to the loop's cost.
+
+  Args:
+      code: Strategy source
+      tree: ``ast.parse(code)``, if the caller already has it
+
+  Returns:
+      CostReport, empty if the analysis fails on code it does not expect
+
+  Raises:
+      SyntaxError: If ``code`` does not parse
+  """
+  if tree is None:
+      tree = ast.parse(code)
+
+  analyzer = _Analyzer(code.splitlines(), tree)
+  try:
+      analyzer.visit(tree)
+  except Exception:
+      # The estimate is advisory; it must never stop the code from running
+      return CostReport([])
+  return CostReport(analyzer.findings)
+
+
+class _Analyzer(ast.NodeVisitor):
+  def __init__(self, lines, tree):
+      self.lines = lines
+      self.findings = []
+      # Row loops around the node being visited; the innermost one is
+      # charged for the scalar reads and statements in its body
+      self.loops = []
+      # Times the current code runs per bar (from loops over constant
+      # ranges around it)
+      self.repeat = 1
+
+      functions = [node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+      self.functions = {f.name for f in functions}
+      # Function parameters, e.g. strategy's df; their columns hold bars
+      self.frames = {arg.arg for f in functions for arg in f.args.args + f.args.kwonlyargs}
+      self.literals = _literal_names(tree)
+      self.sized = _bar_count_names(tree, self.frames, self.literals)
+
+  def visit(self, node):
+      if self.loops and isinstance(node, ast.stmt):
+          self.loops[-1]['seconds_per_bar'] += STATEMENT_SECONDS * self.repeat
+      return super().visit(node)
+
+  def visit_For(self, node):
+      self.visit(node.iter)
+      self.visit(node.target)
+      self._loop(node, node.iter, lambda: self._visit_all(node.body))
+      self._visit_all(node.orelse)
+
+  visit_AsyncFor = visit_For
+
+  def visit_While(self, node):
+      self.visit(node.test)
+      if _bounded_by_bars(node.test, self.sized, self.literals):
+          self._row_loop(node, STATEMENT_SECONDS, lambda: self._visit_all([node.test] + node.body))
+      else:
+          self._visit_all(node.body)
+      self._visit_all(node.orelse)
+
+  def visit_If(self, node):
+      self.visit(node.test)
+      outer_repeat = self.repeat
+      if self.loops:
+          self.repeat *= BRANCH_WEIGHT
+      try:
+          self._visit_all(node.body)
+          self._visit_all(node.orelse)
+      finally:
+          self.repeat = outer_repeat
+
+  def visit_ListComp(self, node):
+      self._generators(node, node.generators)
+
+  visit_SetComp = visit_GeneratorExp = visit_DictComp = visit_ListComp
+
+  def visit_Subscript(self, node):
+      accessor = _scalar_accessor(node)
+      if accessor is not None and self.loops:
+          read, write = SCALAR_COSTS[accessor]
+          if isinstance(node.ctx, ast.Store):
+              self._find('scalar_write', node, write * self.repeat, len(self.loops),
+                         f'Scalar .{accessor} write inside a per-bar loop')
+          else:
+              self.loops[-1]['seconds_per_bar'] += read * self.repeat
+      self.generic_visit(node)
+
+  def visit_Call(self, node):
+      cost = self._apply_cost(node)
+      if cost is not None:
+          self._find('apply', node, cost * self.repeat, len(self.loops) + 1)
+      self.generic_visit(node)
+
+  def _visit_all(self, nodes):
+      for node in nodes:
+          self.visit(node)
+
+  def _generators(self, node, generators):
+      """Visit a comprehension's generators as the nested loops they are."""
+      if not generators:
+          self._visit_all([node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt])
+          return
+
+      generator = generators[0]
+      self.visit(generator.iter)
+      self.visit(generator.target)
+      self._loop(generator.iter, generator.iter,
+                 lambda: (self._visit_all(generator.ifs), self._generators(node, generators[1:])))
+
+  def _loop(self, node, iterable, visit_body):
+      """Visit a loop body, as a row loop if ``iterable`` walks the bars."""
+      cost = self._row_iteration(iterable)
+      if cost is not None:
+          self._row_loop(node, cost, visit_body)
+          return
+
+      times = _constant_range(iterable)
+      outer_repeat = self.repeat
+      if times is not None:
+          self.repeat *= times
+      try:
+          visit_body()
+      finally:
+          self.repeat = outer_repeat
+
+  def _row_loop(self, node, cost, visit_body):
+      finding = self._find('row_loop', node, cost * self.repeat, len(self.loops) + 1)
+      self.loops.append(finding)
+      try:
+          visit_body()
+      finally:
+          self.loops.pop()
+
+  def _find(self, kind, node, seconds_per_bar, order, message=None):
+      default_message, suggestion = ADVICE[kind]
+      line = getattr(node, 'lineno', 0)
+      finding = {
+          'kind': kind,
+          'line': line,
+          'code': self.lines[line - 1].strip() if 0 < line <= len(self.lines) else '',
+          'order': order,
+          'seconds_per_bar': seconds_per_bar,
+          'message': message or default_message,
+          'suggestion': suggestion,
+      }
+      self.findings.append(finding)
+      return finding
+
+  def _row_iteration(self, node):
+      """Per-bar cost of iterating ``node``, or None if it is not per bar."""
+      if not isinstance(node, ast.Call):
+          return STATEMENT_SECONDS if self._is_column(node) else None
+
+      name = _call_name(node)
+      method = isinstance(node.func, ast.Attribute)
+      if name == 'range':
+          return STATEMENT_SECONDS if any(_is_bar_count(arg, self.sized, self.literals) for arg in node.args) else None
+      if method and name in ROW_ITERATORS:
+          return ROW_ITERATORS[name]
+      if method and name in ('to_numpy', 'tolist', 'to_list'):
+          return STATEMENT_SECONDS
+      if name in ('enumerate', 'zip', 'reversed'):
+          costs = [self._row_iteration(arg) for arg in node.args]
+          costs = [cost for cost in costs if cost is not None]
+          return max(costs) if costs else None
+      return None
+
+  def _is_column(self, node):
+      """Whether ``node`` is a column or index of a frame: df['Close'], df.Close.values, ..."""
+      if isinstance(node, ast.Attribute):
+          if node.attr in ('values', 'index'):
+              return True
+          return isinstance(node.value, ast.Name) and node.value.id in self.frames
+      if isinstance(node, ast.Subscript):
+          return (isinstance(node.value, ast.Name) and node.value.id in self.frames
+                  and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str))
+      return False
+
+  def _apply_cost(self, node):
+      """Per-element (row, window) cost of an apply with a Python function, or None."""
+      func = node.func
+      if not isinstance(func, ast.Attribute) or func.attr not in APPLY_METHODS:
+          return None
+
+      callback = node.args[0] if node.args else _keyword(node, 'func') or _keyword(node, 'arg')
+      if not (isinstance(callback, ast.Lambda)
+              or isinstance(callback, ast.Name) and callback.id in self.functions):
+          return None
+
+      receiver = func.value
+      if isinstance(receiver, ast.Call) and _call_name(receiver) in WINDOW_METHODS:
+          raw = _keyword(node, 'raw')
+          return WINDOW_APPLY_SECONDS[isinstance(raw, ast.Constant) and raw.value is True]
+      axis = _keyword(node, 'axis')
+      if isinstance(axis, ast.Constant) and axis.value in (1, 'columns'):
+          return ROW_APPLY_SECONDS
+      return ELEMENT_APPLY_SECONDS
+
+
+def _literal_names(tree):
+  """Names assigned a literal list, tuple, dict or set."""
+  return {
+      target.id
+      for node in ast.walk(tree) if isinstance(node, ast.Assign) and isinstance(node.value, LITERALS)
+      for target in node.targets if isinstance(target, ast.Name)
+  }
+
+
+def _bar_count_names(tree, frames, literals):
+  """Names assigned the bar count, e.g. ``n = len(df)``."""
+  names = set()
+  # Two passes, so counts derived from other counts are found too
+  for _ in range(2):
+      for node in ast.walk(tree):
+          if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                  and isinstance(node.targets[0], ast.Name)
+                  and node.targets[0].id not in frames
+                  and _is_bar_count(node.value, names, literals)):
+              names.add(node.targets[0].id)
+  return names
+
+
+def _is_bar_count(node, sized, literals):
+  """Whether ``node`` evaluates to (about) the number of bars."""
+  if isinstance(node, ast.Call):
+      if _call_name(node) != 'len' or len(node.args) != 1:
+          return False
+      arg = node.args[0]
+      return not (isinstance(arg, LITERALS) or isinstance(arg, ast.Name) and arg.id in literals)
+  if isinstance(node, ast.Name):
+      return node.id in sized
+  if isinstance(node, ast.BinOp):
+      return _is_bar_count(node.left, sized, literals) or _is_bar_count(node.right, sized, literals)
+  if isinstance(node, ast.Attribute):
+      return node.attr == 'size'
+  if isinstance(node, ast.Subscript):
+      return isinstance(node.value, ast.Attribute) and node.value.attr == 'shape'
+  return False
+
+
+def _bounded_by_bars(test, sized, literals):
+  return any(
+      isinstance(node, ast.Compare)
+      and any(_is_bar_count(n, sized, literals) for n in [node.left] + node.comparators)
+      for node in ast.walk(test)
+  )
+
+
+def _scalar_accessor(node):
+  value = node.value
+  if isinstance(value, ast.Attribute) and value.attr in SCALAR_COSTS:
+      return value.attr
+  return None
+
+
+def _constant_range(node):
+  if isinstance(node, ast.Call) and _call_name(node) == 'range' and node.args:
+      bounds = [arg.value for arg in node.args if isinstance(arg, ast.Constant)]
+      if len(bounds) == len(node.args) and all(isinstance(b, int) for b in bounds):
+          try:
+              return max(len(range(*bounds)), 1)
+          except (ValueError, OverflowError):
+              # Zero step (fails when run) or more values than fit an int
+              return None
+  return None
+
+
+def _call_name(node):
+  func = node.func
+  if isinstance(func, ast.Name):
+      return func.id
+  if isinstance(func, ast.Attribute):
+      return func.attr
+  return None
+
+
+def _keyword(node, name):
+  for keyword in node.keywords:
+      if keyword.arg == name:
+          return keyword.value
+  return None
+
@@ -0,0 +1,118 @@
+"""
+Trading costs of a backtest as a per-bar return drag.
+
+Costs are fractions of the position's notional (1 = all equity), so
+they subtract directly from the strategy returns the metrics are built
+from. Fills are charged on the size traded: moving from position ``a``
+to ``b`` trades ``abs(b - a)``, so resizing a trade pays one fill on
+the difference and reversing from long to short pays a close and an
+open. The part of a fill that reduces or closes a trade (a run of the
+same non-zero position, as in the trade ledger) is charged on that
+trade's last bar, the part that opens or adds on the new run's first
+bar, and holding costs on every bar held, so a trade's costs stay
+within its bars. A trade still open on the last bar pays no closing
+fill.
+
+Settings (all default to 0, i.e. frictionless fills at the close):
+    commission: Fixed commission per fill, in account currency
+    commission_bps: Commission per fill, in basis points of the notional
+    slippage_bps: Slippage per fill, in basis points of the notional
+    spread_bps: Quoted bid/ask spread in basis points; a fill crosses
+        half of it
+    borrow_rate: Annual borrow fee on short positions (0.03 = 3%)
+    financing_rate: Annual financing rate on long exposure above 1x
+    capital: Account size the fixed commission is relative to
+        (default 100000)
+"""
+
+import numpy as np
+
+
+DEFAULT_COSTS = {
+    'commission': 0.0,
+    'commission_bps': 0.0,
+    'slippage_bps': 0.0,
+    'spread_bps': 0.0,
+    'borrow_rate': 0.0,
+    'financing_rate': 0.0,
+    'capital': 100_000.0,
+}
+
+
+def parse_costs(settings):
+  """
+  Cost settings from a request, completed with the defaults.
+
+  Args:
+      settings: dict of the settings above, or None for no costs
+
+  Returns:
+      dict with every setting as a float
+
+  Raises:
+      ValueError: For unknown settings or values that are not
+          non-negative numbers (capital must be positive)
+  """
+  if settings is None:
+      return dict(DEFAULT_COSTS)
+  if not isinstance(settings, dict):
+      raise ValueError('costs must be an object')
+
+  unknown = set(settings) - set(DEFAULT_COSTS)
+  if unknown:
+      raise ValueError(f"Unknown cost settings: {', '.join(sorted(unknown))}. Use: {', '.join(DEFAULT_COSTS)}")
+
+  costs = dict(DEFAULT_COSTS)
+  for name, value in settings.items():
+      if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value) or value < 0:
+          raise ValueError(f"Cost setting '{name}' must be a non-negative number, got {value!r}")
+      costs[name] = float(value)
+  if costs['capital'] <= 0:
+      raise ValueError('Cost setting \'capital\' must be positive')
+  return costs
+
+
+def is_frictionless(costs):
+  """True if ``costs`` (from parse_costs) charge nothing."""
+  return costs is None or not any(value for name, value in costs.items() if name != 'capital')
+
+
+def bar_costs(position, costs, periods_per_year=252):
+  """
+  Cost of each bar as a fraction of equity.
+
+  Args:
+      position: float64 array of the position held over each bar's
+          return (see held_signals); NaN counts as flat
+      costs: Settings from parse_costs
+      periods_per_year: Bars per year, to spread the annual rates
+
+  Returns:
+      float64 array like ``position``, or None if ``costs`` charge nothing
+  """
+  if is_frictionless(costs):
+      return None
+
+  position = np.nan_to_num(position, nan=0.0)
+  size = np.abs(position)
+  previous = np.r_[0.0, position[:-1]]
+  previous_size = np.abs(previous)
+
+  # Split each change into the size that closes the old position and the
+  # size that opens the new one; on the same side only the difference trades
+  same_side = np.sign(previous) == np.sign(position)
+  reduced = np.where(same_side, np.maximum(previous_size - size, 0), previous_size)
+  added = np.where(same_side, np.maximum(size - previous_size, 0), size)
+  # Reductions are charged on the last bar of the position they reduce
+  closed = np.zeros(len(position))
+  closed[:-1] = reduced[1:]
+
+  per_fill = (costs['commission_bps'] + costs['slippage_bps'] + costs['spread_bps'] / 2) / 10_000
+  fills = (closed > 0).astype(np.float64) + (added > 0)
+  charges = per_fill * (closed + added) + fills * (costs['commission'] / costs['capital'])
+
+  if costs['borrow_rate']:
+      charges += np.maximum(-position, 0) * (costs['borrow_rate'] / periods_per_year)
+  if costs['financing_rate']:
+      charges += np.maximum(position - 1, 0) * (costs['financing_rate'] / periods_per_year)
+  return charges
@@ -0,0 +1,717 @@
+"""NumPy implementations of the most used pandas-ta indicators."""
+
+import functools
+import sys
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Indicator name -> NumPy implementation with pandas-ta's call signature
+INDICATORS = {}
+
+# pandas-ta's non_zero_range nudge
+_EPSILON = sys.float_info.epsilon
+
+# Rolling sums restart their running total every _SUM_BLOCK values, which
+# keeps cumsum rounding error at the level of pandas' own rolling kernels
+_SUM_BLOCK = 4096
+
+# Upper bound on the block length of the exponential-smoothing scan
+_SCAN_BLOCK = 4096
+
+# Windows up to this long get their variance one lag at a time; longer
+# ones are reduced in chunks of about _VAR_CHUNK_VALUES values
+_VAR_LAG_LIMIT = 64
+_VAR_CHUNK_VALUES = 1 << 20
+
+
+class Unsupported(Exception):
+  """The call needs an option or input only pandas-ta handles."""
+
+
+def _indicator(*inputs, probes=({},)):
+  """
+  Register a fast indicator.
+
+  Args:
+      inputs: Names of the Series parameters, in order (df.ta looks them
+          up as OHLCV columns)
+      probes: Parameter sets compared against pandas-ta by :func:`verify`
+  """
+  def register(fn):
+      fn.inputs = inputs
+      fn.probes = probes
+      INDICATORS[fn.__name__] = fn
+      return fn
+  return register
+
+
+def routed(fn, fallback):
+  """Call ``fn``, or ``fallback`` if it raises Unsupported."""
+  @functools.wraps(fallback)
+  def indicator(*args, **kwargs):
+      try:
+          return fn(*args, **kwargs)
+      except Unsupported:
+          return fallback(*args, **kwargs)
+  return indicator
+
+
+def call_frame(fn, df, args, kwargs):
+  """
+  Run ``fn`` the way ``df.ta.<name>(*args, **kwargs)`` would.
+
+  Input Series are taken from the columns named by ``kwargs`` (e.g.
+  ``close='Mid'``) or the OHLCV column of the same name, matched
+  case-insensitively like pandas-ta does.
+
+  Raises:
+      Unsupported: If pandas-ta's accessor should handle the call
+  """
+  # Accessor methods take their parameters in their own order
+  if len(args) > 1 or kwargs.get('append'):
+      raise Unsupported()
+  kwargs = dict(kwargs)
+  kwargs.pop('append', None)
+
+  inputs = [_column(df, kwargs.pop(name, name)) for name in fn.inputs]
+  return fn(*inputs, *args, **kwargs)
+
+
+def verify(module):
+  """
+  Fast indicators that reproduce ``module`` (pandas-ta) on probe data.
+
+  Each indicator is compared on float64 and float32 bars with each of its
+  probe parameter sets; one that differs in names, shape or values (e.g.
+  because the installed pandas-ta changed a formula) is left out, so its
+  calls keep going to pandas-ta.
+
+  Returns:
+      dict of indicator name -> fast implementation
+  """
+  frames = [_probe_frame(np.float64), _probe_frame(np.float32)]
+  verified = {}
+
+  for name, fn in INDICATORS.items():
+      reference = getattr(module, name, None)
+      if not callable(reference):
+          continue
+
+      try:
+          same = all(
+              _same(fn(*inputs, **params), reference(*inputs, **params))
+              for df in frames
+              for inputs in [[df[col.capitalize()] for col in fn.inputs]]
+              for params in fn.probes
+          )
+      except Exception:
+          same = False
+
+      if same:
+          verified[name] = fn
+
+  return verified
+
+
+# Indicators. Defaults, validation, names and categories follow pandas-ta.
+# sma and ema are left to it: they are one pandas rolling/ewm call there,
+# already compiled, and timed no faster here.
+
+@_indicator('close', probes=({}, {'length': 2}, {'length': 21, 'drift': 2}))
+def rsi(close, length=None, scalar=None, mamode=None, talib=None, drift=None, offset=None, **kwargs):
+  """Relative Strength Index."""
+  _plain(talib, kwargs)
+  _mamode(mamode, 'rma')
+  length = _length(length, 14)
+  scalar = _scalar(scalar, 100)
+  drift = _drift(drift)
+  x = _values(close, length + 1)
+
+  negative = _diff(x, drift)
+  positive = negative.copy()
+  positive[positive < 0] = 0
+  negative[negative > 0] = 0
+
+  positive_avg = _rma(positive, length)
+  negative_avg = _rma(negative, length)
+  with np.errstate(divide='ignore', invalid='ignore'):
+      result = scalar * positive_avg / (positive_avg + np.abs(negative_avg))
+
+  return _series(result, close.index, f"RSI_{length}", 'momentum', offset)
+
+
+@_indicator('close', probes=({}, {'fast': 5, 'slow': 35, 'signal': 5}))
+def macd(close, fast=None, slow=None, signal=None, talib=None, offset=None, **kwargs):
+  """Moving Average Convergence Divergence."""
+  _plain(talib, kwargs)
+  fast = _length(fast, 12)
+  slow = _length(slow, 26)
+  signal = _length(signal, 9)
+  if slow < fast:
+      fast, slow = slow, fast
+  x = _values(close, slow + signal - 1)
+
+  line = _ema(x, fast) - _ema(x, slow)
+  first = _first_valid(line)
+  signal_line = np.full(len(line), np.nan)
+  signal_line[first:] = _ema(line[first:], signal)
+  histogram = line - signal_line
+
+  props = f"_{fast}_{slow}_{signal}"
+  return _frame({
+      f"MACD{props}": line,
+      f"MACDh{props}": histogram,
+      f"MACDs{props}": signal_line,
+  }, close.index, f"MACD{props}", 'momentum', offset)
+
+
+@_indicator('close', probes=({}, {'length': 20, 'lower_std': 2.0, 'upper_std': 2.0}, {'length': 10, 'ddof': 1}))
+def bbands(close, length=None, lower_std=None, upper_std=None, ddof=None, mamode=None, talib=None, offset=None, **kwargs):
+  """Bollinger Bands."""
+  _plain(talib, kwargs)
+  _mamode(mamode, 'sma')
+  length = _length(length, 5)
+  lower_std = _positive(lower_std, 2.0)
+  upper_std = _positive(upper_std, 2.0)
+  ddof = int(ddof) if isinstance(ddof, int) and 0 <= ddof < length else 1
+  x = _values(close, length)
+
+  x64 = x.astype(np.float64)
+  constant = _constant_windows(x64, length)
+  mid = _rolling_mean(x64, length, constant)
+  std_dev = np.sqrt(_rolling_var(x64, length, ddof, constant))
+  lower = mid - lower_std * std_dev
+  upper = mid + upper_std * std_dev
+
+  ulr = _non_zero_range(upper, lower)
+  with np.errstate(divide='ignore', invalid='ignore'):
+      bandwidth = 100 * ulr / mid
+      percent = _non_zero_range(x, lower) / ulr
+
+  props = f"_{length}_{lower_std}_{upper_std}"
+  return _frame({
+      f"BBL{props}": lower,
+      f"BBM{props}": mid,
+      f"BBU{props}": upper,
+      f"BBB{props}": bandwidth,
+      f"BBP{props}": percent,
+  }, close.index, f"BBANDS{props}", 'volatility', offset)
+
+
+@_indicator('high', 'low', 'close', probes=({}, {'length': 5}, {'length': 7, 'drift': 2, 'prenan': True}))
+def atr(high, low, close, length=None, mamode=None, talib=None, prenan=None, drift=None, offset=None, **kwargs):
+  """Average True Range."""
+  _plain(talib, kwargs)
+  _mamode(mamode, 'rma')
+  length = _length(length, 14)
+  prenan = prenan if isinstance(prenan, bool) else False
+  drift = _drift(drift)
+  h, l, c = (_values(s, length + 1, finite=True) for s in (high, low, close))
+
+  result = _atr(h, l, c, length, drift, prenan)
+  return _series(result, close.index, f"ATRr_{length}", 'volatility', offset)
+
+
+@_indicator('high', 'low', 'close', probes=({}, {'k': 5, 'd': 5, 'smooth_k': 1}))
+def stoch(high, low, close, k=None, d=None, smooth_k=None, mamode=None, talib=None, offset=None, **kwargs):
+  """Stochastic Oscillator."""
+  _plain(talib, kwargs)
+  _mamode(mamode, 'sma')
+  k = _length(k, 14)
+  d = _length(d, 3)
+  smooth_k = _length(smooth_k, 3)
+  h, l, c = (_values(s, k + d + smooth_k, finite=True) for s in (high, low, close))
+
+  lowest_low = _rolling_extreme(l.astype(np.float64), k, np.minimum)
+  highest_high = _rolling_extreme(h.astype(np.float64), k, np.maximum)
+  with np.errstate(divide='ignore', invalid='ignore'):
+      stoch_ = 100 * (c - lowest_low) / _non_zero_range(highest_high, lowest_low)
+
+  stoch_k = _rolling_mean(stoch_, smooth_k)
+  stoch_d = _rolling_mean(stoch_k, d)
+
+  props = f"_{k}_{d}_{smooth_k}"
+  return _frame({
+      f"STOCHk{props}": stoch_k,
+      f"STOCHd{props}": stoch_d,
+      f"STOCHh{props}": stoch_k - stoch_d,
+  }, close.index, f"STOCH{props}", 'momentum', offset)
+
+
+@_indicator('high', 'low', 'close', probes=({}, {'length': 7, 'signal_length': 10}))
+def adx(high, low, close, length=None, signal_length=None, adxr_length=None, scalar=None,
+        talib=None, tvmode=None, mamode=None, drift=None, offset=None, **kwargs):
+  """Average Directional Movement Index."""
+  _plain(talib, kwargs)
+  _mamode(mamode, 'rma')
+  if tvmode:
+      raise Unsupported('tvmode')
+  length = _length(length, 14)
+  signal_length = _length(signal_length, length)
+  adxr_length = _length(adxr_length, 2)
+  scalar = _scalar(scalar, 100)
+  drift = _drift(drift)
+  # Its atr needs one bar more than the length
+  needed = max(length + 1, signal_length, adxr_length)
+  h, l, c = (_values(s, needed, finite=True) for s in (high, low, close))
+
+  # pandas-ta takes the atr over one-bar true ranges whatever the drift
+  atr_ = _atr(h, l, c, length, 1, prenan=True)
+
+  up = _diff(h, drift)
+  dn = -_diff(l, drift)
+  pos = ((up > dn) & (up > 0)) * up
+  neg = ((dn > up) & (dn > 0)) * dn
+  pos[np.abs(pos) < _EPSILON] = 0
+  neg[np.abs(neg) < _EPSILON] = 0
+
+  with np.errstate(divide='ignore', invalid='ignore'):
+      k = scalar / atr_
+      dmp = k * _rma(pos.astype(np.float64), length)
+      dmn = k * _rma(neg.astype(np.float64), length)
+      dx = scalar * np.abs(dmp - dmn) / (dmp + dmn)
+
+  adx_ = _rma(dx, signal_length)
+  adxr = 0.5 * (adx_ + _shift(adx_, adxr_length))
+
+  return _frame({
+      f"ADX_{signal_length}": adx_,
+      f"ADXR_{signal_length}_{adxr_length}": adxr,
+      f"DMP_{length}": dmp,
+      f"DMN_{length}": dmn,
+  }, close.index, f"ADX_{signal_length}", 'trend', offset)
+
+
+@_indicator('high', 'low', probes=({}, {'lower_length': 10, 'upper_length': 30}))
+def donchian(high, low, lower_length=None, upper_length=None, offset=None, **kwargs):
+  """Donchian Channels."""
+  # pandas-ta's donchian has no TA-Lib mode and ignores the option
+  kwargs.pop('talib', None)
+  _plain(None, kwargs)
+  lower_length = _length(lower_length, 20)
+  upper_length = _length(upper_length, 20)
+  h = _values(high, max(lower_length, upper_length), finite=True)
+  l = _values(low, max(lower_length, upper_length), finite=True)
+
+  lower = _rolling_extreme(l.astype(np.float64), lower_length, np.minimum)
+  upper = _rolling_extreme(h.astype(np.float64), upper_length, np.maximum)
+  mid = 0.5 * (lower + upper)
+
+  props = f"_{lower_length}_{upper_length}"
+  return _frame({
+      f"DCL{props}": lower,
+      f"DCM{props}": mid,
+      f"DCU{props}": upper,
+  }, high.index, f"DC{props}", 'volatility', offset)
+
+
+@_indicator('high', 'low', 'close', probes=({}, {'length': 10, 'scalar': 1.5}, {'tr': False}))
+def kc(high, low, close, length=None, scalar=None, tr=None, mamode=None, offset=None, **kwargs):
+  """Keltner Channels."""
+  # pandas-ta's kc has no TA-Lib mode and ignores the option
+  kwargs.pop('talib', None)
+  _plain(None, kwargs)
+  _mamode(mamode, 'ema')
+  length = _length(length, 20)
+  scalar = _positive(scalar, 2)
+  h, l, c = (_values(s, length + 1, finite=True) for s in (high, low, close))
+
+  if not isinstance(tr, bool) or tr:
+      range_ = _true_range(h, l, c, 1)
+  else:
+      range_ = _non_zero_range(h, l)
+
+  basis = _ema(c, length)
+  band = _ema(range_, length)
+  lower = basis - scalar * band
+  upper = basis + scalar * band
+
+  props = f"e_{length}_{scalar}"
+  return _frame({
+      f"KCL{props}": lower,
+      f"KCB{props}": basis,
+      f"KCU{props}": upper,
+  }, close.index, f"KC{props}", 'volatility', offset)
+
+
+# Kernels. All work on NumPy arrays and return float64 arrays.
+
+def _rolling_mean(x, n, constant=None):
+  """
+  Mean of each full window of ``n`` values, like pandas-ta's sma (a
+  convolution with ``ones(n) / n``).
+  """
+  result = _rolling_sum(x, n) / n
+  # Windows of one repeated value get the convolution's exact rounding,
+  # which decides e.g. bbands' percent where the bands collapse: numba
+  # adds up the window's products one at a time (it only goes through
+  # BLAS when SciPy is installed, and verify() catches the difference)
+  if constant is None:
+      constant = _constant_windows(x, n)
+  term = x[constant].astype(np.float64) * (1.0 / n)
+  total = np.zeros(len(term))
+  for _ in range(n):
+      total += term
+  result[constant] = total
+  return result
+
+
+def _rolling_sum(x, n):
+  """Sum of each window of ``n`` values; NaN unless all are valid."""
+  size = len(x)
+  result = np.full(size, np.nan)
+  if size < n:
+      return result
+
+  missing = np.isnan(x)
+  gaps = missing.any()
+  block = max(_SUM_BLOCK, n)
+  blocks = -(-size // block)
+  padded = np.zeros(blocks * block)
+  padded[:size] = np.where(missing, 0.0, x) if gaps else x
+  local = padded.reshape(blocks, block).cumsum(axis=1)
+
+  total = np.empty_like(local)
+  total[0, :n - 1] = np.nan
+  total[:, n - 1] = local[:, n - 1]
+  total[:, n:] = local[:, n:] - local[:, :-n]
+  # Windows that start in the previous block add that block's tail
+  total[1:, :n - 1] = local[1:, :n - 1] + (local[:-1, -1:] - local[:-1, block - n:block - 1])
+
+  result[:] = total.ravel()[:size]
+  if gaps:
+      counts = np.concatenate(([0], np.cumsum(missing)))
+      result[n - 1:][counts[n:] != counts[:-n]] = np.nan
+  return result
+
+
+def _rolling_var(x, n, ddof, constant=None):
+  """Variance of each full window of ``n`` values, like rolling(n).var()."""
+  size = len(x)
+  result = np.full(size, np.nan)
+  if size < n:
+      return result
+
+  if n <= _VAR_LAG_LIMIT:
+      # Two passes like numpy's var: the window mean, then the squared
+      # deviations from it, summed one lag at a time
+      mean = _rolling_sum(x, n)[n - 1:] / n
+      squares = np.zeros(size - n + 1)
+      for lag in range(n):
+          deviation = x[lag:size - n + 1 + lag] - mean
+          squares += deviation * deviation
+      result[n - 1:] = squares / (n - ddof)
+  else:
+      windows = sliding_window_view(x, n)
+      chunk = max(1, _VAR_CHUNK_VALUES // n)
+      for start in range(0, len(windows), chunk):
+          block = windows[start:start + chunk]
+          result[n - 1 + start:n - 1 + start + len(block)] = block.var(axis=1, ddof=ddof)
+
+  if constant is None:
+      constant = _constant_windows(x, n)
+  result[constant] = 0.0
+  return result
+
+
+def _constant_windows(x, n):
+  """Mask of windows of ``n`` values that are all the same number."""
+  size = len(x)
+  constant = np.zeros(size, dtype=bool)
+  if size < n:
+      return constant
+
+  # Count value changes (NaN always counts as one) inside each window
+  changes = np.zeros(size, dtype=np.int64)
+  np.cumsum(x[1:] != x[:-1], out=changes[1:])
+  constant[n - 1:] = changes[n - 1:] == changes[:size - n + 1]
+  constant &= ~np.isnan(x)
+  return constant
+
+
+def _rolling_extreme(x, n, ufunc):
+  """
+  Rolling max (``np.maximum``) or min (``np.minimum``) in O(len(x)).
+
+  van Herk/Gil-Werman: with the series cut into blocks of ``n``, every
+  window is the suffix of one block plus the prefix of the next, and both
+  are running reductions along the blocks.
+  """
+  size = len(x)
+  result = np.full(size, np.nan)
+  if size < n:
+      return result
+
+  blocks = -(-size // n)
+  neutral = -np.inf if ufunc is np.maximum else np.inf
+  padded = np.full(blocks * n, neutral)
+  padded[:size] = x
+  padded = padded.reshape(blocks, n)
+
+  prefix = ufunc.accumulate(padded, axis=1).ravel()
+  suffix = ufunc.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+  result[n - 1:] = ufunc(suffix[:size - n + 1], prefix[n - 1:size])
+  return result
+
+
+def _scan(u, d):
+  """
+  Solve ``y[t] = d * y[t - 1] + u[t]`` (with ``y[-1] = 0``) without a
+  Python loop per element.
+
+  Within a block, ``y = d**j * cumsum(u * d**-j)``; blocks are short
+  enough that ``d**-j`` stays finite, and the value carried into each
+  block is propagated with one step per block.
+  """
+  size = len(u)
+  if d == 0 or size == 0:
+      return u.astype(np.float64)
+
+  block = int(min(_SCAN_BLOCK, max(1, 600 / -np.log(d))))
+  blocks = -(-size // block)
+  padded = np.zeros(blocks * block)
+  padded[:size] = u
+  padded = padded.reshape(blocks, block)
+
+  powers = np.arange(block)
+  local = np.cumsum(padded * d ** -powers, axis=1) * d ** powers
+
+  carry = np.empty(blocks)
+  decay = d ** block
+  value = 0.0
+  for b, end in enumerate(local[:, -1]):
+      carry[b] = value
+      value = decay * value + end
+
+  return (local + carry[:, None] * d ** (powers + 1)).ravel()[:size]
+
+
+def _ema(x, length, presma=True):
+  """pandas-ta ema: optional SMA seed, then ewm(span=length, adjust=False)."""
+  if presma:
+      x = _seeded(x, length)
+  return _ewm(x, 2.0 / (length + 1))
+
+
+def _rma(x, length):
+  """pandas-ta rma: ewm(alpha=1/length, adjust=False)."""
+  return _ewm(x, 1.0 / length)
+
+
+def _ewm(x, alpha):
+  """ewm(alpha=alpha, adjust=False).mean() from the first valid value on."""
+  x = x.astype(np.float64)
+  result = np.full(len(x), np.nan)
+  first = _first_valid(x)
+  if first is None:
+      return result
+  if np.isnan(x[first:]).any():
+      raise Unsupported('gaps in input')
+
+  u = alpha * x[first:]
+  u[0] = x[first]
+  result[first:] = _scan(u, 1.0 - alpha)
+  return result
+
+
+def _seeded(x, length):
+  """``x`` with its first ``length`` values replaced by their mean, as pandas-ta's presma."""
+  x = x.copy()
+  seed = _nanmean(x[:length])
+  x[:length - 1] = np.nan
+  x[length - 1] = seed
+  return x
+
+
+def _atr(high, low, close, length, drift, prenan):
+  """pandas-ta atr: rma of the true range, seeded with its first SMA."""
+  return _rma(_seeded(_true_range(high, low, close, drift, prenan), length), length)
+
+
+def _true_range(high, low, close, drift, prenan=False):
+  """Largest of the three ranges, skipping the ones not known yet."""
+  prev_close = _shift(close, drift)
+  result = np.fmax(
+      np.abs(_non_zero_range(high, low)),
+      np.fmax(np.abs(high - prev_close), np.abs(prev_close - low))
+  )
+  if prenan:
+      result[:drift] = np.nan
+  return result
+
+
+def _nanmean(x):
+  """Series.mean() of ``x``: NaNs skipped, summed in the input's own dtype."""
+  valid = ~np.isnan(x)
+  count = np.count_nonzero(valid)
+  if not count:
+      return np.nan
+  return np.where(valid, x, 0).sum(dtype=x.dtype) / x.dtype.type(count)
+
+
+def _non_zero_range(a, b):
+  """``a - b``, nudged off zero when any value is exactly zero."""
+  diff = a - b
+  if (diff == 0).any():
+      diff += _EPSILON
+  return diff
+
+
+def _diff(x, drift):
+  result = np.full(len(x), np.nan, dtype=x.dtype)
+  result[drift:] = x[drift:] - x[:-drift]
+  return result
+
+
+def _shift(x, periods):
+  result = np.full(len(x), np.nan, dtype=x.dtype)
+  if periods > 0:
+      result[periods:] = x[:-periods]
+  elif periods < 0:
+      result[:periods] = x[-periods:]
+  else:
+      result[:] = x
+  return result
+
+
+def _first_valid(x):
+  valid = np.flatnonzero(~np.isnan(x))
+  return valid[0] if len(valid) else None
+
+
+# Argument handling, mirroring pandas-ta's validation
+
+def _values(series, min_length, finite=False):
+  """
+  The float values of an input Series (in its own float dtype).
+
+  pandas-ta returns None for inputs shorter than ``min_length``; those,
+  and inputs with gaps where the formulas here assume none, are left to
+  it.
+  """
+  if not isinstance(series, pd.Series) or len(series) < min_length:
+      raise Unsupported('input')
+
+  values = series.to_numpy()
+  if values.dtype.kind in 'iub':
+      values = values.astype(np.float64)
+  elif values.dtype.kind != 'f':
+      raise Unsupported(str(values.dtype))
+
+  if finite and not np.isfinite(values).all():
+      raise Unsupported('missing values')
+  return values
+
+
+def _column(df, name):
+  if isinstance(name, pd.Series):
+      return name
+  if name in df.columns:
+      return df[name]
+
+  matches = [c for c in df.columns if str(c).lower() == str(name).lower()]
+  if len(matches) != 1:
+      raise Unsupported(f'column {name!r}')
+  return df[matches[0]]
+
+
+def _plain(talib, kwargs):
+  """Reject options (TA-Lib, fillna, ...) only pandas-ta implements."""
+  if talib or kwargs:
+      raise Unsupported(', '.join(kwargs) or 'talib')
+
+
+def _mamode(mamode, default):
+  if mamode is not None and str(mamode).lower() != default:
+      raise Unsupported(f'mamode={mamode}')
+
+
+def _positive(value, default):
+  """``value`` if it is a positive number (an int stays an int), else ``default``."""
+  if isinstance(value, (float, np.floating)):
+      return float(value) if value > 0 else default
+  if isinstance(value, (int, np.integer)):
+      return int(value) if value > 0 else default
+  return default
+
+
+def _length(value, default):
+  length = _positive(value, default)
+  # pandas-ta keeps float lengths, which its rolling windows reject
+  if not isinstance(length, int):
+      raise Unsupported(f'length={value!r}')
+  return length
+
+
+def _scalar(value, default):
+  return float(value) if isinstance(value, (int, float, np.integer, np.floating)) else float(default)
+
+
+def _drift(value):
+  if isinstance(value, (int, np.integer)) and value != 0:
+      if value < 0:
+          raise Unsupported(f'drift={value}')
+      return int(value)
+  return 1
+
+
+def _offset(value):
+  return int(value) if isinstance(value, (int, np.integer)) else 0
+
+
+def _series(values, index, name, category, offset):
+  offset = _offset(offset)
+  if offset:
+      values = _shift(values, offset)
+  result = pd.Series(values, index=index, name=name)
+  result.category = category
+  return result
+
+
+def _frame(columns, index, name, category, offset):
+  offset = _offset(offset)
+  if offset:
+      columns = {label: _shift(values, offset) for label, values in columns.items()}
+  result = pd.DataFrame(columns, index=index)
+  result.name = name
+  result.category = category
+  return result
+
+
+# Verification against pandas-ta
+
+def _probe_frame(dtype):
+  """Seeded random-walk bars with a flat stretch, as found in thin markets."""
+  rng = np.random.default_rng(7)
+  close = 100 + rng.standard_normal(400).cumsum()
+  close[200:230] = close[199]
+  spread = np.abs(rng.standard_normal(400))
+  spread[200:230] = 0
+  high = np.maximum(close, np.roll(close, 1)) + spread
+  low = np.minimum(close, np.roll(close, 1)) - spread
+  high[0], low[0] = close[0] + spread[0], close[0] - spread[0]
+
+  index = pd.date_range('2020-01-01', periods=400, freq='D', name='Date')
+  return pd.DataFrame({
+      'Open': close, 'High': high, 'Low': low, 'Close': close,
+  }, index=index).astype(dtype)
+
+
+def _same(result, reference):
+  if type(result) is not type(reference):
+      return False
+  if isinstance(result, pd.Series):
+      if result.name != reference.name:
+          return False
+  elif list(result.columns) != list(reference.columns):
+      return False
+
+  if not result.index.equals(reference.index):
+      return False
+  return np.allclose(
+      result.to_numpy(np.float64), reference.to_numpy(np.float64),
+      rtol=1e-7, atol=1e-9, equal_nan=True
+  )
@@ -0,0 +1,293 @@
+"""
+Opt-in JIT compilation of numeric row loops in strategy code.
+
+Some strategy logic is sequential and has no vectorized form. Written as
+a loop over NumPy arrays, it can still run at native speed: with the
+sandbox's ``jit_loops`` setting on and numba installed, each loop over
+the bars that the cost analysis flags (see code_cost) is moved into a
+kernel function that numba compiles on its first call.
+
+Only loops in a restricted subset of Python are moved: assignments,
+if/for/while, arithmetic, comparisons, indexing, the builtins range,
+len, min, max, abs, int, float and bool, and np.* functions. A loop may
+use variables the function assigned before it; those it rebinds are
+handed back, arrays it writes to are changed in place.
+
+A kernel falls back to running the same loop interpreted when numba is
+missing, cannot compile it, or is given anything but NumPy arrays and
+numbers (e.g. a pandas Series), so results never depend on whether
+compilation worked.
+"""
+
+import ast
+import functools
+
+import numpy as np
+
+
+# Builtins a kernel may call (numba compiles all of them)
+KERNEL_BUILTINS = frozenset({'range', 'len', 'min', 'max', 'abs', 'int', 'float', 'bool'})
+
+# Array attributes a kernel may read
+ARRAY_ATTRIBUTES = frozenset({'shape', 'size', 'ndim'})
+
+_NODES = (
+    ast.Assign, ast.AugAssign, ast.If, ast.For, ast.While, ast.Break, ast.Continue, ast.Pass,
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.Attribute,
+    ast.Subscript, ast.Slice, ast.Tuple, ast.Name, ast.Constant,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop, ast.expr_context,
+)
+
+# Nodes whose names are not the enclosing function's
+_SCOPES = (
+    ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef,
+    ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp,
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _numba():
+  # Imported on first use: numba is optional and slow to import
+  try:
+      import numba
+  except ImportError:
+      return None
+  return numba
+
+
+def available():
+  """True if numba is installed, so kernels can be compiled."""
+  return _numba() is not None
+
+
+def plan_loops(tree, report):
+  """
+  Row loops of ``tree`` that can move into kernels.
+
+  Looks at loops that ``report`` (the code's CostReport) flags as row
+  loops, in the module's top-level functions. Where a loop does not fit
+  the kernel subset, loops nested in it are considered instead.
+
+  Returns:
+      List of (loop node, input names, output names)
+  """
+  lines = {f['line'] for f in report.findings if f['kind'] == 'row_loop'}
+  plans = []
+  for function in tree.body:
+      if isinstance(function, ast.FunctionDef):
+          _plan_in(function, function.body, lines, plans)
+  return plans
+
+
+def compile_with_kernels(source, builtins, filename='<strategy>'):
+  """
+  Compile strategy source with its row loops moved into kernels.
+
+  Args:
+      source: Strategy source code
+      builtins: The ``__builtins__`` kernels run with
+      filename: Name compiled code reports in tracebacks
+
+  Returns:
+      (code object, {kernel name: JitKernel}); the code calls the
+      kernels as globals, so they must be in the globals it runs with
+  """
+  from app.utils.code_cost import analyze_cost
+
+  tree = ast.parse(source)
+  plans = plan_loops(tree, analyze_cost(source, tree))
+
+  kernels = {}
+  calls = {}
+  for loop, inputs, outputs in plans:
+      name = f'_jit_loop_{loop.lineno}'
+      kernels[name] = JitKernel(_kernel_function(name, loop, inputs, outputs, builtins, filename))
+      calls[id(loop)] = _at(_kernel_call(name, inputs, outputs), loop)
+
+  tree = _Outliner(calls).visit(tree)
+  return compile(tree, filename, 'exec'), kernels
+
+
+class JitKernel:
+  """
+  A loop moved out of strategy code, run compiled when numba can.
+
+  Compilation happens on the first call with NumPy arguments; if it
+  fails the kernel keeps running interpreted from then on (``error``
+  says why).
+  """
+
+  def __init__(self, function):
+      self.function = function
+      self.error = None
+      numba = _numba()
+      # Bounds-checked, so a bad index raises IndexError as in Python
+      self.compiled = numba.njit(function, boundscheck=True) if numba is not None else None
+
+  @property
+  def jitted(self):
+      """True once the kernel has run compiled."""
+      return self.compiled is not None and bool(self.compiled.signatures)
+
+  def __call__(self, *args):
+      if self.compiled is not None and self.error is None and all(_numeric(a) for a in args):
+          try:
+              return self.compiled(*args)
+          except _numba().core.errors.NumbaError as e:
+              self.error = str(e).splitlines()[0]
+      return self.function(*args)
+
+  def __repr__(self):
+      state = 'jitted' if self.jitted else 'failed' if self.error else 'interpreted'
+      return f"JitKernel({self.function.__name__}, {state})"
+
+
+def _plan_in(function, body, lines, plans):
+  for node in body:
+      if isinstance(node, (ast.For, ast.While)) and node.lineno in lines:
+          names = _kernel_names(function, node)
+          if names is not None:
+              plans.append((node, *names))
+              continue
+      if isinstance(node, (ast.For, ast.While, ast.If, ast.With)):
+          _plan_in(function, node.body, lines, plans)
+          _plan_in(function, getattr(node, 'orelse', []), lines, plans)
+
+
+def _kernel_names(function, loop):
+  """(inputs, outputs) of ``loop`` as a kernel of ``function``, or None if it does not fit."""
+  if not all(_fits(node) for node in ast.walk(loop)):
+      return None
+
+  loaded, stored = set(), set()
+  for node in ast.walk(loop):
+      if isinstance(node, ast.Name):
+          (stored if isinstance(node.ctx, ast.Store) else loaded).add(node.id)
+
+  # Where the function binds and reads names outside the loop
+  bound, read = {}, set()
+  for arg in function.args.posonlyargs + function.args.args + function.args.kwonlyargs:
+      bound[arg.arg] = function.lineno
+  for node, nested in _outside(function.body, loop):
+      if isinstance(node, (ast.Global, ast.Nonlocal)):
+          return None
+      if isinstance(node, ast.Name):
+          if not isinstance(node.ctx, ast.Store):
+              read.add(node.id)
+          elif not nested:
+              bound[node.id] = min(bound.get(node.id, node.lineno), node.lineno)
+
+  inputs = sorted((loaded | stored) & bound.keys())
+  if any(bound[name] >= loop.lineno for name in inputs):
+      return None
+
+  # Names the loop introduces must stay inside it
+  local = stored - bound.keys()
+  if local & read:
+      return None
+
+  # Anything else it reads must be np or a kernel builtin
+  if loaded - stored - bound.keys() - KERNEL_BUILTINS - {'np'}:
+      return None
+
+  return inputs, [name for name in inputs if name in stored]
+
+
+def _outside(nodes, loop, nested=False):
+  """Nodes under ``nodes`` except ``loop``'s, flagged if in a nested scope (lambda, comprehension, ...)."""
+  for node in nodes:
+      if node is loop:
+          continue
+      yield node, nested
+      inner = nested or isinstance(node, _SCOPES)
+      yield from _outside(ast.iter_child_nodes(node), loop, inner)
+
+
+def _fits(node):
+  if not isinstance(node, _NODES):
+      return False
+  if isinstance(node, (ast.For, ast.While)):
+      if node.orelse:
+          return False
+      if isinstance(node, ast.For):
+          iterates = isinstance(node.iter, ast.Name) or _calls(node.iter, 'range')
+          return iterates and isinstance(node.target, ast.Name)
+  if isinstance(node, ast.Call):
+      builtin = isinstance(node.func, ast.Name) and node.func.id in KERNEL_BUILTINS
+      return (builtin or _is_np(node.func)) and not node.keywords and not any(
+          isinstance(arg, ast.Starred) for arg in node.args
+      )
+  if isinstance(node, ast.Attribute):
+      return _is_np(node) or (isinstance(node.value, ast.Name) and node.attr in ARRAY_ATTRIBUTES)
+  if isinstance(node, ast.Constant):
+      return isinstance(node.value, (bool, int, float))
+  if isinstance(node, (ast.Assign, ast.AugAssign)):
+      targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+      return all(_assignable(t) for t in targets)
+  return True
+
+
+def _assignable(target):
+  if isinstance(target, ast.Name):
+      return True
+  if isinstance(target, ast.Subscript):
+      return isinstance(target.value, ast.Name)
+  if isinstance(target, ast.Tuple):
+      return all(isinstance(t, ast.Name) for t in target.elts)
+  return False
+
+
+def _is_np(node):
+  return isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == 'np'
+
+
+def _calls(node, name):
+  return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == name
+
+
+def _kernel_function(name, loop, inputs, outputs, builtins, filename):
+  kernel = ast.parse(f"def {name}({', '.join(inputs)}):\n    pass").body[0]
+  returned = ast.parse(f"return ({''.join(n + ', ' for n in outputs)})" if outputs else 'return None').body[0]
+  kernel.body = [loop, _at(returned, loop)]
+  _at(kernel, loop, recursive=False)
+
+  module = ast.fix_missing_locations(ast.Module(body=[kernel], type_ignores=[]))
+  namespace = {'np': np, '__builtins__': builtins}
+  exec(compile(module, filename, 'exec'), namespace)
+  return namespace[name]
+
+
+def _kernel_call(name, inputs, outputs):
+  call = f"{name}({', '.join(inputs)})"
+  if outputs:
+      return ast.parse(f"({''.join(n + ', ' for n in outputs)}) = {call}").body[0]
+  return ast.parse(call).body[0]
+
+
+def _at(node, loop, recursive=True):
+  """Place generated ``node`` at ``loop``'s position in the source."""
+  for child in ast.walk(node) if recursive else [node]:
+      if 'lineno' in child._attributes:
+          child.lineno = child.end_lineno = loop.lineno
+          child.col_offset = child.end_col_offset = loop.col_offset
+  return node
+
+
+class _Outliner(ast.NodeTransformer):
+  """Replaces planned loops with calls to their kernels."""
+
+  def __init__(self, calls):
+      self.calls = calls
+
+  def visit_For(self, node):
+      if id(node) in self.calls:
+          return self.calls[id(node)]
+      return self.generic_visit(node)
+
+  visit_While = visit_For
+
+
+def _numeric(value):
+  if isinstance(value, np.ndarray):
+      return value.dtype.kind in 'biuf'
+  return isinstance(value, (bool, int, float, np.number, np.bool_))
@@ -0,0 +1,123 @@
+"""Thread-safe LRU cache bounded by an approximate byte budget."""
+
+import threading
+from collections import OrderedDict
+
+
+class ByteLRUCache:
+  """
+  Least-recently-used cache whose capacity is measured in bytes.
+
+  ``sizeof`` is called once per insert to weigh an entry. Entries larger
+  than the whole budget are not cached at all. All operations hold a
+  single lock, so the cache can be shared by request threads.
+
+  ``on_remove(key, value)``, if given, is called (outside the lock) for
+  every entry that leaves the cache: evicted, replaced, popped or
+  cleared. Use it to release resources the values own.
+  """
+
+  def __init__(self, max_bytes, sizeof, on_remove=None):
+      self.max_bytes = int(max_bytes)
+      self.sizeof = sizeof
+      self.on_remove = on_remove
+      self._entries = OrderedDict()
+      self._lock = threading.Lock()
+      self._bytes = 0
+      self.hits = 0
+      self.misses = 0
+      self.evictions = 0
+
+  def get(self, key, default=None):
+      with self._lock:
+          if key not in self._entries:
+              self.misses += 1
+              return default
+
+          self._entries.move_to_end(key)
+          self.hits += 1
+          return self._entries[key][0]
+
+  def put(self, key, value):
+      """
+      Insert or replace an entry.
+
+      Returns:
+          True if the value was cached, False if it exceeds the budget
+          (it is then passed straight to ``on_remove``)
+      """
+      nbytes = int(self.sizeof(value))
+
+      with self._lock:
+          removed = self._discard(key)
+
+          if nbytes > self.max_bytes:
+              removed.append((key, value))
+          else:
+              self._entries[key] = (value, nbytes)
+              self._bytes += nbytes
+              removed += self._evict()
+
+      self._removed(removed)
+      return nbytes <= self.max_bytes
+
+  def pop(self, key):
+      with self._lock:
+          removed = self._discard(key)
+      self._removed(removed)
+
+  def resize(self, max_bytes):
+      with self._lock:
+          self.max_bytes = int(max_bytes)
+          removed = self._evict()
+      self._removed(removed)
+
+  def clear(self):
+      with self._lock:
+          removed = [(key, value) for key, (value, _) in self._entries.items()]
+          self._entries.clear()
+          self._bytes = 0
+      self._removed(removed)
+
+  def stats(self):
+      """Counters and current usage, for logging or health checks."""
+      with self._lock:
+          lookups = self.hits + self.misses
+          return {
+              'entries': len(self._entries),
+              'bytes': self._bytes,
+              'max_bytes': self.max_bytes,
+              'hits': self.hits,
+              'misses': self.misses,
+              'evictions': self.evictions,
+              'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+          }
+
+  def __contains__(self, key):
+      with self._lock:
+          return key in self._entries
+
+  def __len__(self):
+      with self._lock:
+          return len(self._entries)
+
+  def _discard(self, key):
+      if key not in self._entries:
+          return []
+      value, nbytes = self._entries.pop(key)
+      self._bytes -= nbytes
+      return [(key, value)]
+
+  def _evict(self):
+      removed = []
+      while self._bytes > self.max_bytes and self._entries:
+          key, (value, nbytes) = self._entries.popitem(last=False)
+          self._bytes -= nbytes
+          self.evictions += 1
+          removed.append((key, value))
+      return removed
+
+  def _removed(self, entries):
+      if self.on_remove is not None:
+          for key, value in entries:
+              self.on_remove(key, value)
@@ -0,0 +1,260 @@
+"""
+Look-ahead-safe market structure for price-action strategies.
+
+Implements the swing, structure and protected swing concepts from the
+price_action corpus (market_structure_basic/advanced, protected_swings,
+reversal_sequence) with array operations. Strategy code sees these
+functions as globals in the sandbox.
+
+A swing point is only known some bars after it forms: a fractal swing
+high with ``right`` bars after it is confirmed ``right`` bars later.
+Every value here is reported on the bar it becomes known, so signals
+built on it never use future bars.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+__all__ = ['swing_highs', 'swing_lows', 'structure', 'cisd', 'protected_swings']
+
+
+def swing_highs(high, left=2, right=2):
+  """
+  Fractal swing highs, on the bar they are confirmed.
+
+  A bar is a swing high if its high is above each of the ``left`` highs
+  before it and not below any of the ``right`` highs after it (so of
+  equal highs only the first counts). It is confirmed ``right`` bars
+  later.
+
+  Returns:
+      float Series: the swing high's price on its confirmation bar, NaN
+      elsewhere
+  """
+  return _swings(high, left, right, 1)
+
+
+def swing_lows(low, left=2, right=2):
+  """
+  Fractal swing lows, on the bar they are confirmed (see swing_highs).
+
+  Returns:
+      float Series: the swing low's price on its confirmation bar, NaN
+      elsewhere
+  """
+  return _swings(low, left, right, -1)
+
+
+def structure(df, left=2, right=2):
+  """
+  Swing structure of ``df`` (High, Low and Close columns), bar by bar.
+
+  Returns:
+      DataFrame on df's index with columns:
+          swing_high, swing_low: Newly confirmed swing prices (NaN on
+              other bars)
+          last_high, last_low: Latest confirmed swing high and low
+          hh, lh: A swing high confirmed above / not above the previous one
+          hl, ll: A swing low confirmed above-or-at / below the previous one
+          trend: 1 while the latest swings are HH and HL, -1 while they
+              are LH and LL, 0 otherwise
+          bos_up, bos_down: Break of structure, the first close above
+              the latest swing high / below the latest swing low
+          mss_up, mss_down: Market structure shift, a break against the
+              direction of the previous one
+  """
+  swing_high = swing_highs(df['High'], left, right)
+  swing_low = swing_lows(df['Low'], left, right)
+  close = df['Close'].to_numpy(np.float64)
+
+  new_high = swing_high.notna().to_numpy()
+  new_low = swing_low.notna().to_numpy()
+  last_high = swing_high.ffill().to_numpy()
+  last_low = swing_low.ffill().to_numpy()
+  prev_high = _shift(last_high)
+  prev_low = _shift(last_low)
+
+  hh = new_high & (last_high > prev_high)
+  lh = new_high & (last_high <= prev_high)
+  hl = new_low & (last_low >= prev_low)
+  ll = new_low & (last_low < prev_low)
+
+  high_side = _ffill(np.where(hh, 1.0, np.where(lh, -1.0, np.nan)))
+  low_side = _ffill(np.where(hl, 1.0, np.where(ll, -1.0, np.nan)))
+  trend = np.where(high_side == low_side, high_side, 0)
+
+  # Each swing level breaks once, on the first close through it
+  bos_up = _first_per_segment(close > last_high, new_high)
+  bos_down = _first_per_segment(close < last_low, new_low)
+
+  breaks = _ffill(np.where(bos_up, 1.0, np.where(bos_down, -1.0, np.nan)))
+  prev_break = _shift(breaks)
+  mss_up = bos_up & (prev_break == -1)
+  mss_down = bos_down & (prev_break == 1)
+
+  return pd.DataFrame({
+      'swing_high': swing_high.to_numpy(),
+      'swing_low': swing_low.to_numpy(),
+      'last_high': last_high,
+      'last_low': last_low,
+      'hh': hh,
+      'lh': lh,
+      'hl': hl,
+      'll': ll,
+      'trend': np.nan_to_num(trend).astype(np.int64),
+      'bos_up': bos_up,
+      'bos_down': bos_down,
+      'mss_up': mss_up,
+      'mss_down': mss_down,
+  }, index=df.index)
+
+
+def cisd(df):
+  """
+  Change in state of delivery: a candle closing through the opening
+  price of the latest series of opposing candles.
+
+  A bullish CISD is the first close above the open of the first candle
+  in the latest run of down-close candles (bearish: below the open of
+  the latest run of up-close candles). Each run is closed through once.
+
+  Returns:
+      DataFrame on df's index with columns:
+          cisd_up, cisd_down: Bullish / bearish CISD bars
+          up_level, down_level: The opening prices a close has to get
+              through (as of the bar before)
+  """
+  open_ = df['Open'].to_numpy(np.float64)
+  close = df['Close'].to_numpy(np.float64)
+
+  cisd_up, up_level = _close_through(open_, close, close < open_, 1)
+  cisd_down, down_level = _close_through(open_, close, close > open_, -1)
+
+  return pd.DataFrame({
+      'cisd_up': cisd_up,
+      'cisd_down': cisd_down,
+      'up_level': up_level,
+      'down_level': down_level,
+  }, index=df.index)
+
+
+def protected_swings(df, left=2, right=2):
+  """
+  Protected lows and highs from liquidity sweeps (sweep-based method).
+
+  A protected low forms when price runs below the latest confirmed swing
+  low and then makes a bullish CISD; the lowest low since the previous
+  bullish CISD becomes the protected low. It stays in force until a
+  close below it. Protected highs mirror this.
+
+  Returns:
+      DataFrame on df's index with columns:
+          protected_low, protected_high: Active levels (NaN once closed
+              through, until the next one forms)
+          new_protected_low, new_protected_high: Bars a level forms on
+          bias: 1 after a protected low forms, -1 after a protected high
+  """
+  swings = structure(df, left, right)
+  shifts = cisd(df)
+  low = df['Low'].to_numpy(np.float64)
+  high = df['High'].to_numpy(np.float64)
+  close = df['Close'].to_numpy(np.float64)
+
+  new_low, protected_low = _protect(
+      low, close, low < swings['last_low'].to_numpy(), shifts['cisd_up'].to_numpy(), 1
+  )
+  new_high, protected_high = _protect(
+      high, close, high > swings['last_high'].to_numpy(), shifts['cisd_down'].to_numpy(), -1
+  )
+
+  bias = _ffill(np.where(new_low & ~new_high, 1.0, np.where(new_high & ~new_low, -1.0, np.nan)))
+
+  return pd.DataFrame({
+      'protected_low': protected_low,
+      'protected_high': protected_high,
+      'new_protected_low': new_low,
+      'new_protected_high': new_high,
+      'bias': np.nan_to_num(bias).astype(np.int64),
+  }, index=df.index)
+
+
+def _swings(values, left, right, sign):
+  if left < 1 or right < 0:
+      raise ValueError('swings need left >= 1 and right >= 0 bars')
+
+  index = values.index if isinstance(values, pd.Series) else None
+  # Lows are swing highs of the negated series
+  v = np.asarray(values, dtype=np.float64) * sign
+
+  pivot = _shift(v, periods=right)
+  is_swing = pivot > _shift(_window_max(v, left), periods=right + 1)
+  if right:
+      is_swing &= pivot >= _window_max(v, right)
+
+  return pd.Series(np.where(is_swing, pivot * sign, np.nan), index=index)
+
+
+def _window_max(values, n):
+  """Maximum of the last ``n`` values (NaN if any is missing), for the short windows of swings."""
+  result = values.copy()
+  for k in range(1, n):
+      np.maximum(result[k:], values[:-k], out=result[k:])
+  result[:n - 1] = np.nan
+  return result
+
+
+def _close_through(open_, close, opposing, direction):
+  """First close through the open of each run of ``opposing`` candles."""
+  starts = opposing & ~_shift(opposing, False)
+  # The level of the latest run as of the bar before, and where it changes
+  level = _shift(_ffill(np.where(starts, open_, np.nan)))
+  changed = _shift(starts, False)
+  through = close > level if direction == 1 else close < level
+  return _first_per_segment(through, changed), level
+
+
+def _protect(extreme, close, sweep, confirm, direction):
+  """New protected levels (lows for direction 1) and the active level."""
+  bar = np.arange(len(close))
+  last_sweep = np.maximum.accumulate(np.where(sweep, bar, -1))
+  prev_confirm = _shift(np.maximum.accumulate(np.where(confirm, bar, -1)), -1)
+  new = confirm & (last_sweep > prev_confirm)
+
+  # Most extreme price since the bar after the previous confirmation
+  segment = np.cumsum(_shift(confirm, False))
+  if direction == 1:
+      extremes = pd.Series(extreme).groupby(segment).cummin().to_numpy()
+  else:
+      extremes = pd.Series(extreme).groupby(segment).cummax().to_numpy()
+
+  level = _ffill(np.where(new, extremes, np.nan))
+  broken = close < level if direction == 1 else close > level
+  # Closed through since it formed: count the breaks within its segment
+  count = np.cumsum(broken)
+  base = np.maximum.accumulate(np.where(new, count - broken, 0))
+  level[count > base] = np.nan
+  return new, level
+
+
+def _first_per_segment(flags, starts):
+  """``flags`` True only at the first True of each segment (which begin at ``starts``)."""
+  count = np.cumsum(flags)
+  # Trues counted before each segment; cumsum never decreases, so the
+  # latest segment start holds the running maximum
+  base = np.maximum.accumulate(np.where(starts, count - flags, 0))
+  return flags & (count - base == 1)
+
+
+def _shift(values, fill=np.nan, periods=1):
+  # Shifting past the end leaves nothing but fill
+  periods = min(periods, len(values))
+  shifted = np.empty_like(values)
+  shifted[:periods] = fill
+  shifted[periods:] = values[:len(values) - periods]
+  return shifted
+
+
+def _ffill(values):
+  filled = np.where(np.isnan(values), 0, np.arange(len(values)))
+  return values[np.maximum.accumulate(filled)]
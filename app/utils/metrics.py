@@ -3,83 +3,169 @@
 import pandas as pd
 import numpy as np
 
+from app.utils.costs import bar_costs
 
-def calculate_metrics(df, signals):
+
+# Signal values batch_metrics works on at once, bounding its temporaries
+BATCH_ELEMENTS = 64 * 1024
+
+
+def calculate_metrics(df, signals, periods_per_year=252, costs=None):
   """
   Calculate performance metrics from signals.
 
   Args:
       df: OHLCV DataFrame
       signals: Series of 1 (long), -1 (short), 0 (flat)
+      periods_per_year: Bars per year, used to annualize CAGR and Sharpe
+          (252 for daily bars; see app.services.intervals.periods_per_year)
+      costs: Trading cost settings (see app.utils.costs.parse_costs);
+          None for frictionless fills at the close
 
   Returns:
       dict of performance metrics
   """
-  # Calculate daily returns
-  df = df.copy()
-  df['returns'] = df['Close'].pct_change()
+  metrics, _, _ = _run_kernel(df, signals, periods_per_year, costs)
+  return metrics
+
+
+def calculate_equity_curve(df, signals):
+  """
+  Calculate equity curve for visualization.
+
+  Returns list of {date, value} points. Dates carry a time of day when
+  the bars are intraday.
+  """
+  _, equity, valid = metrics_kernel(bar_returns(df), held_signals(signals, df.index))
+  return _equity_points(df.index[valid], equity)
+
+
+def calculate_performance(df, signals, periods_per_year=252, costs=None):
+  """
+  Metrics and equity curve together, from one run of metrics_kernel.
+
+  Returns:
+      (metrics, equity_curve) as from calculate_metrics and
+      calculate_equity_curve, both after ``costs``
+  """
+  metrics, equity, valid = _run_kernel(df, signals, periods_per_year, costs)
+  return metrics, _equity_points(df.index[valid], equity)
+
+
+def _run_kernel(df, signals, periods_per_year, costs):
+  signal = held_signals(signals, df.index)
+  return metrics_kernel(bar_returns(df), signal, periods_per_year, bar_costs(signal, costs, periods_per_year))
+
+
+def bar_returns(df):
+  """
+  Close-to-close returns of df's bars as a float64 array (like
+  ``df['Close'].pct_change()``), NaN on the first bar and on bars with a
+  missing value in any column.
+  """
+  close = df['Close'].to_numpy(np.float64)
+  if np.isnan(close).any():
+      # pct_change measures from the last known close
+      close = pd.Series(close).ffill().to_numpy()
+
+  returns = np.empty(len(close))
+  returns[:1] = np.nan
+  with np.errstate(divide='ignore', invalid='ignore'):
+      np.divide(close[1:], close[:-1], out=returns[1:])
+  returns[1:] -= 1
+
+  for column in df.columns:
+      values = df[column].to_numpy()
+      if values.dtype.kind in 'fcOmM':
+          missing = pd.isna(values)
+          if missing.any():
+              returns[missing] = np.nan
+  return returns
 
-  # Strategy returns = signal * next day's return (we enter at close, see result next day)
-  df['signal'] = signals.shift(1)  # Shift to avoid look-ahead bias
-  df['strategy_returns'] = df['signal'] * df['returns']
 
-  # Drop NaN rows
-  df = df.dropna()
+def held_signals(signals, index):
+  """
+  The position held over each bar's return: ``signals`` shifted one bar
+  (entered at a close, the result shows on the next bar), aligned to
+  ``index`` as a float64 array. NaN where unknown.
+  """
+  if not signals.index.equals(index):
+      return signals.shift(1).reindex(index).to_numpy(np.float64)
 
-  if len(df) == 0:
-      return _empty_metrics()
+  values = signals.to_numpy(np.float64)
+  held = np.empty(len(values))
+  held[:1] = np.nan
+  held[1:] = values[:-1]
+  return held
 
-  # Calculate metrics
-  strategy_returns = df['strategy_returns']
 
-  # Total return
-  total_return = (1 + strategy_returns).prod() - 1
+def metrics_kernel(returns, signal, periods_per_year=252, costs=None):
+  """
+  Every metric and the equity curve from NumPy arrays in one pass.
+
+  Bars where the strategy return (signal * return) is NaN are skipped,
+  as a bar without a return or a position cannot count.
+
+  Args:
+      returns: float64 array of bar returns (see bar_returns)
+      signal: float64 array of the position held over each bar's
+          return (see held_signals)
+      periods_per_year: Bars per year, used to annualize CAGR and Sharpe
+      costs: float64 array of each bar's trading costs, subtracted from
+          its strategy return (see app.utils.costs.bar_costs); charges
+          on skipped bars move to the next counted one
+
+  Returns:
+      (metrics, equity, valid): the metrics dict (as from
+      calculate_metrics), the equity curve over the counted bars
+      starting from 1, and the bool mask of those bars
+  """
+  strategy_returns, signal, valid = counted_returns(returns, signal, costs)
+
+  n = len(strategy_returns)
+  if n == 0:
+      return _empty_metrics(), np.empty(0), valid
+
+  equity = np.cumprod(strategy_returns + 1)
+  total_return = equity[-1] - 1
 
   # CAGR (annualized return)
-  years = len(df) / 252
+  years = n / periods_per_year
   if years > 0 and total_return > -1:
       cagr = (1 + total_return) ** (1 / years) - 1
   else:
       cagr = 0
 
   # Sharpe ratio (annualized)
-  if strategy_returns.std() > 0:
-      sharpe = (strategy_returns.mean() / strategy_returns.std()) * np.sqrt(252)
+  std = strategy_returns.std(ddof=1) if n > 1 else 0
+  if std > 0:
+      sharpe = (strategy_returns.mean() / std) * np.sqrt(periods_per_year)
   else:
       sharpe = 0
 
-  # Max drawdown
-  cumulative = (1 + strategy_returns).cumprod()
-  rolling_max = cumulative.expanding().max()
-  drawdowns = cumulative / rolling_max - 1
-  max_drawdown = drawdowns.min()
-
-  # Win rate
-  trades = df[df['signal'] != 0]['strategy_returns']
-  if len(trades) > 0:
-      win_rate = (trades > 0).sum() / len(trades)
-  else:
-      win_rate = 0
+  # Max drawdown, below the running peak of the equity
+  drawdown = np.maximum.accumulate(equity)
+  np.divide(equity, drawdown, out=drawdown)
+  max_drawdown = drawdown.min() - 1
 
-  # Number of trades (signal changes)
-  signal_changes = (df['signal'].diff() != 0).sum()
-  num_trades = int(signal_changes)
+  # Returns of the bars with a position
+  trades = strategy_returns[signal != 0]
+  wins = trades[trades > 0]
+  win_rate = len(wins) / len(trades) if len(trades) else 0
+  avg_trade_return = trades.mean() if len(trades) else 0
 
-  # Average trade return
-  if len(trades) > 0:
-      avg_trade_return = trades.mean()
-  else:
-      avg_trade_return = 0
+  # Number of trades (signal changes, counting the first bar)
+  num_trades = 1 + int(np.count_nonzero(signal[1:] != signal[:-1]))
 
   # Profit factor
-  gross_profits = trades[trades > 0].sum()
+  gross_profits = wins.sum()
   gross_losses = abs(trades[trades < 0].sum())
   if gross_losses > 0:
       profit_factor = gross_profits / gross_losses
   else:
       profit_factor = float('inf') if gross_profits > 0 else 0
 
-  return {
+  metrics = {
       'total_return': round(total_return * 100, 2),
       'cagr': round(cagr * 100, 2),
       'sharpe_ratio': round(sharpe, 2),
@@ -89,30 +175,187 @@ def calculate_metrics(df, signals):
       'avg_trade_return': round(avg_trade_return * 100, 4),
       'profit_factor': round(profit_factor, 2) if profit_factor != float('inf') else 'inf'
   }
+  return metrics, equity, valid
 
 
-def calculate_equity_curve(df, signals):
+def counted_returns(returns, signal, costs=None):
   """
-  Calculate equity curve for visualization.
+  Strategy returns (signal * return, less costs) of the bars that count,
+  as metrics_kernel sees them.
+
+  Returns:
+      (strategy returns, signal on those bars, bool mask of the bars)
+  """
+  strategy_returns = signal * returns
+  valid = ~np.isnan(strategy_returns)
+  if not valid.all():
+      strategy_returns = strategy_returns[valid]
+      signal = signal[valid]
+      if costs is not None:
+          # Charges on bars that do not count go to the next one that does
+          costs = np.diff(np.cumsum(costs)[valid], prepend=0)
+  if costs is not None:
+      strategy_returns -= costs
+  return strategy_returns, signal, valid
+
+
+def batch_metrics(returns, signals, periods_per_year=252, names=None):
+  """
+  Metrics of many signal variants on the same bars at once.
+
+  Each row gives the same metrics as calculate_metrics for that variant,
+  computed for all variants together with broadcast NumPy operations.
+
+  Args:
+      returns: Bar returns, one per bar (see bar_returns)
+      signals: 2D array of signals, one row per variant and one column
+          per bar: 1 (long), -1 (short), 0 (flat) or NaN (unknown)
+      periods_per_year: Bars per year, used to annualize CAGR and Sharpe
+      names: Labels of the variants (default: 0, 1, ...)
+
+  Returns:
+      DataFrame with a row per variant and the calculate_metrics keys as
+      columns, profit_factor as a float (inf, not 'inf'); ready for e.g.
+      ``table.sort_values('sharpe_ratio', ascending=False)``
+  """
+  returns = np.asarray(returns, dtype=np.float64)
+  signals = np.atleast_2d(np.asarray(signals, dtype=np.float64))
+  if signals.ndim != 2 or signals.shape[1] != len(returns):
+      raise ValueError(f'signals must be variants x {len(returns)} bars, got shape {signals.shape}')
+
+  rows = max(1, BATCH_ELEMENTS // max(1, len(returns)))
+  parts = [_batch_kernel(returns, signals[i:i + rows], periods_per_year) for i in range(0, len(signals), rows)]
+
+  table = pd.DataFrame({
+      key: np.concatenate([part[key] for part in parts]) if parts else np.zeros(0)
+      for key in _empty_metrics()
+  }, index=names)
+  return table.astype({'num_trades': np.int64})
+
+
+def _batch_kernel(returns, signals, periods_per_year):
+  """
+  metrics_kernel for each row of ``signals``.
 
-  Returns list of {date, value} points.
+  Usually every variant counts the same bars (those with a return, after
+  the first), which are then picked once. Otherwise bars a variant does
+  not count get a strategy return of 0 and are masked where that is not
+  enough.
   """
-  df = df.copy()
-  df['returns'] = df['Close'].pct_change()
-  df['signal'] = signals.shift(1)
-  df['strategy_returns'] = df['signal'] * df['returns']
-  df = df.dropna()
+  variants = len(signals)
+  # The position held over each bar's return is the signal of the bar before
+  held, bar_returns = signals[:, :-1], returns[1:]
+
+  counted = ~np.isnan(bar_returns)
+  if not np.isnan(held).any() and np.isfinite(bar_returns[counted]).all():
+      if not counted.all():
+          held, bar_returns = held[:, counted], bar_returns[counted]
+      strategy_returns = held * bar_returns
+      valid = None
+      n = np.full(variants, strategy_returns.shape[1])
+  else:
+      strategy_returns = held * bar_returns
+      valid = ~np.isnan(strategy_returns)
+      strategy_returns[~valid] = 0
+      n = valid.sum(axis=1)
+
+  if not n.any():
+      return {key: np.zeros(variants, dtype=np.int64 if key == 'num_trades' else None) for key in _empty_metrics()}
+
+  n_safe = np.maximum(n, 1)
+  work = np.empty_like(strategy_returns)
+  with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+      # Sharpe ratio (annualized); bars not counted add nothing to the sums
+      total = strategy_returns.sum(axis=1)
+      mean = total / n_safe
+      squares = np.einsum('ij,ij->i', strategy_returns, strategy_returns)
+      std = np.sqrt(np.maximum(squares - n * mean ** 2, 0) / np.maximum(n - 1, 1))
+      std[n < 2] = 0
+      sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), 0)
+
+      equity = np.add(strategy_returns, 1, out=work)
+      np.cumprod(equity, axis=1, out=equity)
+      total_return = equity[:, -1] - 1
+
+      # CAGR (annualized return)
+      years = n / periods_per_year
+      grows = (years > 0) & (total_return > -1)
+      cagr = np.where(grows, (1 + total_return) ** (1 / np.where(grows, years, 1)) - 1, 0)
+
+      # Max drawdown, below the running peak of the equity
+      if valid is None:
+          peak = np.maximum.accumulate(equity, axis=1)
+          max_drawdown = np.divide(equity, peak, out=peak).min(axis=1) - 1
+      else:
+          peak = np.maximum.accumulate(np.where(valid, equity, -np.inf), axis=1)
+          max_drawdown = np.where(valid, equity / peak, np.inf).min(axis=1) - 1
+
+  # Returns of the bars with a position; flat bars have a return of 0
+  trades = np.count_nonzero(held if valid is None else valid & (held != 0), axis=1)
+  trades_safe = np.maximum(trades, 1)
+  win_rate = np.where(trades > 0, np.count_nonzero(strategy_returns > 0, axis=1) / trades_safe, 0)
+  avg_trade_return = np.where(trades > 0, total / trades_safe, 0)
+  gross_profits = np.maximum(strategy_returns, 0, out=work).sum(axis=1)
+  gross_losses = gross_profits - total
+  with np.errstate(divide='ignore', invalid='ignore'):
+      profit_factor = np.where(
+          gross_losses > 0, gross_profits / gross_losses, np.where(gross_profits > 0, np.inf, 0)
+      )
+
+  # Number of trades (signal changes between counted bars, counting the first)
+  if valid is None:
+      changes = held[:, 1:] != held[:, :-1]
+  else:
+      # Compare each counted bar with the previous counted one
+      last = np.where(valid, np.arange(valid.shape[1]), 0)
+      np.maximum.accumulate(last, axis=1, out=last)
+      filled = np.take_along_axis(held, last, axis=1)
+      changes = valid[:, 1:] & (filled[:, 1:] != filled[:, :-1]) & (np.cumsum(valid, axis=1)[:, 1:] > 1)
+  num_trades = 1 + np.count_nonzero(changes, axis=1)
+
+  metrics = {
+      'total_return': np.round(total_return * 100, 2),
+      'cagr': np.round(cagr * 100, 2),
+      'sharpe_ratio': np.round(sharpe, 2),
+      'max_drawdown': np.round(max_drawdown * 100, 2),
+      'win_rate': np.round(win_rate * 100, 2),
+      'num_trades': num_trades,
+      'avg_trade_return': np.round(avg_trade_return * 100, 4),
+      'profit_factor': np.round(profit_factor, 2),
+  }
+  # Variants without a counted bar get the empty metrics
+  return {key: np.where(n > 0, values, 0) for key, values in metrics.items()}
+
+
+def _equity_points(index, equity):
+  """{date, value} points of the equity curve on ``index``."""
+  dates = _format_dates(index, bar_date_format(index))
+  values = np.round(equity, 4).tolist()
+  return [{'date': date, 'value': value} for date, value in zip(dates, values)]
+
+
+def _format_dates(index, date_format):
+  """``index.strftime(date_format)`` for bar_date_format's formats, without a strftime per bar."""
+  if not len(index):
+      return []
+  if index.tz is not None:
+      # Wall-clock times, as strftime shows them
+      index = index.tz_localize(None)
+
+  if date_format == '%Y-%m-%d':
+      return np.datetime_as_string(index.values, unit='D').tolist()
 
-  cumulative = (1 + df['strategy_returns']).cumprod()
+  dates = np.datetime_as_string(index.values, unit='m')
+  # 'YYYY-MM-DDTHH:MM' -> 'YYYY-MM-DD HH:MM', in place on the characters
+  dates.view('U1').reshape(len(dates), -1)[:, 10] = ' '
+  return dates.tolist()
 
-  equity_curve = []
-  for date, value in cumulative.items():
-      equity_curve.append({
-          'date': date.strftime('%Y-%m-%d'),
-          'value': round(value, 4)
-      })
 
-  return equity_curve
+def bar_date_format(index):
+  """'%Y-%m-%d' for daily or coarser bars, with the time for intraday ones."""
+  if len(index) and (index != index.normalize()).any():
+      return '%Y-%m-%d %H:%M'
+  return '%Y-%m-%d'
 
 
 def _empty_metrics():
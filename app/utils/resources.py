@@ -0,0 +1,154 @@
+"""Resource accounting and limits for one strategy run in a worker process."""
+
+import contextlib
+import math
+import signal
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+try:
+  import resource
+except ImportError:  # not on Windows
+  resource = None
+
+
+# Linux process status files; elsewhere the fallbacks below apply
+_PROC_SELF = Path('/proc/self')
+
+
+class CpuLimitExceeded(BaseException):
+  """
+  Raised in a run that used up its CPU time.
+
+  A BaseException, so ``except Exception`` in strategy code cannot
+  swallow it.
+  """
+
+
+@contextlib.contextmanager
+def metered_run(usage, cpu_seconds=None, memory_bytes=None, trace_allocations=True):
+  """
+  Measure a block of code and cap the resources it may use.
+
+  On exit (also by exception) ``usage`` is filled with:
+      wall_seconds, cpu_seconds: Elapsed and CPU (user + system) time
+      peak_rss_bytes: Highest resident set size during the block (on
+          Linux; elsewhere the process' lifetime peak)
+      alloc_peak_bytes, alloc_net_bytes: Peak and remaining memory
+          allocated by the block, as seen by tracemalloc (None if
+          ``trace_allocations`` is off)
+
+  Limits are rlimits on the calling process, raised back when the block
+  ends:
+      cpu_seconds: RLIMIT_CPU; going over raises CpuLimitExceeded (from
+          a SIGXCPU handler that stays installed in the process)
+      memory_bytes: RLIMIT_AS headroom over the current address space;
+          allocations beyond it raise MemoryError
+  """
+  if trace_allocations and not tracemalloc.is_tracing():
+      tracemalloc.start(1)
+  if tracemalloc.is_tracing():
+      tracemalloc.reset_peak()
+  alloc_base = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+
+  _reset_peak_rss()
+  restore = _apply_limits(cpu_seconds, memory_bytes)
+  cpu_start = time.process_time()
+  wall_start = time.perf_counter()
+
+  try:
+      yield usage
+  finally:
+      wall = time.perf_counter() - wall_start
+      cpu = time.process_time() - cpu_start
+      restore()
+
+      usage['wall_seconds'] = round(wall, 6)
+      usage['cpu_seconds'] = round(cpu, 6)
+      usage['peak_rss_bytes'] = _peak_rss()
+      if alloc_base is not None:
+          current, peak = tracemalloc.get_traced_memory()
+          usage['alloc_peak_bytes'] = max(peak - alloc_base, 0)
+          usage['alloc_net_bytes'] = current - alloc_base
+      else:
+          usage['alloc_peak_bytes'] = usage['alloc_net_bytes'] = None
+
+
+def _apply_limits(cpu_seconds, memory_bytes):
+  """Set per-run rlimits; returns a function that lifts them again."""
+  if resource is None:
+      return lambda: None
+
+  undo = []
+
+  if cpu_seconds:
+      # RLIMIT_CPU counts the whole process' CPU time, so the cap sits
+      # on top of what the worker has used so far
+      used = resource.getrusage(resource.RUSAGE_SELF)
+      soft = math.ceil(used.ru_utime + used.ru_stime + cpu_seconds)
+      # The handler is left in place: a SIGXCPU that arrives just as the
+      # limit is lifted must not fall back to the default (killing us)
+      signal.signal(signal.SIGXCPU, _cpu_limit_exceeded)
+      undo.append(_set_soft_limit(resource.RLIMIT_CPU, soft))
+
+  if memory_bytes:
+      size = _address_space()
+      if size is not None:
+          undo.append(_set_soft_limit(resource.RLIMIT_AS, size + memory_bytes))
+
+  def restore():
+      for step in reversed(undo):
+          step()
+
+  return restore
+
+
+def _set_soft_limit(which, soft):
+  """Lower a soft rlimit (never above the hard one); returns the undo step."""
+  previous, hard = resource.getrlimit(which)
+  if hard != resource.RLIM_INFINITY:
+      soft = min(soft, hard)
+  try:
+      resource.setrlimit(which, (soft, hard))
+  except (ValueError, OSError):
+      return lambda: None
+  return lambda: resource.setrlimit(which, (previous, hard))
+
+
+def _cpu_limit_exceeded(signum, frame):
+  raise CpuLimitExceeded()
+
+
+def _address_space():
+  """Current virtual memory size in bytes (Linux), or None."""
+  return _status_bytes('VmSize')
+
+
+def _reset_peak_rss():
+  # Writing 5 to clear_refs resets the process' RSS high-water mark
+  try:
+      (_PROC_SELF / 'clear_refs').write_text('5')
+  except OSError:
+      pass
+
+
+def _peak_rss():
+  peak = _status_bytes('VmHWM')
+  if peak is None and resource is not None:
+      # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+      maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+      peak = maxrss if sys.platform == 'darwin' else maxrss * 1024
+  return peak
+
+
+def _status_bytes(field):
+  try:
+      with open(_PROC_SELF / 'status') as f:
+          for line in f:
+              if line.startswith(field + ':'):
+                  return int(line.split()[1]) * 1024
+  except (OSError, ValueError, IndexError):
+      pass
+  return None
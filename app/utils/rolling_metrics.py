@@ -0,0 +1,153 @@
+"""
+Rolling-window performance analytics for charting a backtest over time.
+
+Every series is computed in O(n) for any window length, on the bars
+calculate_metrics counts:
+
+- Sharpe ratio and volatility come from pandas' rolling mean and
+  variance, which update the window's moments as bars enter and leave
+  it (Welford-style, in compiled code) instead of recomputing them.
+- Max drawdown within the window uses the van Herk/Gil-Werman scheme:
+  the bars are cut into blocks of the window length, and each window
+  joins the suffix of one block with the prefix of the next. Scans of
+  (peak, trough, worst drawdown) within the blocks are NumPy
+  accumulations, where a monotonic deque would need a Python loop.
+- Win rate counts winning and held bars with cumulative sums.
+
+Values are in the units of calculate_metrics (percentages, annualized
+Sharpe ratio) and cover the window of bars ending at each bar.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.utils.costs import bar_costs
+from app.utils.metrics import bar_date_format, bar_returns, counted_returns, held_signals, _format_dates
+
+
+ROLLING_COLUMNS = ('sharpe_ratio', 'volatility', 'max_drawdown', 'win_rate')
+
+
+def default_window(periods_per_year):
+  """A quarter of a year of bars (63 daily bars)."""
+  return max(2, round(periods_per_year / 4))
+
+
+def rolling_metrics(df, signals, window, periods_per_year=252, costs=None):
+  """
+  Rolling Sharpe ratio, volatility, max drawdown and win rate.
+
+  Args:
+      df: OHLCV DataFrame
+      signals: Series of 1 (long), -1 (short), 0 (flat)
+      window: Bars in each window
+      periods_per_year: Bars per year, used to annualize
+      costs: Trading cost settings (see app.utils.costs.parse_costs)
+
+  Returns:
+      DataFrame on the counted bars of df (as the equity curve has them)
+      with ROLLING_COLUMNS, NaN until the first full window
+  """
+  signal = held_signals(signals, df.index)
+  strategy_returns, signal, valid = counted_returns(
+      bar_returns(df), signal, bar_costs(signal, costs, periods_per_year)
+  )
+  series = rolling_kernel(strategy_returns, signal, window, periods_per_year)
+  return pd.DataFrame(series, index=df.index[valid], columns=list(ROLLING_COLUMNS))
+
+
+def rolling_points(table):
+  """
+  {date, sharpe_ratio, volatility, max_drawdown, win_rate} points of a
+  rolling_metrics table from its first full window, dates formatted as
+  on the equity curve.
+  """
+  table = table.dropna()
+  dates = _format_dates(table.index, bar_date_format(table.index))
+  columns = [np.round(table[column].to_numpy(), 4).tolist() for column in ROLLING_COLUMNS]
+  return [dict(zip(('date', *ROLLING_COLUMNS), values)) for values in zip(dates, *columns)]
+
+
+def rolling_kernel(strategy_returns, signal, window, periods_per_year=252):
+  """
+  rolling_metrics on NumPy arrays of the counted bars.
+
+  Args:
+      strategy_returns: float64 array of the bars' strategy returns
+          (see counted_returns)
+      signal: float64 array of the position held over each bar
+      window: Bars in each window
+
+  Returns:
+      dict of float64 arrays, one per ROLLING_COLUMNS name
+  """
+  window = int(window)
+  if window < 2:
+      raise ValueError(f'window must be at least 2 bars, got {window}')
+
+  n = len(strategy_returns)
+  rolling = pd.Series(strategy_returns).rolling(window)
+  mean = rolling.mean().to_numpy()
+  std = rolling.std().to_numpy()
+  with np.errstate(divide='ignore', invalid='ignore'):
+      sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), 0)
+  sharpe[np.isnan(std)] = np.nan
+
+  # Equity at the start of every window is its previous bar's
+  equity = np.empty(n + 1)
+  equity[0] = 1
+  np.cumprod(strategy_returns + 1, out=equity[1:])
+  max_drawdown = np.full(n, np.nan)
+  if n >= window:
+      max_drawdown[window - 1:] = _window_drawdown(equity, window + 1) - 1
+
+  # Bars with a position, and the winning ones among them
+  held = np.r_[0, np.cumsum(signal != 0)]
+  wins = np.r_[0, np.cumsum((strategy_returns > 0) & (signal != 0))]
+  held = held[window:] - held[:-window]
+  with np.errstate(divide='ignore', invalid='ignore'):
+      win_rate = np.full(n, np.nan)
+      win_rate[window - 1:] = np.where(held > 0, (wins[window:] - wins[:-window]) / held, 0)
+
+  return {
+      'sharpe_ratio': sharpe,
+      'volatility': std * np.sqrt(periods_per_year) * 100,
+      'max_drawdown': max_drawdown * 100,
+      'win_rate': win_rate * 100,
+  }
+
+
+def _window_drawdown(equity, width):
+  """
+  Lowest equity / running peak ratio within every ``width`` consecutive
+  points of ``equity``, for the windows ending at width - 1, width, ...
+  """
+  n = len(equity)
+  blocks = -(-n // width)
+  padded = np.empty(blocks * width)
+  padded[:n] = equity
+  # Padding only ever joins windows that run past the data
+  padded[n:] = equity[-1]
+  values = padded.reshape(blocks, width)
+
+  # Prefixes of each block: from its start to every point
+  peak = np.maximum.accumulate(values, axis=1)
+  trough = np.minimum.accumulate(values, axis=1)
+  worst = np.minimum.accumulate(values / peak, axis=1)
+
+  # Suffixes of each block: from every point to its end
+  reverse = values[:, ::-1]
+  suffix_peak = np.maximum.accumulate(reverse, axis=1)[:, ::-1]
+  suffix_trough = np.minimum.accumulate(reverse, axis=1)[:, ::-1]
+  suffix_worst = np.minimum.accumulate((suffix_trough / values)[:, ::-1], axis=1)[:, ::-1]
+
+  start = np.arange(n - width + 1)
+  end = start + width - 1
+  peak, trough, worst = peak.ravel(), trough.ravel(), worst.ravel()
+  suffix_peak, suffix_worst = suffix_peak.ravel(), suffix_worst.ravel()
+
+  # A window is a block suffix and the next block's prefix, falling
+  # from a peak in the first part to a trough in the second or within
+  # either; windows starting on a block boundary are one whole block
+  joined = np.minimum(np.minimum(suffix_worst[start], worst[end]), trough[end] / suffix_peak[start])
+  return np.where(start % width == 0, worst[end], joined)
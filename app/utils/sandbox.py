@@ -1,9 +1,27 @@
 """Sandbox for safe execution of generated strategy code."""
 
+import ast
+import atexit
+import functools
+import hashlib
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
 import pandas_ta
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from app.utils import fast_ta, jit_loops, market_structure, strategy_helpers
+from app.utils.code_cost import CostReport, analyze_cost
+from app.utils.resources import CpuLimitExceeded, metered_run
+from app.utils.shared_frames import SharedFrameStore, attach_frame
+from app.utils.ta_cache import IndicatorCache, install as install_indicators
 
 
 class SandboxError(Exception):
@@ -11,98 +29,604 @@ class SandboxError(Exception):
   pass
 
 
-def execute_strategy(code, df, timeout_seconds=120):
+SAFE_BUILTINS = {
+    'range': range,
+    'len': len,
+    'min': min,
+    'max': max,
+    'abs': abs,
+    'sum': sum,
+    'round': round,
+    'enumerate': enumerate,
+    'zip': zip,
+    'list': list,
+    'dict': dict,
+    'tuple': tuple,
+    'set': set,
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'True': True,
+    'False': False,
+    'None': None,
+}
+
+# Vectorized stateful helpers (bars_since, latch, ...) and market structure
+# (swings, breaks of structure, ...) strategies can call
+STRATEGY_HELPERS = {
+    name: getattr(module, name)
+    for module in (strategy_helpers, market_structure)
+    for name in module.__all__
+}
+
+# Compiled strategies kept per process (parent handles, worker code objects)
+COMPILE_CACHE_SIZE = 256
+
+# Imported once by the fork server, so every worker starts with them
+WORKER_PRELOAD = ['numpy', 'pandas', 'pandas_ta', 'app.utils.sandbox']
+
+# Settings for the process-wide worker pool
+_defaults = {
+    'workers': os.cpu_count() or 1,
+    'max_tasks': 200,
+    'indicator_cache_bytes': 128 * 1024 * 1024,
+    'fast_indicators': True,
+    'timeout_seconds': 120,
+    'cpu_seconds': None,
+    'memory_bytes': 2048 * 1024 * 1024,
+    'trace_allocations': True,
+    'max_estimated_seconds': None,
+    'jit_loops': False,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Frames handed to workers, shared by dataset hash
+_shared_frames = SharedFrameStore(512 * 1024 * 1024)
+
+
+def configure(workers=None, max_tasks=None, shared_memory_bytes=None, indicator_cache_bytes=None,
+              fast_indicators=None, timeout_seconds=None, cpu_seconds=None, memory_bytes=None,
+              trace_allocations=None, max_estimated_seconds=None, jit_loops=None):
+  """
+  Apply app config to the sandbox. Called once from create_app.
+
+  Args:
+      workers: Number of strategy worker processes (0 = one per CPU)
+      max_tasks: Runs after which a worker is replaced by a fresh one
+      shared_memory_bytes: Budget for frames kept in shared memory for
+          the workers (0 = always pickle frames instead)
+      indicator_cache_bytes: Per-worker budget for memoized pandas-ta
+          results (0 = no memoization)
+      fast_indicators: Compute common indicators (rsi, macd, bbands, ...)
+          with NumPy instead of pandas-ta where they match it
+      timeout_seconds: Default wall-clock limit of a run
+      cpu_seconds: CPU time limit of a run (0 = the run's timeout)
+      memory_bytes: Memory a run may allocate on top of what the worker
+          already has mapped (0 = unlimited)
+      trace_allocations: Report the memory runs allocate (tracemalloc)
+      max_estimated_seconds: Reject, without running it, a strategy whose
+          row-wise code is estimated to take longer than this on the
+          frame it is given (0 = never reject; see code_cost)
+      jit_loops: Compile row loops over NumPy arrays with numba, if it
+          is installed (see jit_loops); such loops do not count towards
+          max_estimated_seconds
+  """
+  global _pool
+
+  if workers is not None:
+      _defaults['workers'] = workers or os.cpu_count() or 1
+  if max_tasks is not None:
+      _defaults['max_tasks'] = max_tasks
+  if shared_memory_bytes is not None:
+      _shared_frames.resize(shared_memory_bytes)
+  if indicator_cache_bytes is not None:
+      _defaults['indicator_cache_bytes'] = indicator_cache_bytes
+  if fast_indicators is not None:
+      _defaults['fast_indicators'] = fast_indicators
+  if timeout_seconds is not None:
+      _defaults['timeout_seconds'] = timeout_seconds
+  if cpu_seconds is not None:
+      _defaults['cpu_seconds'] = cpu_seconds or None
+  if memory_bytes is not None:
+      _defaults['memory_bytes'] = memory_bytes or None
+  if trace_allocations is not None:
+      _defaults['trace_allocations'] = trace_allocations
+  if max_estimated_seconds is not None:
+      _defaults['max_estimated_seconds'] = max_estimated_seconds or None
+  if jit_loops is not None:
+      _defaults['jit_loops'] = jit_loops
+
+  # Settings apply to the next pool; workers of the old one are stopped
+  with _pool_lock:
+      if _pool is not None:
+          _pool.shutdown()
+          _pool = None
+
+
+def execute_strategy(code, df, timeout_seconds=None):
   """
   Execute strategy code in a restricted environment.
 
+  The code runs in one of a pool of pre-forked worker processes that
+  already have pandas, numpy and pandas_ta imported. A run that exceeds
+  the timeout is killed and its worker replaced, so runaway strategies
+  never keep burning CPU after the caller gave up on them. Runs are also
+  held to CPU time and memory limits (see configure).
+
+  Before running, the code is checked for row-wise Python (loops over
+  the bars, scalar .iloc writes, apply with lambdas); what is found comes
+  back as warnings with a cost estimate for ``df``.
+
   Args:
       code: The strategy function code
       df: OHLCV DataFrame
-      timeout_seconds: Max execution time
+      timeout_seconds: Max execution time (default: configured timeout)
 
   Returns:
-      dict with: success, signals (Series), error
+      dict with: success, signals (Series), error, resources (wall and
+      CPU seconds, peak RSS and allocated bytes of the run; None if it
+      never started), cost (estimated_seconds and warnings; None if the
+      code does not compile)
   """
-  # Create restricted globals
-  safe_globals = {
-      'pd': pd,
-      'np': np,
-      'ta': pandas_ta,
-      '__builtins__': {
-          'range': range,
-          'len': len,
-          'min': min,
-          'max': max,
-          'abs': abs,
-          'sum': sum,
-          'round': round,
-          'enumerate': enumerate,
-          'zip': zip,
-          'list': list,
-          'dict': dict,
-          'tuple': tuple,
-          'set': set,
-          'str': str,
-          'int': int,
-          'float': float,
-          'bool': bool,
-          'True': True,
-          'False': False,
-          'None': None,
+  try:
+      handle = compile_strategy(code)
+  except SandboxError as e:
+      return {
+          'success': False,
+          'signals': None,
+          'error': str(e),
+          'resources': None,
+          'cost': None
       }
-  }
-
-  safe_locals = {}
 
-  def run_code():
-      # Execute the function definition
-      exec(code, safe_globals, safe_locals)
+  return handle.run(df, timeout_seconds)
 
-      if 'strategy' not in safe_locals:
-          raise SandboxError("No 'strategy' function defined")
 
-      # Call the strategy with a copy of the data
-      df_copy = df.copy()
-      signals = safe_locals['strategy'](df_copy)
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_strategy(code):
+  """
+  Validate strategy code once and return a reusable handle.
 
-      return signals
+  Calls with the same source return the same handle. Sources that only
+  differ in formatting or comments share a key (the hash of their
+  normalized AST), so workers compile them only once. The handle carries the code's
+  static cost analysis (see code_cost) and which of its row loops can
+  be JIT-compiled (see jit_loops).
 
-  # Run with timeout
+  Raises:
+      SandboxError: If the code does not compile or defines no strategy
+  """
   try:
-      with ThreadPoolExecutor(max_workers=1) as executor:
-          future = executor.submit(run_code)
-          signals = future.result(timeout=timeout_seconds)
+      tree = ast.parse(code)
+      compile(tree, '<strategy>', 'exec')
+  except (SyntaxError, ValueError) as e:
+      raise SandboxError(str(e)) from e
+
+  defined = set()
+  for node in tree.body:
+      if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+          defined.add(node.name)
+      elif isinstance(node, ast.Assign):
+          defined.update(t.id for t in node.targets if isinstance(t, ast.Name))
+
+  if 'strategy' not in defined:
+      raise SandboxError("No 'strategy' function defined")
+
+  normalized = ast.dump(tree, annotate_fields=False, include_attributes=False)
+  key = hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
 
-      # Validate output
-      if not isinstance(signals, pd.Series):
+  cost = analyze_cost(code, tree)
+  jit_spans = tuple((loop.lineno, loop.end_lineno) for loop, _, _ in jit_loops.plan_loops(tree, cost))
+  return StrategyHandle(code, key, cost, jit_spans)
+
+
+class StrategyHandle:
+  """
+  A validated strategy that can be run against many DataFrames.
+
+  Each worker process compiles the source once per ``key`` and keeps the
+  code object in an LRU cache; every run still executes it into fresh
+  restricted globals, so runs cannot share state.
+  """
+
+  def __init__(self, code, key, cost=None, jit_spans=()):
+      self.code = code
+      self.key = key
+      self.cost = cost
+      self.jit_spans = jit_spans
+
+  def run(self, df, timeout_seconds=None):
+      """
+      Run the strategy on ``df`` in a sandbox worker.
+
+      ``df`` is published to shared memory once per distinct dataset and
+      the worker maps it instead of unpickling a copy; only the signal
+      values come back.
+
+      Returns:
+          dict with: success, signals (Series), error, resources, cost
+      """
+      if timeout_seconds is None:
+          timeout_seconds = _defaults['timeout_seconds']
+
+      cost = self._cost(len(df))
+      limit = _defaults['max_estimated_seconds']
+      # Loops that run JIT-compiled are not held to the estimate
+      interpreted = self._cost(len(df), self._interpreted()) if _jit_enabled() and self.jit_spans else cost
+      if limit and interpreted['estimated_seconds'] > limit:
+          worst = interpreted['warnings'][0]
           return {
               'success': False,
               'signals': None,
-              'error': 'Strategy must return a pandas Series'
+              'error': (
+                  f"Strategy rejected: its row-wise code is estimated to take "
+                  f"{interpreted['estimated_seconds']:.3g}s on {len(df)} bars (limit {limit}s); "
+                  f"line {worst['line']}: {worst['message']}"
+              ),
+              'resources': None,
+              'cost': cost
           }
 
-      if len(signals) != len(df):
+      frame = _shared_frames.publish(df)
+      try:
+          signals, error, resources = _get_pool().run(
+              (self.key, self.code), frame if frame is not None else df, timeout_seconds
+          )
+      finally:
+          if frame is not None:
+              _shared_frames.release(frame)
+
+      if error is not None:
           return {
               'success': False,
               'signals': None,
-              'error': 'Signals length must match DataFrame length'
+              'error': error,
+              'resources': resources,
+              'cost': cost
           }
 
+      if isinstance(signals, np.ndarray):
+          # The worker sends bare values when the signals follow df's index
+          signals = pd.Series(signals, index=df.index)
+
       return {
           'success': True,
           'signals': signals,
-          'error': None
+          'error': None,
+          'resources': resources,
+          'cost': cost
       }
 
-  except TimeoutError:
+  def run_many(self, frames, timeout_seconds=None):
+      """
+      Run the strategy on several DataFrames, in parallel across workers.
+
+      Returns:
+          List of result dicts (as from ``run``), in the order of ``frames``
+      """
+      frames = list(frames)
+      if not frames:
+          return []
+
+      workers = min(len(frames), _get_pool().size)
+      with ThreadPoolExecutor(max_workers=workers) as executor:
+          return list(executor.map(lambda df: self.run(df, timeout_seconds), frames))
+
+  def _cost(self, bars, report=None):
+      if report is None:
+          report = self.cost
+      if report is None:
+          return {'estimated_seconds': 0.0, 'warnings': []}
       return {
-          'success': False,
-          'signals': None,
-          'error': f'Execution timed out after {timeout_seconds} seconds'
+          'estimated_seconds': round(report.estimate_seconds(bars), 6),
+          'warnings': report.warnings(bars),
       }
-  except Exception as e:
-      return {
-          'success': False,
-          'signals': None,
-          'error': str(e)
-      }
\ No newline at end of file
+
+  def _interpreted(self):
+      """The cost report without the findings in JIT-compiled loops."""
+      return CostReport([
+          f for f in self.cost.findings
+          if not any(start <= f['line'] <= end for start, end in self.jit_spans)
+      ])
+
+  def __repr__(self):
+      return f"StrategyHandle(key={self.key[:12]!r})"
+
+
+def _get_pool():
+  global _pool
+
+  with _pool_lock:
+      if _pool is None:
+          _pool = SandboxPool(
+              _defaults['workers'], _defaults['max_tasks'],
+              cpu_seconds=_defaults['cpu_seconds'],
+              memory_bytes=_defaults['memory_bytes'],
+              trace_allocations=_defaults['trace_allocations']
+          )
+      return _pool
+
+
+def _fast_indicators():
+  """NumPy indicators to use in place of pandas-ta's, if enabled."""
+  if not _defaults['fast_indicators']:
+      return {}
+  return _verified_indicators()
+
+
+@functools.lru_cache(maxsize=1)
+def _verified_indicators():
+  return fast_ta.verify(pandas_ta)
+
+
+def _jit_enabled():
+  return _defaults['jit_loops'] and jit_loops.available()
+
+
+def _worker_settings():
+  """
+  The settings workers run with. Workers do not share the server's
+  memory, so they get them (and the indicators verified here) explicitly.
+  """
+  return {
+      'indicator_cache_bytes': _defaults['indicator_cache_bytes'],
+      'fast_indicators': sorted(_fast_indicators()),
+      'jit_loops': _jit_enabled(),
+  }
+
+
+def _worker_context():
+  """
+  Start workers from a fork server, with the libraries preloaded.
+
+  The server process runs Flask's threads, and forking it could copy a
+  lock another thread holds (Python 3.12 warns about it). The fork
+  server is a single-threaded process of its own: workers, respawns
+  included, are forked from it and start with pandas, numpy, pandas_ta
+  and the helpers already imported.
+  """
+  if 'forkserver' not in multiprocessing.get_all_start_methods():
+      return multiprocessing.get_context('spawn')
+  ctx = multiprocessing.get_context('forkserver')
+  ctx.set_forkserver_preload(WORKER_PRELOAD)
+  return ctx
+
+
+class SandboxPool:
+  """
+  Fixed set of long-lived worker processes that run strategy code.
+
+  Callers check out an idle worker, send it the code and data over a
+  pipe and wait for the signals. A worker that times out or dies is
+  killed and replaced before it is handed out again; healthy workers
+  are recycled after ``max_tasks`` runs so state a strategy left behind
+  (e.g. patched pandas attributes) cannot leak into later runs forever.
+  """
+
+  def __init__(self, workers, max_tasks=200, cpu_seconds=None, memory_bytes=None, trace_allocations=True):
+      self._ctx = _worker_context()
+      self._settings = _worker_settings()
+      self.size = workers
+      self.max_tasks = max_tasks
+      self.cpu_seconds = cpu_seconds
+      self.memory_bytes = memory_bytes
+      self.trace_allocations = trace_allocations
+      self._idle = queue.Queue()
+      self._workers = set()
+      self._lock = threading.Lock()
+
+      for _ in range(workers):
+          self._idle.put(self._spawn())
+
+  def run(self, code, df, timeout_seconds):
+      """
+      Run strategy code on ``df`` in a worker process.
+
+      ``code`` is source text or a ``(key, source)`` pair from a
+      StrategyHandle; ``df`` may also be a handle from
+      SharedFrameStore.publish. Blocks until a worker is free if all of
+      them are busy.
+
+      The run may use at most ``cpu_seconds`` of CPU time (default: the
+      timeout) and ``memory_bytes`` of additional memory.
+
+      Returns:
+          (signals, error, resources) where exactly one of signals and
+          error is None; resources is the run's usage as measured in the
+          worker, or only its wall time if the worker did not report
+      """
+      limits = {
+          'cpu_seconds': self.cpu_seconds or timeout_seconds,
+          'memory_bytes': self.memory_bytes,
+          'trace_allocations': self.trace_allocations,
+      }
+      worker = self._idle.get()
+      healthy = False
+      start = time.perf_counter()
+
+      try:
+          worker.conn.send((code, df, limits))
+          if not worker.conn.poll(timeout_seconds):
+              return None, f'Execution timed out after {timeout_seconds} seconds', _wall_only(start)
+
+          ok, payload, resources = worker.conn.recv()
+          healthy = True
+
+      except (EOFError, OSError):
+          return None, 'Strategy process exited unexpectedly', _wall_only(start)
+      except Exception as e:
+          return None, str(e), _wall_only(start)
+
+      finally:
+          worker.tasks += 1
+          if not healthy or worker.tasks >= self.max_tasks:
+              self._kill(worker)
+              worker = self._spawn()
+          self._idle.put(worker)
+
+      return (payload, None, resources) if ok else (None, payload, resources)
+
+  def shutdown(self):
+      """Kill every worker, busy or not."""
+      with self._lock:
+          workers = list(self._workers)
+      for worker in workers:
+          self._kill(worker)
+
+  def _spawn(self):
+      worker = _Worker(self._ctx, self._settings)
+      with self._lock:
+          self._workers.add(worker)
+      return worker
+
+  def _kill(self, worker):
+      with self._lock:
+          self._workers.discard(worker)
+      worker.kill()
+
+
+def _wall_only(start):
+  return {
+      'wall_seconds': round(time.perf_counter() - start, 6),
+      'cpu_seconds': None,
+      'peak_rss_bytes': None,
+      'alloc_peak_bytes': None,
+      'alloc_net_bytes': None,
+  }
+
+
+class _Worker:
+  def __init__(self, ctx, settings):
+      self.conn, child = ctx.Pipe()
+      self.process = ctx.Process(target=_worker_main, args=(child, settings), daemon=True)
+      self.process.start()
+      child.close()
+      self.tasks = 0
+
+  def kill(self):
+      if self.process.is_alive():
+          self.process.kill()
+      self.process.join()
+      self.conn.close()
+
+
+def _worker_main(conn, settings):
+  """
+  Worker process loop: run each (code, frame) request, send back the
+  result. ``settings`` come from _worker_settings.
+  """
+  # Ctrl-C is for the server process; it stops workers by killing them
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+  compiled = OrderedDict()
+
+  # Indicators computed here are reused by later runs in this worker
+  cache = None
+  if settings['indicator_cache_bytes']:
+      cache = IndicatorCache(settings['indicator_cache_bytes'])
+  fast = {name: fast_ta.INDICATORS[name] for name in settings['fast_indicators']}
+  ta = install_indicators(pandas_ta, cache, fast)
+
+  while True:
+      try:
+          code, frame, limits = conn.recv()
+      except EOFError:
+          return
+
+      resources = {}
+      try:
+          df = attach_frame(frame) if isinstance(frame, dict) else frame
+          code, kernels = _compiled_code(compiled, code, settings['jit_loops'])
+          with metered_run(resources, **limits):
+              signals = _run_strategy(code, df, ta, kernels)
+          if signals.index.equals(df.index):
+              signals = signals.to_numpy()
+          result = (True, signals, resources)
+      except CpuLimitExceeded:
+          result = (False, f"CPU time limit of {limits['cpu_seconds']} seconds exceeded", resources)
+      except MemoryError as e:
+          limit = limits['memory_bytes']
+          error = f'Memory limit of {limit // (1024 * 1024)} MB exceeded' if limit else f'Out of memory: {e}'
+          result = (False, error, resources)
+      except Exception as e:
+          result = (False, str(e), resources)
+
+      # Drop the mapping of the frame before waiting for the next run
+      df = signals = None
+
+      try:
+          conn.send(result)
+      except Exception as e:
+          conn.send((False, f'Strategy result could not be returned: {e}', resources))
+
+
+def _compiled_code(compiled, code, jit=False):
+  """
+  (code object, JIT kernels) for ``code``, from the worker's LRU of
+  compiled strategies; row loops are JIT-compiled if ``jit``. Kernels
+  keep their numba compilation with them.
+  """
+  if isinstance(code, str):
+      return code, {}
+
+  key, source = code
+  if key in compiled:
+      compiled.move_to_end(key)
+      return compiled[key]
+
+  if jit:
+      compiled[key] = jit_loops.compile_with_kernels(source, SAFE_BUILTINS)
+  else:
+      compiled[key] = compile(source, '<strategy>', 'exec'), {}
+  if len(compiled) > COMPILE_CACHE_SIZE:
+      compiled.popitem(last=False)
+  return compiled[key]
+
+
+def _run_strategy(code, df, ta=pandas_ta, kernels=None):
+  """
+  Execute strategy code (source or code object) on ``df`` and validate
+  its signals. ``ta`` is what strategies see as ``ta``; ``kernels`` are
+  the JIT kernels the code object calls (see jit_loops).
+
+  ``df`` is the worker's own copy, so the strategy may modify it freely.
+  """
+  # Create restricted globals, fresh for every run
+  safe_globals = {
+      'pd': pd,
+      'np': np,
+      'ta': ta,
+      **STRATEGY_HELPERS,
+      **(kernels or {}),
+      '__builtins__': dict(SAFE_BUILTINS),
+  }
+
+  safe_locals = {}
+
+  # Execute the function definition
+  exec(code, safe_globals, safe_locals)
+
+  if 'strategy' not in safe_locals:
+      raise SandboxError("No 'strategy' function defined")
+
+  signals = safe_locals['strategy'](df)
+
+  # Validate output
+  if not isinstance(signals, pd.Series):
+      raise SandboxError('Strategy must return a pandas Series')
+
+  if len(signals) != len(df):
+      raise SandboxError('Signals length must match DataFrame length')
+
+  return signals
+
+
+@atexit.register
+def _shutdown_pool():
+  with _pool_lock:
+      if _pool is not None:
+          _pool.shutdown()
+  _shared_frames.clear()
@@ -0,0 +1,350 @@
+"""Hand DataFrames to worker processes through shared memory."""
+
+import hashlib
+import mmap
+import os
+import threading
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.utils.lru import ByteLRUCache
+
+
+# Where POSIX shared memory segments appear as files (Linux)
+SHM_DIR = Path('/dev/shm')
+
+# Column buffers start on cache-line boundaries
+_ALIGN = 64
+
+# Page flags of this process's mappings (Linux), see column_key
+PAGEMAP = Path('/proc/self/pagemap')
+
+# Keep this much of the shm filesystem free, so publishing never runs it
+# out of space (writing past a full tmpfs kills the process with SIGBUS)
+_SHM_HEADROOM = 64 * 1024 * 1024
+
+
+class SharedFrameStore:
+  """
+  Frames published once into ``multiprocessing.shared_memory``.
+
+  ``publish(df)`` copies the index and column buffers into one segment
+  named after a hash of the data and returns a small picklable handle;
+  publishing the same data again reuses the segment. Workers rebuild the
+  frame from the handle with :func:`attach_frame` without copying.
+
+  Segments are bounded by a byte budget and unlinked least recently used
+  first, but never while a run holds them (see :meth:`release`).
+  """
+
+  def __init__(self, max_bytes):
+      self._segments = ByteLRUCache(max_bytes, lambda seg: seg.size, on_remove=self._retire)
+      self._lock = threading.Lock()
+      self._pins = {}
+      self._retired = {}
+
+  def publish(self, df):
+      """
+      Put ``df`` in shared memory and pin it until :meth:`release`.
+
+      Returns:
+          Handle dict, or None if the frame cannot be shared (object
+          columns or index, budget or shm space exhausted) and should be
+          pickled instead
+      """
+      arrays = _frame_arrays(df)
+      if arrays is None:
+          return None
+
+      key = _dataset_hash(df, arrays)
+
+      with self._lock:
+          segment = self._segments.get(key)
+          if segment is None:
+              segment = _Segment.create(key, df, arrays)
+              if segment is None:
+                  return None
+              if not self._segments.put(key, segment):
+                  return None
+          self._pins[segment.name] = self._pins.get(segment.name, 0) + 1
+
+      return segment.handle
+
+  def release(self, handle):
+      """Unpin a handle returned by :meth:`publish`."""
+      name = handle['name']
+      with self._lock:
+          self._pins[name] -= 1
+          if self._pins[name]:
+              return
+          del self._pins[name]
+          segment = self._retired.pop(name, None)
+
+      if segment is not None:
+          segment.unlink()
+
+  def clear(self):
+      """Unlink every segment; ones still in use go with their last release."""
+      with self._lock:
+          self._segments.clear()
+
+  def resize(self, max_bytes):
+      with self._lock:
+          self._segments.resize(max_bytes)
+
+  def stats(self):
+      return self._segments.stats()
+
+  def _retire(self, key, segment):
+      # Called with self._lock held from publish, or from clear(); a
+      # pinned segment is unlinked by the last release instead
+      if self._pins.get(segment.name):
+          self._retired[segment.name] = segment
+      else:
+          segment.unlink()
+
+
+class _Segment:
+  def __init__(self, shm, handle):
+      self.shm = shm
+      self.handle = handle
+      self.name = handle['name']
+      self.size = handle['size']
+
+  @classmethod
+  def create(cls, key, df, arrays):
+      layout = []
+      offset = 0
+      for values in arrays:
+          layout.append(offset)
+          offset += -(-values.nbytes // _ALIGN) * _ALIGN
+      size = max(offset, 1)
+
+      if SHM_DIR.is_dir():
+          stat = os.statvfs(SHM_DIR)
+          if stat.f_bavail * stat.f_frsize < size + _SHM_HEADROOM:
+              return None
+
+      name = f"sbx_{os.getpid()}_{key[:24]}"
+      try:
+          shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+      except FileExistsError:
+          # Left over from an earlier store in this process
+          shared_memory.SharedMemory(name=name).unlink()
+          shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+      except OSError:
+          return None
+
+      for values, start in zip(arrays, layout):
+          target = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf, offset=start)
+          target[...] = values
+      del target
+      # The data stays in the segment; this process no longer maps it
+      shm.close()
+
+      index, columns = arrays[0], arrays[1:]
+      handle = {
+          'name': name,
+          'key': key,
+          'size': size,
+          'rows': len(df),
+          'index': (index.dtype.str, layout[0]),
+          'index_name': df.index.name,
+          'columns': [
+              (label, values.dtype.str, start)
+              for label, values, start in zip(df.columns, columns, layout[1:])
+          ],
+      }
+      return cls(shm, handle)
+
+  def unlink(self):
+      try:
+          self.shm.unlink()
+      except FileNotFoundError:
+          pass
+
+
+def attach_frame(handle):
+  """
+  Rebuild a published frame in a worker process without copying.
+
+  On Linux the segment is mapped copy-on-write (``MAP_PRIVATE``): the
+  columns are writable views, pages are shared with the publisher until
+  written, and writes stay private to this mapping. Elsewhere the
+  segment is copied once into process memory.
+
+  Columns of a mapped segment have a content key without hashing them
+  again, for as long as they are not written to (see column_key).
+  """
+  path = SHM_DIR / handle['name']
+  if path.exists():
+      with open(path, 'rb') as f:
+          buffer = mmap.mmap(
+              f.fileno(), handle['size'],
+              flags=mmap.MAP_PRIVATE, prot=mmap.PROT_READ | mmap.PROT_WRITE
+          )
+      _register_mapping(buffer, handle)
+  else:
+      shm = shared_memory.SharedMemory(name=handle['name'])
+      # Attaching registers the segment for cleanup at exit; the
+      # publisher owns it, so opt out
+      resource_tracker.unregister(shm._name, 'shared_memory')
+      buffer = bytearray(shm.buf[:handle['size']])
+      shm.close()
+
+  rows = handle['rows']
+
+  def view(dtype, offset):
+      return np.ndarray((rows,), dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+
+  index = pd.Index(view(*handle['index']), name=handle['index_name'], copy=False)
+  columns = {label: view(dtype, offset) for label, dtype, offset in handle['columns']}
+
+  return pd.DataFrame(columns, index=index, copy=False)
+
+
+def column_key(values):
+  """
+  Content key of an array that is a column of a frame from attach_frame
+  (or part of one), or None if it is not or may have been written to.
+
+  The key is the publisher's dataset hash and the array's place in the
+  segment. Written pages of the copy-on-write mapping no longer belong
+  to the file, which the page flags in /proc/self/pagemap tell apart.
+  """
+  if not _mappings or values.ndim != 1 or not values.flags.c_contiguous:
+      return None
+
+  address = values.__array_interface__['data'][0]
+  with _mappings_lock:
+      mappings = list(_mappings.items())
+  for start, (end, key) in mappings:
+      if start <= address and address + values.nbytes <= end:
+          if _pages_written(address, values.nbytes):
+              return None
+          return (key, address - start, values.dtype.str, len(values))
+  return None
+
+
+# Mappings made by attach_frame: start address -> (end address, dataset hash)
+_mappings = {}
+_mappings_lock = threading.Lock()
+
+
+def _register_mapping(buffer, handle):
+  view = np.frombuffer(buffer, dtype=np.uint8, count=1)
+  start = view.__array_interface__['data'][0]
+  del view
+  with _mappings_lock:
+      _mappings[start] = (start + handle['size'], handle['key'])
+  weakref.finalize(buffer, _forget_mapping, start)
+
+
+def _forget_mapping(start):
+  with _mappings_lock:
+      _mappings.pop(start, None)
+
+
+def _pages_written(address, nbytes):
+  """True if a page of the range may have been written (or the flags cannot be read)."""
+  if nbytes == 0:
+      return False
+  first = address // mmap.PAGESIZE
+  last = (address + nbytes - 1) // mmap.PAGESIZE
+  try:
+      with open(PAGEMAP, 'rb') as f:
+          f.seek(first * 8)
+          entries = np.frombuffer(f.read((last - first + 1) * 8), dtype=np.uint64)
+  except OSError:
+      return True
+  if len(entries) != last - first + 1:
+      return True
+
+  # Bit 63: present, 62: swapped, 61: page of the file (not a private copy)
+  present = (entries >> np.uint64(63)) & np.uint64(1)
+  swapped = (entries >> np.uint64(62)) & np.uint64(1)
+  file_page = (entries >> np.uint64(61)) & np.uint64(1)
+  return bool((swapped | (present & (file_page ^ np.uint64(1)))).any())
+
+
+def _frame_arrays(df):
+  """Index and column arrays of ``df``, or None if any is not plain numeric."""
+  if not df.columns.is_unique:
+      return None
+
+  arrays = [df.index.to_numpy()]
+  arrays += [df[col].to_numpy() for col in df.columns]
+
+  if any(values.dtype.kind not in 'biufcmM' or values.ndim != 1 for values in arrays):
+      return None
+
+  return arrays
+
+
+# Hashes of read-only datasets, keyed by buffer identity, so frames served
+# from the data cache are hashed once rather than on every run
+_known_hashes = {}
+_known_hashes_lock = threading.Lock()
+_KNOWN_HASHES_MAX = 1024
+
+
+def _dataset_hash(df, arrays):
+  """
+  Content hash of a frame's labels and buffers.
+
+  When every column is a read-only view of read-only memory (as frames
+  from DataService are), the buffers cannot change while they are
+  alive, so the hash is memoized on their addresses and checked against
+  weak references to the owning arrays. Index buffers count as
+  immutable, as pandas never writes into them.
+  """
+  identity = _buffer_identity(df, arrays)
+  if identity is not None:
+      key, owners = identity
+      with _known_hashes_lock:
+          known = _known_hashes.get(key)
+      if known is not None and all(ref() is owner for ref, owner in zip(known[1], owners)):
+          return known[0]
+
+  digest = hashlib.blake2b(digest_size=16)
+  digest.update(repr((list(df.columns), df.index.name, [a.dtype.str for a in arrays])).encode())
+  for values in arrays:
+      digest.update(np.ascontiguousarray(values).view(np.uint8))
+  result = digest.hexdigest()
+
+  if identity is not None:
+      with _known_hashes_lock:
+          if len(_known_hashes) >= _KNOWN_HASHES_MAX:
+              _known_hashes.clear()
+          _known_hashes[key] = (result, [weakref.ref(owner) for owner in owners])
+
+  return result
+
+
+def _buffer_identity(df, arrays):
+  """(key, owning arrays) if every buffer is immutable, else None."""
+  parts = [tuple(df.columns), df.index.name]
+  owners = []
+
+  for i, values in enumerate(arrays):
+      owner = values
+      while isinstance(owner.base, np.ndarray):
+          owner = owner.base
+
+      immutable = i == 0 or (not values.flags.writeable and not owner.flags.writeable)
+      if not immutable:
+          return None
+
+      try:
+          weakref.ref(owner)
+      except TypeError:
+          return None
+
+      parts.append((values.__array_interface__['data'][0], values.shape, values.strides, values.dtype.str))
+      owners.append(owner)
+
+  return tuple(parts), owners
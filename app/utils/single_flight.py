@@ -0,0 +1,57 @@
+"""Coalesce concurrent calls for the same key into one execution."""
+
+import threading
+
+
+class _Call:
+  def __init__(self):
+      self.done = threading.Event()
+      self.result = None
+      self.error = None
+
+
+class SingleFlight:
+  """
+  Let exactly one caller per key do the work while the others wait.
+
+  The first thread to call ``do(key, fn)`` runs ``fn``; threads that
+  arrive with the same key before it finishes block and receive the same
+  result (or exception). Once the call completes the key is forgotten, so
+  later callers start a fresh execution.
+  """
+
+  def __init__(self):
+      self._lock = threading.Lock()
+      self._calls = {}
+
+  def do(self, key, fn):
+      """
+      Run ``fn`` for ``key`` unless an identical call is already in flight.
+
+      Returns:
+          (result, shared) where shared is True for callers that waited on
+          another thread's execution instead of running ``fn`` themselves
+      """
+      with self._lock:
+          call = self._calls.get(key)
+          leader = call is None
+          if leader:
+              call = _Call()
+              self._calls[key] = call
+
+      if not leader:
+          call.done.wait()
+          if call.error is not None:
+              raise call.error
+          return call.result, True
+
+      try:
+          call.result = fn()
+          return call.result, False
+      except BaseException as e:
+          call.error = e
+          raise
+      finally:
+          with self._lock:
+              del self._calls[key]
+          call.done.set()
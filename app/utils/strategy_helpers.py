@@ -0,0 +1,212 @@
+"""
+Vectorized building blocks for stateful strategy logic.
+
+Strategy code sees these functions as globals in the sandbox. Each one
+replaces a per-bar Python loop that generated strategies tend to write
+(bars since an event, holding a position until an exit, entry prices,
+trailing stops) with array operations.
+
+All functions take Series (or arrays/scalars where noted) on the same
+index and return Series on that index.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+__all__ = ['crossover', 'crossunder', 'bars_since', 'latch', 'positions', 'entry_price', 'trailing_stop']
+
+# Bars of a trade searched at once for its stop; doubled while not hit
+_STOP_SEARCH_BARS = 64
+
+
+def crossover(a, b):
+  """
+  Bars where ``a`` crosses above ``b``: a > b now and a <= b on the bar
+  before. ``b`` may be a Series or a number.
+
+  Returns:
+      bool Series
+  """
+  a = _series(a)
+  b = _series(b, a.index)
+  return ((a > b) & (a.shift(1) <= b.shift(1))).rename(None)
+
+
+def crossunder(a, b):
+  """
+  Bars where ``a`` crosses below ``b``: a < b now and a >= b on the bar
+  before. ``b`` may be a Series or a number.
+
+  Returns:
+      bool Series
+  """
+  a = _series(a)
+  b = _series(b, a.index)
+  return ((a < b) & (a.shift(1) >= b.shift(1))).rename(None)
+
+
+def bars_since(condition):
+  """
+  Bars since ``condition`` was last True (0 on the bar where it is).
+
+  Returns:
+      float Series, NaN until the condition is first True
+  """
+  condition = _flags(condition)
+  bar = np.arange(len(condition))
+  last = np.maximum.accumulate(np.where(condition.to_numpy(), bar, -1))
+  since = (bar - last).astype(np.float64)
+  since[last < 0] = np.nan
+  return pd.Series(since, index=condition.index)
+
+
+def latch(entry, exit):
+  """
+  True from each ``entry`` bar until the next ``exit`` bar (False on the
+  exit bar itself). An entry and an exit on the same bar count as an
+  entry.
+
+  Returns:
+      bool Series
+  """
+  entry = _flags(entry)
+  exit = _flags(exit, entry.index)
+  state = np.where(entry, 1.0, np.where(exit, 0.0, np.nan))
+  return pd.Series(state, index=entry.index).ffill().fillna(0).astype(bool)
+
+
+def positions(long_entry=None, long_exit=None, short_entry=None, short_exit=None):
+  """
+  Signals (1 long, -1 short, 0 flat) from entry and exit conditions.
+
+  An entry opens (or reverses into) its side and holds it until that
+  side's exit or an opposite entry. Exits only close their own side: a
+  ``long_exit`` while short is ignored. Entries win over exits on the
+  same bar; a long and a short entry on the same bar cancel out.
+
+  Returns:
+      int Series of 1, -1 and 0
+  """
+  given = [s for s in (long_entry, long_exit, short_entry, short_exit) if isinstance(s, pd.Series)]
+  if not given:
+      raise ValueError('positions needs at least one condition Series')
+  index = given[0].index
+
+  long_entry, long_exit, short_entry, short_exit = (
+      _flags(s, index).to_numpy() if s is not None else np.zeros(len(index), dtype=bool)
+      for s in (long_entry, long_exit, short_entry, short_exit)
+  )
+  entries = long_entry.astype(np.int8) - short_entry.astype(np.int8)
+
+  # Side of the latest entry at each bar; an exit applies only to it
+  side = pd.Series(np.where(entries != 0, entries, np.nan), index=index).ffill().to_numpy()
+  exits = (long_exit & (side == 1)) | (short_exit & (side == -1))
+
+  state = np.where(entries != 0, entries, np.where(exits, 0, np.nan))
+  # Cancelled entries (long and short together) leave the state as is
+  state[long_entry & short_entry] = np.nan
+  return pd.Series(state, index=index).ffill().fillna(0).astype(np.int64)
+
+
+def entry_price(position, price):
+  """
+  Price at the bar the current position was entered (or reversed),
+  carried while it is held.
+
+  Args:
+      position: Signals Series (1, -1, 0), e.g. from ``positions``
+      price: Price Series, usually df['Close']
+
+  Returns:
+      float Series, NaN while flat
+  """
+  position = _series(position)
+  price = _series(price, position.index).astype(np.float64)
+  opened = (position != position.shift(1)) & (position != 0)
+  return price.where(opened).ffill().where(position != 0).rename(None)
+
+
+def trailing_stop(entry, price, distance, direction=1, high=None, low=None):
+  """
+  Hold a position from each ``entry`` bar until a trailing stop is hit.
+
+  For longs the stop trails ``distance`` below the highest ``price``
+  since entry; it is hit on the first later bar whose ``low`` (or
+  ``price`` if no low is given) reaches the stop of the bar before. The
+  position is flat from that bar, and entries before it (or on it) are
+  ignored. Shorts (``direction=-1``) mirror this above the lowest price,
+  checked against ``high``.
+
+  Args:
+      entry: bool Series of bars to enter on
+      price: Series the stop trails, usually df['Close']
+      distance: Stop distance, a number or a Series (e.g. 2 * ATR)
+      direction: 1 for long, -1 for short
+      high, low: Bar extremes the stop is checked against
+
+  Returns:
+      int Series of ``direction`` while held and 0 otherwise
+  """
+  if direction not in (1, -1):
+      raise ValueError('direction must be 1 (long) or -1 (short)')
+
+  entry = _flags(entry)
+  index = entry.index
+  price = _series(price, index).to_numpy(np.float64)
+  distance = _series(distance, index).to_numpy(np.float64)
+  extreme = low if direction == 1 else high
+  touch = price if extreme is None else _series(extreme, index).to_numpy(np.float64)
+
+  # Shorts become longs on negated prices: the stop trails below -price
+  level = direction * price - distance
+  touch = direction * touch
+
+  held = np.zeros(len(index), dtype=bool)
+  starts = np.flatnonzero(entry.to_numpy())
+  k = 0
+  while k < len(starts):
+      start = starts[k]
+      stop = _stop_hit(level, touch, start)
+      held[start:stop] = True
+      k = np.searchsorted(starts, stop, side='right')
+
+  return pd.Series(held.astype(np.int64) * direction, index=index)
+
+
+def _stop_hit(level, touch, start):
+  """
+  First bar after ``start`` where ``touch`` falls to the running maximum
+  of ``level`` since ``start`` (as of the bar before), or len(level).
+  """
+  n = len(level)
+  best = -np.inf
+  a = start
+  width = _STOP_SEARCH_BARS
+  while a + 1 < n:
+      b = min(n - 1, a + width)
+      # Stops for bars a+1 .. b (NaN levels, e.g. ATR warm-up, are skipped)
+      stops = np.fmax(np.fmax.accumulate(level[a:b]), best)
+      hits = np.flatnonzero(touch[a + 1:b + 1] <= stops)
+      if len(hits):
+          return a + 1 + hits[0]
+      best = stops[-1]
+      a = b
+      width *= 2
+  return n
+
+
+def _series(values, index=None):
+  if isinstance(values, pd.Series):
+      return values if index is None else values.reindex(index)
+  if np.ndim(values) == 0:
+      return pd.Series(values, index=index, dtype=np.float64)
+  return pd.Series(np.asarray(values), index=index)
+
+
+def _flags(values, index=None):
+  """``values`` as a bool Series; missing values count as False."""
+  values = _series(values, index)
+  if values.dtype != bool:
+      values = values.fillna(0).astype(bool)
+  return values
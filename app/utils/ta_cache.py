@@ -0,0 +1,270 @@
+"""Memoized pandas-ta indicators for sandbox workers."""
+
+import functools
+import hashlib
+import inspect
+import threading
+import warnings
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from app.utils import fast_ta
+from app.utils.lru import ByteLRUCache
+from app.utils.shared_frames import column_key
+
+
+# Columns pandas-ta reads from a frame by default (matched case-insensitively)
+OHLCV = {'open', 'high', 'low', 'close', 'volume'}
+
+
+class _Uncacheable(Exception):
+  """An argument has no stable fingerprint; compute without the cache."""
+
+
+class IndicatorCache:
+  """
+  Indicator results keyed by (input fingerprint, indicator, params).
+
+  Fingerprints hash the input data itself (values, index and name), so a
+  hit is only possible for identical inputs, whatever object they arrive
+  in, and a strategy that edits a column in place simply misses. Columns
+  of a shared frame that are still as published are not hashed again:
+  they are keyed by the publisher's dataset hash (see
+  shared_frames.column_key). Results are stored privately and every
+  caller gets its own copy, so strategies can modify what they get back
+  without touching the cache.
+  """
+
+  def __init__(self, max_bytes):
+      self._results = ByteLRUCache(max_bytes, _nbytes)
+
+  def call(self, name, fn, args, kwargs, data_key=None):
+      """
+      ``fn(*args, **kwargs)``, served from the cache when possible.
+
+      Args:
+          name: Indicator name, part of the key
+          data_key: Fingerprint of data ``fn`` reads besides its
+              arguments (e.g. the frame behind ``df.ta``)
+      """
+      try:
+          key = (data_key, name, _params(fn, args, kwargs))
+      except _Uncacheable:
+          return fn(*args, **kwargs)
+
+      result = self._results.get(key)
+      if result is None:
+          result = fn(*args, **kwargs)
+          if not isinstance(result, (pd.Series, pd.DataFrame)):
+              return result
+          self._results.put(key, result.copy())
+          return result
+
+      return result.copy()
+
+  def stats(self):
+      return self._results.stats()
+
+
+class CachedIndicators:
+  """
+  Stand-in for the ``pandas_ta`` module whose indicators go through an
+  IndicatorCache (if any), computed by their NumPy versions from
+  ``fast`` where available. Everything else is passed through untouched.
+  """
+
+  def __init__(self, module, cache, indicators, fast=None):
+      self._module = module
+      self._cache = cache
+      self._indicators = indicators
+      self._fast = fast or {}
+
+  def __getattr__(self, name):
+      attr = getattr(self._module, name)
+      if name not in self._indicators or not callable(attr):
+          return attr
+
+      if name in self._fast:
+          attr = fast_ta.routed(self._fast[name], attr)
+      if self._cache is None:
+          return attr
+
+      def indicator(*args, **kwargs):
+          return self._cache.call(name, attr, args, kwargs)
+
+      return indicator
+
+
+def install(module, cache, fast=None):
+  """
+  Route a pandas-ta module's indicators through ``cache`` and the NumPy
+  implementations in ``fast`` (see fast_ta.verify); either may be empty.
+
+  Re-registers the ``df.ta`` accessor with a routing subclass and returns
+  a CachedIndicators proxy to use in place of the module. Meant for
+  sandbox worker processes: the accessor change is process-wide.
+  """
+  fast = fast or {}
+  if cache is None and not fast:
+      return module
+
+  indicators = set(fast)
+  for names in getattr(module, 'Category', {}).values():
+      indicators.update(names)
+
+  base = getattr(pd.DataFrame, 'ta', None)
+  if isinstance(base, type):
+      inputs = {name: _indicator_inputs(getattr(module, name, None)) for name in indicators}
+      accessor = _cached_accessor(base, cache, indicators, fast, inputs)
+      with warnings.catch_warnings():
+          # Replacing pandas-ta's own registration warns by design
+          warnings.simplefilter('ignore', UserWarning)
+          pd.api.extensions.register_dataframe_accessor('ta')(accessor)
+
+  return CachedIndicators(module, cache, indicators, fast)
+
+
+def _cached_accessor(base, cache, indicators, fast=None, inputs=None):
+  fast = fast or {}
+  inputs = inputs or {}
+
+  class CachedAccessor(base):
+      def __getattribute__(self, name):
+          attr = super().__getattribute__(name)
+          if name not in indicators or not callable(attr):
+              return attr
+
+          df = object.__getattribute__(self, '_df')
+          if name in fast:
+              attr = functools.wraps(attr)(functools.partial(_fast_frame_call, fast[name], attr, df))
+
+          def indicator(*args, **kwargs):
+              # append=True writes into df, which a cache hit would skip
+              if cache is None or kwargs.get('append'):
+                  return attr(*args, **kwargs)
+              try:
+                  data_key = _frame_fingerprint(df, kwargs, inputs.get(name))
+              except _Uncacheable:
+                  return attr(*args, **kwargs)
+              return cache.call(name, attr, args, kwargs, data_key)
+
+          return indicator
+
+  CachedAccessor.__name__ = base.__name__
+  return CachedAccessor
+
+
+def _fast_frame_call(fn, fallback, df, *args, **kwargs):
+  try:
+      return fast_ta.call_frame(fn, df, args, kwargs)
+  except fast_ta.Unsupported:
+      return fallback(*args, **kwargs)
+
+
+def _params(fn, args, kwargs):
+  """Hashable form of a call's arguments, with defaults filled in."""
+  try:
+      bound = inspect.signature(fn).bind(*args, **kwargs)
+      bound.apply_defaults()
+      arguments = bound.arguments
+  except (TypeError, ValueError):
+      arguments = dict(enumerate(args), **kwargs)
+
+  return tuple(sorted((str(k), _normalize(v)) for k, v in arguments.items()))
+
+
+def _normalize(value):
+  if isinstance(value, (pd.Series, pd.DataFrame)):
+      return ('data', _fingerprint(value))
+  if isinstance(value, dict):
+      return tuple(sorted((str(k), _normalize(v)) for k, v in value.items()))
+  if isinstance(value, (list, tuple)):
+      return tuple(_normalize(v) for v in value)
+  if value is None or isinstance(value, (bool, int, float, str, np.generic)):
+      return value
+  raise _Uncacheable(type(value).__name__)
+
+
+def _indicator_inputs(fn):
+  """OHLCV columns a pandas-ta indicator function takes, or None if unknown."""
+  try:
+      parameters = inspect.signature(fn).parameters
+  except (TypeError, ValueError):
+      return None
+  inputs = {name.rstrip('_') for name in parameters} & OHLCV
+  return inputs or None
+
+
+def _frame_fingerprint(df, kwargs, inputs=None):
+  """
+  Fingerprint of the columns a df.ta indicator may read: its ``inputs``
+  (all of OHLCV if unknown) and columns named in its arguments.
+  """
+  inputs = inputs or OHLCV
+  names = {v for v in kwargs.values() if isinstance(v, str)}
+  positions = [i for i, c in enumerate(df.columns) if str(c).lower() in inputs or c in names]
+  return _fingerprint(df, positions)
+
+
+def _fingerprint(obj, positions=None):
+  """Hash of a Series, or of a frame's columns at ``positions`` (default: all)."""
+  digest = hashlib.sha1(usedforsecurity=False)
+  digest.update(_index_hash(obj.index))
+
+  if isinstance(obj, pd.Series):
+      columns = [obj]
+  else:
+      # Column by column: selecting several at once would copy them
+      columns = [obj.iloc[:, i] for i in (range(obj.shape[1]) if positions is None else positions)]
+  digest.update(repr(([c.name for c in columns], [str(c.dtype) for c in columns])).encode())
+  for column in columns:
+      values = column.to_numpy()
+      if values.dtype.kind not in 'biufcmM':
+          raise _Uncacheable(str(values.dtype))
+      key = column_key(values)
+      if key is not None:
+          digest.update(repr(key).encode())
+      else:
+          digest.update(np.ascontiguousarray(values).view(np.uint8))
+
+  return digest.hexdigest()
+
+
+# Index objects are immutable and shared by every column of a frame, so
+# their hashes are remembered for as long as they are alive
+_index_hashes = {}
+_index_hashes_lock = threading.Lock()
+
+
+def _index_hash(index):
+  with _index_hashes_lock:
+      known = _index_hashes.get(id(index))
+  if known is not None and known[0]() is index:
+      return known[1]
+
+  values = index.to_numpy()
+  if values.dtype.kind not in 'biufcmM':
+      raise _Uncacheable(str(values.dtype))
+  key = column_key(values)
+  data = repr(key).encode() if key is not None else np.ascontiguousarray(values).view(np.uint8)
+  result = hashlib.sha1(data, usedforsecurity=False).digest()
+
+  try:
+      ref = weakref.ref(index, lambda _, key=id(index): _forget_index(key))
+  except TypeError:
+      return result
+  with _index_hashes_lock:
+      _index_hashes[id(index)] = (ref, result)
+  return result
+
+
+def _forget_index(key):
+  with _index_hashes_lock:
+      _index_hashes.pop(key, None)
+
+
+def _nbytes(result):
+  usage = result.memory_usage(index=True, deep=True)
+  return usage.sum() if isinstance(usage, pd.Series) else usage
@@ -0,0 +1,228 @@
+"""
+Trade ledger of a backtest: every trade its signals made, one row each.
+
+A trade is a run of bars over which the same non-zero position is held.
+It is entered at the close of the bar whose signal opened it and exits
+at the close of the last bar it is held over (see held_signals: a signal
+shows in the returns from the next bar). Runs are found with one pass
+over the signal array and every per-trade value is a NumPy reduction
+over the runs (``ufunc.reduceat``), so no Python code runs per trade.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.utils.costs import bar_costs
+from app.utils.metrics import bar_date_format, bar_returns, held_signals, _format_dates
+
+
+LEDGER_COLUMNS = (
+    'entry_index', 'exit_index', 'entry_time', 'exit_time', 'side', 'position', 'bars',
+    'entry_price', 'exit_price', 'return', 'costs', 'mae', 'mfe', 'open',
+)
+
+
+def trade_ledger(df, signals, costs=None, periods_per_year=252):
+  """
+  Every trade of ``signals`` on ``df``.
+
+  Bars with an unknown (NaN) signal count as flat; bars with a missing
+  value add nothing to a trade's return, as in calculate_metrics.
+
+  Args:
+      df: OHLCV DataFrame; High and Low give the excursions, Close is
+          used where they are missing
+      signals: Series of 1 (long), -1 (short), 0 (flat)
+      costs: Trading cost settings (see app.utils.costs.parse_costs);
+          None for frictionless fills at the close
+      periods_per_year: Bars per year, to spread annual cost rates
+
+  Returns:
+      DataFrame with a row per trade and columns:
+      entry_index, exit_index: positions in df of the entry and exit bars
+      entry_time, exit_time: their timestamps
+      side: 1 (long) or -1 (short)
+      position: the signal value held
+      bars: bars held
+      entry_price, exit_price: closes at entry and exit
+      return: compounded return over the trade after costs, as the
+          equity curve has it
+      costs: the trade's costs as a fraction of equity (fills and
+          holding costs, summed over its bars)
+      mae, mfe: maximum adverse and favorable excursion, the worst and
+          best price reached against the entry price (Low/High), as
+          returns for the trade's side (mae <= 0 <= mfe)
+      open: True for a trade still held on the last bar
+  """
+  held_signal = held_signals(signals, df.index)
+  position = np.nan_to_num(held_signal, nan=0.0)
+  n = len(position)
+  if n == 0:
+      return _empty_ledger(df.index)
+
+  # Runs of equal position; trades are the runs with a position
+  starts = np.flatnonzero(np.r_[True, position[1:] != position[:-1]])
+  held = position[starts] != 0
+  ends = np.r_[starts[1:], n] - 1
+
+  strategy_returns = np.nan_to_num(position * bar_returns(df), nan=0.0)
+  charges = bar_costs(held_signal, costs, periods_per_year)
+  if charges is None:
+      charged = np.zeros(np.count_nonzero(held))
+  else:
+      strategy_returns -= charges
+      charged = np.add.reduceat(charges, starts)[held]
+  growth = np.multiply.reduceat(strategy_returns + 1, starts)[held]
+
+  close = _prices(df, 'Close')
+  high = np.fmax(_prices(df, 'High'), close)
+  low = np.fmin(_prices(df, 'Low'), close)
+  highest = np.fmax.reduceat(high, starts)[held]
+  lowest = np.fmin.reduceat(low, starts)[held]
+
+  starts, ends = starts[held], ends[held]
+  # Entered at the close of the bar before the first one held
+  entry, exit_ = starts - 1, ends
+  position = position[starts]
+  side = np.sign(position).astype(np.int64)
+
+  entry_price, exit_price = close[entry], close[exit_]
+  with np.errstate(divide='ignore', invalid='ignore'):
+      up = highest / entry_price - 1
+      down = lowest / entry_price - 1
+  long = side > 0
+  mfe = np.where(long, up, -down)
+  mae = np.where(long, down, -up)
+
+  return pd.DataFrame({
+      'entry_index': entry,
+      'exit_index': exit_,
+      'entry_time': df.index[entry],
+      'exit_time': df.index[exit_],
+      'side': side,
+      'position': position,
+      'bars': exit_ - entry,
+      'entry_price': entry_price,
+      'exit_price': exit_price,
+      'return': growth - 1,
+      'costs': charged,
+      'mae': np.minimum(mae, 0),
+      'mfe': np.maximum(mfe, 0),
+      'open': exit_ == n - 1,
+  })
+
+
+def trade_metrics(ledger):
+  """
+  Trade-level statistics of a ledger from trade_ledger.
+
+  Unlike calculate_metrics, whose win rate counts bars, these count
+  whole trades. Returns and excursions are percentages.
+
+  Returns:
+      dict of trade metrics
+  """
+  returns = ledger['return'].to_numpy(np.float64)
+  count = len(returns)
+  if count == 0:
+      return _empty_trade_metrics()
+
+  wins = returns[returns > 0]
+  losses = returns[returns < 0]
+  gross_profits = wins.sum()
+  gross_losses = -losses.sum()
+  if gross_losses > 0:
+      profit_factor = gross_profits / gross_losses
+  else:
+      profit_factor = float('inf') if gross_profits > 0 else 0
+
+  return {
+      'num_trades': count,
+      'num_long': int(np.count_nonzero(ledger['side'].to_numpy() > 0)),
+      'num_short': int(np.count_nonzero(ledger['side'].to_numpy() < 0)),
+      'win_rate': round(len(wins) / count * 100, 2),
+      'avg_return': round(returns.mean() * 100, 4),
+      'avg_win': round(wins.mean() * 100, 4) if len(wins) else 0,
+      'avg_loss': round(losses.mean() * 100, 4) if len(losses) else 0,
+      'best_trade': round(returns.max() * 100, 4),
+      'worst_trade': round(returns.min() * 100, 4),
+      'profit_factor': round(profit_factor, 2) if profit_factor != float('inf') else 'inf',
+      'avg_bars_held': round(ledger['bars'].mean(), 2),
+      'max_consecutive_losses': _longest_run(returns < 0),
+      'total_costs': round(ledger['costs'].sum() * 100, 4),
+      'avg_mae': round(ledger['mae'].mean() * 100, 4),
+      'avg_mfe': round(ledger['mfe'].mean() * 100, 4),
+  }
+
+
+def ledger_columns(ledger):
+  """
+  The ledger as JSON-ready columns: {column: list}, times formatted as
+  on the equity curve, returns and excursions rounded like it. NaN and
+  infinite values (e.g. returns of trades entered at a zero price)
+  become None.
+  """
+  times = pd.DatetimeIndex(ledger['entry_time']).append(pd.DatetimeIndex(ledger['exit_time']))
+  date_format = bar_date_format(times)
+  columns = {}
+  for column in LEDGER_COLUMNS:
+      values = ledger[column]
+      if column.endswith('_time'):
+          columns[column] = _format_dates(pd.DatetimeIndex(values), date_format)
+      elif values.dtype.kind == 'f':
+          with np.errstate(over='ignore', invalid='ignore'):
+              rounded = np.round(values.to_numpy(), 6)
+          # Rounding can overflow values near the float limit, so check after
+          finite = np.isfinite(rounded)
+          rounded = rounded.astype(object)
+          rounded[~finite] = None
+          columns[column] = rounded.tolist()
+      else:
+          columns[column] = values.tolist()
+  return columns
+
+
+def _prices(df, column):
+  """float64 prices of ``column`` (Close if df has none), the last known where missing."""
+  values = df[column if column in df.columns else 'Close'].to_numpy(np.float64)
+  if np.isnan(values).any():
+      values = pd.Series(values).ffill().to_numpy()
+  return values
+
+
+def _longest_run(flags):
+  """Length of the longest run of True in a bool array."""
+  if not flags.any():
+      return 0
+  edges = np.flatnonzero(np.diff(np.r_[0, flags.view(np.int8), 0]))
+  return int((edges[1::2] - edges[::2]).max())
+
+
+def _empty_ledger(index):
+  ledger = pd.DataFrame({column: np.zeros(0, dtype=np.int64) for column in LEDGER_COLUMNS})
+  for column in ('entry_time', 'exit_time'):
+      ledger[column] = index[:0]
+  for column in ('position', 'entry_price', 'exit_price', 'return', 'costs', 'mae', 'mfe'):
+      ledger[column] = ledger[column].astype(np.float64)
+  return ledger.astype({'open': bool})
+
+
+def _empty_trade_metrics():
+  """Trade metrics of a backtest without trades."""
+  return {
+      'num_trades': 0,
+      'num_long': 0,
+      'num_short': 0,
+      'win_rate': 0,
+      'avg_return': 0,
+      'avg_win': 0,
+      'avg_loss': 0,
+      'best_trade': 0,
+      'worst_trade': 0,
+      'profit_factor': 0,
+      'avg_bars_held': 0,
+      'max_consecutive_losses': 0,
+      'total_costs': 0,
+      'avg_mae': 0,
+      'avg_mfe': 0,
+  }
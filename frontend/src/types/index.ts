@@ -32,10 +32,59 @@ export interface EquityPoint {
   value: number;
 }
 
+export interface TradeMetrics {
+  num_trades: number;
+  num_long: number;
+  num_short: number;
+  win_rate: number;
+  avg_return: number;
+  avg_win: number;
+  avg_loss: number;
+  best_trade: number;
+  worst_trade: number;
+  profit_factor: number | string;
+  avg_bars_held: number;
+  max_consecutive_losses: number;
+  total_costs: number;
+  avg_mae: number;
+  avg_mfe: number;
+}
+
+export interface TradeLedger {
+  entry_index: number[];
+  exit_index: number[];
+  entry_time: string[];
+  exit_time: string[];
+  side: number[];
+  position: number[];
+  bars: number[];
+  entry_price: number[];
+  exit_price: number[];
+  return: number[];
+  costs: number[];
+  mae: number[];
+  mfe: number[];
+  open: boolean[];
+}
+
+export interface RollingPoint {
+  date: string;
+  sharpe_ratio: number;
+  volatility: number;
+  max_drawdown: number;
+  win_rate: number;
+}
+
 export interface BacktestResponse {
   success: boolean;
   metrics: BacktestMetrics | null;
   equity_curve: EquityPoint[] | null;
+  trade_metrics?: TradeMetrics;
+  trades?: TradeLedger;
+  rolling?: {
+    window: number;
+    points: RollingPoint[];
+  };
   error: string | null;
   data_points?: number;
   date_range?: {
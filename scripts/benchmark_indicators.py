@@ -0,0 +1,97 @@
+"""
+Benchmark the NumPy indicator fast paths against pandas-ta.
+
+Run with: python scripts/benchmark_indicators.py [options]
+
+Options:
+    --bars N [N ...]        Bar counts to benchmark (default: 10000 100000 1000000)
+    --indicators NAME ...   Indicators to time (default: all fast ones)
+    --seed N                Synthetic data seed (default: 42)
+    --repeat N              Timed repetitions, best is reported (default: 5)
+
+Examples:
+    python scripts/benchmark_indicators.py
+    python scripts/benchmark_indicators.py --bars 1000000 --indicators rsi adx
+
+Bars are 5m bars from the seeded SyntheticProvider, in the compact
+dtypes DataService hands to strategies. Without pandas-ta installed only
+the fast paths are timed.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.compact import compact_bars
+from app.services.providers import SyntheticProvider
+from app.utils import fast_ta
+
+try:
+    import pandas_ta
+except ImportError:
+    pandas_ta = None
+
+
+def best_of(repeat, fn):
+    """Run fn `repeat` times, return the best seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark NumPy indicators against pandas-ta')
+    parser.add_argument('--bars', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--indicators', nargs='+', default=list(fast_ta.INDICATORS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    unknown = set(args.indicators) - set(fast_ta.INDICATORS)
+    if unknown:
+        parser.error(f"no fast path for: {', '.join(sorted(unknown))}")
+
+    if pandas_ta is None:
+        print("pandas-ta is not installed; timing the fast paths only")
+        verified = {}
+    else:
+        verified = fast_ta.verify(pandas_ta)
+
+    provider = SyntheticProvider(seed=args.seed)
+
+    for n_bars in args.bars:
+        df = compact_bars(provider.generate(n_bars, '5m'))
+        print(f"\n{n_bars:,} bars")
+        if pandas_ta is None:
+            print(f"  {'indicator':<10} {'numpy':>10}")
+        else:
+            print(f"  {'indicator':<10} {'numpy':>10} {'pandas-ta':>12} {'speedup':>9}")
+        print("  " + "-" * 44)
+
+        for name in args.indicators:
+            fn = fast_ta.INDICATORS[name]
+            inputs = [df[col.capitalize()] for col in fn.inputs]
+            fast = best_of(args.repeat, lambda: fn(*inputs))
+
+            if pandas_ta is None:
+                print(f"  {name:<10} {fast * 1000:>8.2f}ms")
+                continue
+
+            reference = getattr(pandas_ta, name)
+            slow = best_of(args.repeat, lambda: reference(*inputs, talib=False))
+            note = '' if name in verified else '  (differs, not used)'
+            print(f"  {name:<10} {fast * 1000:>8.2f}ms {slow * 1000:>10.2f}ms {slow / fast:>8.1f}x{note}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
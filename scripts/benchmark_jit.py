@@ -0,0 +1,196 @@
+"""
+Benchmark strategies interpreted against their JIT-compiled row loops.
+
+Run with: python scripts/benchmark_jit.py [options]
+
+Options:
+    --bars N [N ...]        Bar counts to benchmark (default: 10000 100000 1000000)
+    --strategies NAME ...   Strategies to time (default: all)
+    --seed N                Synthetic data seed (default: 42)
+    --repeat N              Timed repetitions, best is reported (default: 3)
+
+Examples:
+    python scripts/benchmark_jit.py
+    python scripts/benchmark_jit.py --bars 1000000 --strategies trailing_stop
+
+Each strategy runs through execute_strategy in one sandbox worker, with
+the jit_loops setting off and then on, each time in a fresh pool that
+is warmed up before timing, so worker startup is never counted. The
+first JIT run includes numba's compilation and is reported separately. Strategies are the
+example in scripts/test_backtest.py, the moving average cross from
+scripts/benchmark_backtest.py and loop-over-arrays versions of the
+helper examples (app/corpus/helpers). Loops over pandas objects are not
+compiled, so the first two show the interpreter's time either way.
+Without numba installed only the interpreted runs are timed.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / 'scripts'))
+
+from app.services.compact import compact_bars
+from app.services.providers import SyntheticProvider
+from app.utils import jit_loops, sandbox
+from benchmark_backtest import STRATEGY as SMA_CROSS
+from test_backtest import CODE as EMA_EXPANSION
+
+BARS_SINCE = """
+def strategy(df):
+    close = df['Close'].to_numpy()
+    fast = df['Close'].ewm(span=9).mean().to_numpy()
+    slow = df['Close'].ewm(span=20).mean().to_numpy()
+    body = (df['Close'] - df['Open']).abs().to_numpy()
+    n = len(close)
+    signals = np.zeros(n)
+    since = 999
+    held = 0
+    for i in range(1, n):
+        if fast[i] > slow[i] and fast[i - 1] <= slow[i - 1]:
+            since = 0
+        else:
+            since += 1
+        if since <= 10 and body[i] > 1.5 * body[i - 1] and close[i] > close[i - 1]:
+            held = 1
+        elif fast[i] < slow[i]:
+            held = 0
+        signals[i] = held
+    return pd.Series(signals, index=df.index)
+"""
+
+TRAILING_STOP = """
+def strategy(df):
+    close = df['Close'].to_numpy()
+    low = df['Low'].to_numpy()
+    atr = (df['High'] - df['Low']).rolling(14).mean().fillna(0).to_numpy()
+    upper = df['High'].rolling(20).max().shift(1).fillna(np.inf).to_numpy()
+    n = len(close)
+    signals = np.zeros(n)
+    stop = 0.0
+    held = False
+    for i in range(n):
+        if held and low[i] <= stop:
+            held = False
+        elif not held and close[i] > upper[i]:
+            held = True
+            stop = close[i] - 3 * atr[i]
+        if held:
+            stop = max(stop, close[i] - 3 * atr[i])
+            signals[i] = 1
+    return pd.Series(signals, index=df.index)
+"""
+
+SWING_BREAKOUT = """
+def strategy(df):
+    high = df['High'].to_numpy()
+    low = df['Low'].to_numpy()
+    close = df['Close'].to_numpy()
+    n = len(close)
+    signals = np.zeros(n)
+    last_high = np.inf
+    last_low = -np.inf
+    position = 0
+    for i in range(4, n):
+        pivot = i - 2
+        if high[pivot] > max(high[pivot - 2], high[pivot - 1]) and high[pivot] >= max(high[pivot + 1], high[i]):
+            last_high = high[pivot]
+        if low[pivot] < min(low[pivot - 2], low[pivot - 1]) and low[pivot] <= min(low[pivot + 1], low[i]):
+            last_low = low[pivot]
+        if close[i] > last_high:
+            position = 1
+        elif close[i] < last_low:
+            position = -1
+        signals[i] = position
+    return pd.Series(signals, index=df.index)
+"""
+
+# Run on a fresh JIT pool before timing: it starts the worker without
+# compiling anything
+WARM_UP = """
+def strategy(df):
+    return pd.Series(0, index=df.index)
+"""
+
+STRATEGIES = {
+    'ema_expansion': EMA_EXPANSION,
+    'sma_cross': SMA_CROSS,
+    'bars_since': BARS_SINCE,
+    'trailing_stop': TRAILING_STOP,
+    'swing_breakout': SWING_BREAKOUT,
+}
+
+
+def timed(code, df):
+    """Run code in the sandbox, return (seconds, result)."""
+    start = time.perf_counter()
+    result = sandbox.execute_strategy(code, df)
+    return time.perf_counter() - start, result
+
+
+def best_of(repeat, code, df):
+    """Best seconds of `repeat` runs and the last result."""
+    runs = [timed(code, df) for _ in range(repeat)]
+    return min(seconds for seconds, _ in runs), runs[-1][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark interpreted against JIT-compiled strategy loops')
+    parser.add_argument('--bars', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    unknown = set(args.strategies) - set(STRATEGIES)
+    if unknown:
+        parser.error(f"unknown strategies: {', '.join(sorted(unknown))}")
+
+    jit = jit_loops.available()
+    if not jit:
+        print("numba is not installed; timing the interpreted runs only")
+
+    provider = SyntheticProvider(seed=args.seed)
+
+    for n_bars in args.bars:
+        df = compact_bars(provider.generate(n_bars, '5m'))
+        print(f"\n{n_bars:,} bars")
+        print(f"  {'strategy':<16} {'loops':>5} {'interpreted':>12} {'jit first':>10} {'jit':>10} {'speedup':>9}")
+        print("  " + "-" * 68)
+
+        for name in args.strategies:
+            code = STRATEGIES[name]
+            loops = len(sandbox.compile_strategy(code).jit_spans)
+
+            # A fresh pool per setting, so every JIT run starts uncompiled
+            sandbox.configure(workers=1, jit_loops=False, max_estimated_seconds=0)
+            timed(code, df)
+            interpreted, result = best_of(args.repeat, code, df)
+            if not result['success']:
+                print(f"  {name:<16} failed: {result['error']}")
+                continue
+            if not jit:
+                print(f"  {name:<16} {loops:>5} {interpreted * 1000:>10.1f}ms")
+                continue
+
+            sandbox.configure(jit_loops=True)
+            timed(WARM_UP, df)
+            first, compiled = timed(code, df)
+            seconds, compiled = best_of(args.repeat, code, df)
+            same = compiled['success'] and np.array_equal(compiled['signals'], result['signals'])
+            note = '' if same else '  (signals differ)'
+            print(f"  {name:<16} {loops:>5} {interpreted * 1000:>10.1f}ms {first * 1000:>8.1f}ms "
+                  f"{seconds * 1000:>8.1f}ms {interpreted / seconds:>8.1f}x{note}")
+
+    sandbox.configure(jit_loops=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,186 @@
+"""
+Benchmark the NumPy metrics kernel against the pandas implementation.
+
+Run with: python scripts/benchmark_metrics.py [options]
+
+Options:
+    --bars N [N ...]    Bar counts to benchmark (default: 10000 100000 1000000)
+    --seed N            Synthetic data seed (default: 42)
+    --repeat N          Timed repetitions, best is reported (default: 3)
+    --variants N        Signal variants ranked by batch_metrics (default: 200)
+
+Examples:
+    python scripts/benchmark_metrics.py
+    python scripts/benchmark_metrics.py --bars 1000000 --repeat 5
+    python scripts/benchmark_metrics.py --bars 10000 --variants 2000
+
+The pandas implementation below is what calculate_metrics and
+calculate_equity_curve did before the shared kernel: each copied the
+frame and recomputed returns, and the equity curve formatted every date
+with strftime. Results of both are checked to be equal.
+
+batch_metrics is timed against calculate_metrics called once per
+variant, on moving average crosses of a range of lengths. The trade
+ledger (app/utils/trades.py) is timed on its own, and so is the kernel
+with every trading cost (app/utils/costs.py) switched on.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.compact import compact_bars
+from app.services.providers import SyntheticProvider
+from app.utils.costs import bar_costs, parse_costs
+from app.utils.metrics import (
+    bar_date_format, bar_returns, batch_metrics, calculate_metrics, calculate_performance, held_signals,
+    metrics_kernel, _empty_metrics
+)
+from app.utils.trades import ledger_columns, trade_ledger, trade_metrics
+
+
+def pandas_metrics(df, signals, periods_per_year):
+    """calculate_metrics on DataFrames."""
+    df = df.copy()
+    df['returns'] = df['Close'].astype('float64').pct_change()
+    df['signal'] = signals.shift(1)
+    df['strategy_returns'] = df['signal'] * df['returns']
+    df = df.dropna()
+    if len(df) == 0:
+        return _empty_metrics()
+
+    strategy_returns = df['strategy_returns']
+    total_return = (1 + strategy_returns).prod() - 1
+    years = len(df) / periods_per_year
+    cagr = (1 + total_return) ** (1 / years) - 1 if years > 0 and total_return > -1 else 0
+    std = strategy_returns.std()
+    sharpe = (strategy_returns.mean() / std) * np.sqrt(periods_per_year) if std > 0 else 0
+    cumulative = (1 + strategy_returns).cumprod()
+    max_drawdown = (cumulative / cumulative.expanding().max() - 1).min()
+    trades = df[df['signal'] != 0]['strategy_returns']
+    win_rate = (trades > 0).sum() / len(trades) if len(trades) > 0 else 0
+    num_trades = int((df['signal'].diff() != 0).sum())
+    avg_trade_return = trades.mean() if len(trades) > 0 else 0
+    gross_profits = trades[trades > 0].sum()
+    gross_losses = abs(trades[trades < 0].sum())
+    if gross_losses > 0:
+        profit_factor = gross_profits / gross_losses
+    else:
+        profit_factor = float('inf') if gross_profits > 0 else 0
+
+    return {
+        'total_return': round(total_return * 100, 2),
+        'cagr': round(cagr * 100, 2),
+        'sharpe_ratio': round(sharpe, 2),
+        'max_drawdown': round(max_drawdown * 100, 2),
+        'win_rate': round(win_rate * 100, 2),
+        'num_trades': num_trades,
+        'avg_trade_return': round(avg_trade_return * 100, 4),
+        'profit_factor': round(profit_factor, 2) if profit_factor != float('inf') else 'inf'
+    }
+
+
+def pandas_equity_curve(df, signals):
+    """calculate_equity_curve on DataFrames."""
+    df = df.copy()
+    df['returns'] = df['Close'].astype('float64').pct_change()
+    df['signal'] = signals.shift(1)
+    df['strategy_returns'] = df['signal'] * df['returns']
+    df = df.dropna()
+    cumulative = (1 + df['strategy_returns']).cumprod()
+    date_format = bar_date_format(cumulative.index)
+    return [{'date': date.strftime(date_format), 'value': round(value, 4)} for date, value in cumulative.items()]
+
+
+def variant_signals(close, variants):
+    """Signals of `variants` moving average crosses, one row each."""
+    cumulative = np.r_[0, np.cumsum(close)]
+    signals = np.zeros((variants, len(close)))
+    for row in range(variants):
+        length = 5 + row % 200
+        mean = np.full(len(close), np.nan)
+        mean[length - 1:] = (cumulative[length:] - cumulative[:-length]) / length
+        signals[row] = np.where(np.isnan(mean), 0, np.sign(close - mean) * (1 if row < 200 else -1))
+    return signals
+
+
+def best_of(repeat, fn):
+    """Run fn `repeat` times, return (best seconds, last result)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the metrics kernel against pandas')
+    parser.add_argument('--bars', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--variants', type=int, default=200)
+    args = parser.parse_args()
+
+    provider = SyntheticProvider(seed=args.seed)
+    periods = 252 * 78  # 5m bars
+
+    for n_bars in args.bars:
+        df = compact_bars(provider.generate(n_bars, '5m'))
+        signals = pd.Series(np.sign(df['Close'] - df['Close'].rolling(50).mean()).fillna(0), index=df.index)
+
+        print(f"\n{n_bars:,} bars")
+        print(f"  {'step':<28} {'numpy':>10} {'pandas':>10} {'speedup':>9}")
+        print("  " + "-" * 60)
+
+        returns, signal = bar_returns(df), held_signals(signals, df.index)
+        kernel, _ = best_of(args.repeat, lambda: metrics_kernel(returns, signal, periods))
+        print(f"  {'metrics_kernel':<28} {kernel * 1000:>8.1f}ms")
+
+        costs = parse_costs({
+            'commission': 1, 'commission_bps': 0.5, 'slippage_bps': 1, 'spread_bps': 1, 'borrow_rate': 0.03,
+        })
+        charged, _ = best_of(args.repeat, lambda: metrics_kernel(
+            returns, signal, periods, bar_costs(signal, costs, periods)
+        ))
+        print(f"  {'metrics_kernel with costs':<28} {charged * 1000:>8.1f}ms")
+
+        fast, (metrics, curve) = best_of(args.repeat, lambda: calculate_performance(df, signals, periods))
+        slow_metrics, expected = best_of(args.repeat, lambda: pandas_metrics(df, signals, periods))
+        slow_curve, expected_curve = best_of(1, lambda: pandas_equity_curve(df, signals))
+        slow = slow_metrics + slow_curve
+
+        same = metrics == expected and curve == expected_curve
+        note = '' if same else '  (results differ)'
+        print(f"  {'metrics + equity curve':<28} {fast * 1000:>8.1f}ms {slow * 1000:>8.1f}ms {slow / fast:>8.1f}x{note}")
+
+        ledger_time, ledger = best_of(args.repeat, lambda: trade_ledger(df, signals))
+        columns_time, _ = best_of(args.repeat, lambda: (trade_metrics(ledger), ledger_columns(ledger)))
+        label = f'trade ledger ({len(ledger):,} trades)'
+        print(f"  {label:<28} {ledger_time * 1000:>8.1f}ms")
+        print(f"  {'trade metrics + columns':<28} {columns_time * 1000:>8.1f}ms")
+
+        variants = variant_signals(df['Close'].to_numpy(dtype=np.float64), args.variants)
+        batch, table = best_of(args.repeat, lambda: batch_metrics(returns, variants, periods))
+        looped, rows = best_of(1, lambda: [
+            calculate_metrics(df, pd.Series(row, index=df.index), periods) for row in variants
+        ])
+        expected = [{k: np.inf if v == 'inf' else v for k, v in row.items()} for row in rows]
+        note = '' if table.to_dict('records') == expected else '  (results differ)'
+        label = f'batch_metrics x{args.variants}'
+        print(f"  {label:<28} {batch * 1000:>8.1f}ms {looped * 1000:>8.1f}ms {looped / batch:>8.1f}x{note}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
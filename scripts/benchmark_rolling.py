@@ -0,0 +1,119 @@
+"""
+Benchmark the rolling metrics against pandas rolling().apply.
+
+Run with: python scripts/benchmark_rolling.py [options]
+
+Options:
+    --bars N [N ...]    Bar counts to benchmark (default: 10000 1000000)
+    --window N          Bars in each window (default: 390, a week of 5m bars)
+    --naive-bars N      Largest bar count the apply version is timed on;
+                        it is quadratic-ish and takes minutes on 1M bars
+                        (default: 100000)
+    --seed N            Synthetic data seed (default: 42)
+    --repeat N          Timed repetitions, best is reported (default: 3)
+
+Examples:
+    python scripts/benchmark_rolling.py
+    python scripts/benchmark_rolling.py --bars 1000000 --window 4914 --naive-bars 0
+
+The apply version recomputes every window from scratch, which is how
+rolling metrics are usually written. Results of both are checked to be
+equal.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.compact import compact_bars
+from app.services.providers import SyntheticProvider
+from app.utils.metrics import bar_returns, counted_returns, held_signals
+from app.utils.rolling_metrics import rolling_kernel, ROLLING_COLUMNS
+
+
+def apply_rolling(strategy_returns, signal, window, periods_per_year):
+    """rolling_kernel with rolling().apply over every window."""
+    def sharpe(x):
+        std = x.std(ddof=1)
+        return x.mean() / std * np.sqrt(periods_per_year) if std > 0 else 0
+
+    def max_drawdown(x):
+        equity = np.cumprod(np.r_[1, 1 + x])
+        return ((equity / np.maximum.accumulate(equity)).min() - 1) * 100
+
+    def win_rate(bars):
+        # Windows of bar numbers, to see the returns and positions together
+        start, end = int(bars[0]), int(bars[-1]) + 1
+        held = signal[start:end] != 0
+        wins = (strategy_returns[start:end] > 0) & held
+        return wins.sum() / held.sum() * 100 if held.any() else 0
+
+    returns = pd.Series(strategy_returns).rolling(window)
+    return {
+        'sharpe_ratio': returns.apply(sharpe, raw=True).to_numpy(),
+        'volatility': returns.apply(lambda x: x.std(ddof=1) * np.sqrt(periods_per_year) * 100, raw=True).to_numpy(),
+        'max_drawdown': returns.apply(max_drawdown, raw=True).to_numpy(),
+        'win_rate': pd.Series(np.arange(len(signal), dtype=np.float64)).rolling(window).apply(
+            win_rate, raw=True
+        ).to_numpy(),
+    }
+
+
+def best_of(repeat, fn):
+    """Run fn `repeat` times, return (best seconds, last result)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rolling metrics against rolling().apply')
+    parser.add_argument('--bars', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--window', type=int, default=390)
+    parser.add_argument('--naive-bars', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    provider = SyntheticProvider(seed=args.seed)
+    periods = 252 * 78  # 5m bars
+
+    for n_bars in args.bars:
+        df = compact_bars(provider.generate(n_bars, '5m'))
+        signals = pd.Series(np.sign(df['Close'] - df['Close'].rolling(50).mean()).fillna(0), index=df.index)
+        signal = held_signals(signals, df.index)
+        strategy_returns, signal, _ = counted_returns(bar_returns(df), signal)
+
+        print(f"\n{n_bars:,} bars, window {args.window}")
+        print(f"  {'step':<16} {'O(n)':>10} {'apply':>10} {'speedup':>9}")
+        print("  " + "-" * 48)
+
+        fast, result = best_of(args.repeat, lambda: rolling_kernel(strategy_returns, signal, args.window, periods))
+        if n_bars > args.naive_bars:
+            print(f"  {'rolling_kernel':<16} {fast * 1000:>8.1f}ms")
+            continue
+
+        slow, expected = best_of(1, lambda: apply_rolling(strategy_returns, signal, args.window, periods))
+        same = all(
+            np.allclose(result[column], expected[column], rtol=1e-6, equal_nan=True) for column in ROLLING_COLUMNS
+        )
+        note = '' if same else '  (results differ)'
+        print(f"  {'rolling_kernel':<16} {fast * 1000:>8.1f}ms {slow * 1000:>8.1f}ms {slow / fast:>8.1f}x{note}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
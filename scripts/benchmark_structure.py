@@ -0,0 +1,102 @@
+"""
+Benchmark the market structure helpers strategies call in the sandbox.
+
+Run with: python scripts/benchmark_structure.py [options]
+
+Options:
+    --bars N [N ...]    Bar counts to benchmark (default: 10000 100000 1000000)
+    --left N            Swing bars before the pivot (default: 2)
+    --right N           Swing bars after the pivot (default: 2)
+    --seed N            Synthetic data seed (default: 42)
+    --repeat N          Timed repetitions, best is reported (default: 5)
+    --loop-bars N       Also time a per-bar loop of the swing detection up
+                        to this many bars (default: 100000, 0 to skip)
+
+Examples:
+    python scripts/benchmark_structure.py
+    python scripts/benchmark_structure.py --bars 1000000 --left 5 --right 5
+
+Bars are 5m bars from the seeded SyntheticProvider, in the compact
+dtypes DataService hands to strategies.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.compact import compact_bars
+from app.services.providers import SyntheticProvider
+from app.utils import market_structure
+
+
+def best_of(repeat, fn):
+    """Run fn `repeat` times, return the best seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def loop_swing_highs(high, left, right):
+    """Swing highs the way a per-bar strategy loop finds them."""
+    high = high.tolist()
+    out = [np.nan] * len(high)
+    for i in range(left + right, len(high)):
+        pivot = i - right
+        if all(high[pivot] > h for h in high[pivot - left:pivot]) and \
+                all(high[pivot] >= h for h in high[pivot + 1:i + 1]):
+            out[i] = high[pivot]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the market structure helpers')
+    parser.add_argument('--bars', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--left', type=int, default=2)
+    parser.add_argument('--right', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--loop-bars', type=int, default=100_000)
+    args = parser.parse_args()
+
+    provider = SyntheticProvider(seed=args.seed)
+    swings = dict(left=args.left, right=args.right)
+    functions = {
+        'swing_highs': lambda df: market_structure.swing_highs(df['High'], **swings),
+        'structure': lambda df: market_structure.structure(df, **swings),
+        'cisd': market_structure.cisd,
+        'protected_swings': lambda df: market_structure.protected_swings(df, **swings),
+    }
+
+    for n_bars in args.bars:
+        df = compact_bars(provider.generate(n_bars, '5m'))
+        print(f"\n{n_bars:,} bars (left={args.left}, right={args.right})")
+        print(f"  {'function':<18} {'time':>10} {'bars/s':>12}")
+        print("  " + "-" * 42)
+
+        for name, fn in functions.items():
+            seconds = best_of(args.repeat, lambda: fn(df))
+            print(f"  {name:<18} {seconds * 1000:>8.2f}ms {n_bars / seconds:>12,.0f}")
+
+        if n_bars <= args.loop_bars:
+            vectorized = market_structure.swing_highs(df['High'], **swings).to_numpy()
+            start = time.perf_counter()
+            looped = loop_swing_highs(df['High'].to_numpy(np.float64), **swings)
+            seconds = time.perf_counter() - start
+            assert np.array_equal(vectorized, looped, equal_nan=True), 'loop and vectorized swings differ'
+            print(f"  {'swing loop':<18} {seconds * 1000:>8.2f}ms {n_bars / seconds:>12,.0f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
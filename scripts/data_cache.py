@@ -0,0 +1,132 @@
+"""
+Inspect and prune the market data cache.
+
+Run with: python scripts/data_cache.py COMMAND [options]
+
+Commands:
+    list                List cached datasets, least recently used first
+    prune               Delete datasets over a limit, or all matching ones with --all
+    reindex             Add Parquet files written before the manifest existed
+
+Options:
+    --cache-dir PATH    Cache root (default: data/cache)
+    --ticker T [T ...]  Only these tickers (list, prune)
+    --max-mb N          prune: shrink each provider's cache to N MB
+    --idle-days N       prune: delete datasets unused for N days
+    --all               prune: delete every matching dataset (instead of limits)
+    --dry-run           prune: show what would be deleted
+
+Examples:
+    python scripts/data_cache.py list
+    python scripts/data_cache.py prune --max-mb 500
+    python scripts/data_cache.py prune --idle-days 30 --dry-run
+    python scripts/data_cache.py prune --ticker SPY QQQ --all
+
+Each provider namespace (data/cache for Yahoo, data/cache/synthetic_seed42
+etc.) has its own manifest and budget.
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.bar_store import BarStore
+from app.services.cache_manifest import MANIFEST_NAME
+from app.services.data_service import prune_cache
+
+
+def cache_dirs(root):
+    """The cache root plus every provider namespace below it."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+
+    dirs = [root]
+    for path in sorted(root.iterdir()):
+        if path.is_dir() and ((path / MANIFEST_NAME).exists() or any(path.glob('*.parquet'))):
+            dirs.append(path)
+    return dirs
+
+
+def format_time(ts):
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+
+
+def format_mb(nbytes):
+    return f"{nbytes / 1024 / 1024:.1f}"
+
+
+def list_datasets(root, tickers):
+    total = 0
+    for cache_dir in cache_dirs(root):
+        entries = BarStore(cache_dir).manifest.entries()
+        entries = [e for e in entries if tickers is None or e['ticker'] in tickers]
+        if not entries:
+            continue
+
+        print(f"\n{cache_dir}")
+        print(f"  {'ticker':<10} {'int':<5} {'from':<12} {'to':<12} {'MB':>8}  {'refreshed':<16}  {'accessed':<16}")
+        for e in entries:
+            print(
+                f"  {e['ticker']:<10} {e['interval']:<5} {(e['covered_from'] or '')[:10]:<12} "
+                f"{(e['covered_to'] or '')[:10]:<12} {format_mb(e['bytes']):>8}  "
+                f"{format_time(e['refreshed_at']):<16}  {format_time(e['accessed_at']):<16}"
+            )
+        subtotal = sum(e['bytes'] for e in entries)
+        total += subtotal
+        print(f"  {len(entries)} datasets, {format_mb(subtotal)} MB")
+
+    print(f"\nTotal: {format_mb(total)} MB")
+
+
+def prune(root, tickers, max_mb, idle_days, dry_run, remove_all=False):
+    max_bytes = max_mb * 1024 * 1024 if max_mb is not None else None
+    max_idle = idle_days * 86400 if idle_days is not None else None
+
+    for cache_dir in cache_dirs(root):
+        removed = prune_cache(cache_dir, max_bytes, max_idle, tickers, dry_run=dry_run, remove_all=remove_all)
+
+        for ticker, interval in removed:
+            print(f"  {'would remove' if dry_run else 'removed'} {cache_dir / f'{ticker}_{interval}'}")
+
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and prune the market data cache')
+    parser.add_argument('command', choices=['list', 'prune', 'reindex'])
+    parser.add_argument('--cache-dir', default='data/cache')
+    parser.add_argument('--ticker', nargs='+', default=None)
+    parser.add_argument('--max-mb', type=float, default=None)
+    parser.add_argument('--idle-days', type=float, default=None)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--all', action='store_true', dest='remove_all')
+    args = parser.parse_args()
+
+    if args.command == 'prune':
+        limited = args.max_mb is not None or args.idle_days is not None
+        if not limited and not args.remove_all:
+            parser.error('prune needs --max-mb and/or --idle-days, or --all to delete every matching dataset')
+        if limited and args.remove_all:
+            parser.error('--all cannot be combined with --max-mb or --idle-days')
+
+    tickers = {t.upper() for t in args.ticker} if args.ticker else None
+
+    if args.command == 'list':
+        list_datasets(args.cache_dir, tickers)
+    elif args.command == 'reindex':
+        for cache_dir in cache_dirs(args.cache_dir):
+            print(f"  {cache_dir}: {BarStore(cache_dir).reindex()} datasets added")
+    else:
+        return prune(args.cache_dir, tickers, args.max_mb, args.idle_days, args.dry_run, args.remove_all)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main() or 0)
@@ -0,0 +1,177 @@
+"""Tests for the static cost analysis of strategy code."""
+
+import pytest
+from app.utils import code_cost
+from app.utils.code_cost import analyze_cost
+
+
+def kinds(report):
+    return [(f['kind'], f['line'], f['order']) for f in report.findings]
+
+
+class TestAnalyzeCost:
+    """Tests for analyze_cost."""
+
+    def test_vectorized_code_has_no_findings(self):
+        code = """
+def strategy(df):
+    fast = df['Close'].rolling(10).mean()
+    slow = df['Close'].rolling(50).mean()
+    params = [5, 10, 20]
+    for length in params:
+        fast = fast + df['Close'].shift(length)
+    for i in range(len(params)):
+        pass
+    return pd.Series(np.where(fast > slow, 1, 0), index=df.index)
+"""
+        report = analyze_cost(code)
+
+        assert not report
+        assert report.estimate_seconds(1_000_000) == 0
+
+    def test_row_loop_with_scalar_writes(self):
+        code = """
+def strategy(df):
+    signals = pd.Series(0, index=df.index)
+    for i in range(1, len(df)):
+        if df['Close'].iloc[i] > df['Close'].iloc[i - 1]:
+            signals.iloc[i] = 1
+    return signals
+"""
+        report = analyze_cost(code)
+
+        assert kinds(report) == [('row_loop', 4, 1), ('scalar_write', 6, 1)]
+        loop, write = report.findings
+        assert loop['code'] == 'for i in range(1, len(df)):'
+        assert 'Scalar .iloc write' in write['message']
+        # Linear in the bar count
+        assert report.estimate_seconds(20000) == pytest.approx(2 * report.estimate_seconds(10000))
+
+    def test_bar_counts_through_names_and_shape(self):
+        code = """
+def strategy(df):
+    n = len(df)
+    last = n - 1
+    out = pd.Series(0, index=df.index)
+    for i in range(last):
+        out.at[df.index[i]] = 1
+    j = 0
+    while j < df.shape[0]:
+        j += 1
+    return out
+"""
+        report = analyze_cost(code)
+
+        assert kinds(report) == [('row_loop', 6, 1), ('scalar_write', 7, 1), ('row_loop', 9, 1)]
+
+    def test_iterrows_comprehensions_and_columns(self):
+        code = """
+def strategy(df):
+    a = [row['Close'] for _, row in df.iterrows()]
+    b = [x * 2 for x in df['Close']]
+    for i, value in enumerate(df['Close'].values):
+        pass
+    return pd.Series(a, index=df.index)
+"""
+        report = analyze_cost(code)
+
+        assert kinds(report) == [('row_loop', 3, 1), ('row_loop', 4, 1), ('row_loop', 5, 1)]
+        assert report.findings[0]['seconds_per_bar'] > report.findings[1]['seconds_per_bar']
+
+    def test_nested_row_loops_are_quadratic(self):
+        code = """
+def strategy(df):
+    out = pd.Series(0, index=df.index)
+    for i in range(len(df)):
+        for j in range(i, len(df)):
+            out.iloc[j] = 1
+    return out
+"""
+        report = analyze_cost(code)
+
+        assert kinds(report) == [('row_loop', 4, 1), ('row_loop', 5, 2), ('scalar_write', 6, 2)]
+        assert report.estimate_seconds(2000) > 3.9 * report.estimate_seconds(1000)
+
+    def test_apply_with_python_functions(self):
+        code = """
+def score(row):
+    return row['Close'] - row['Open']
+
+def strategy(df):
+    a = df['Close'].apply(lambda x: x * 2)
+    b = df.apply(score, axis=1)
+    c = df['Close'].rolling(20).apply(lambda w: w.max() - w.min(), raw=True)
+    d = df['Close'].apply(np.sign)
+    e = df['Close'].map({1: 2})
+    return a
+"""
+        report = analyze_cost(code)
+
+        assert kinds(report) == [('apply', 6, 1), ('apply', 7, 1), ('apply', 8, 1)]
+        element, row, window = (f['seconds_per_bar'] for f in report.findings)
+        assert element < window < row
+
+    def test_branches_share_the_loop(self):
+        single = """
+def strategy(df):
+    out = pd.Series(0, index=df.index)
+    for i in range(len(df)):
+        out.iloc[i] = 1
+    return out
+"""
+        branched = """
+def strategy(df):
+    out = pd.Series(0, index=df.index)
+    for i in range(len(df)):
+        if i % 2:
+            out.iloc[i] = 1
+        else:
+            out.iloc[i] = -1
+    return out
+"""
+        writes = [
+            sum(f['seconds_per_bar'] for f in analyze_cost(code).findings if f['kind'] == 'scalar_write')
+            for code in (single, branched)
+        ]
+
+        assert writes[0] == pytest.approx(writes[1])
+
+    def test_warnings_are_worst_first_with_estimates(self):
+        code = """
+def strategy(df):
+    a = df['Close'].apply(lambda x: x)
+    for i in range(len(df)):
+        for j in range(len(df)):
+            pass
+    return a
+"""
+        warnings = analyze_cost(code).warnings(bars=1000)
+
+        assert [w['line'] for w in warnings] == [5, 3, 4]
+        assert all(w['estimated_seconds'] > 0 and w['suggestion'] for w in warnings)
+
+    def test_syntax_errors_raise(self):
+        with pytest.raises(SyntaxError):
+            analyze_cost('def strategy(df) return df')
+
+    @pytest.mark.parametrize('bounds', ['0, 10, 0', str(10 ** 30), f'-{2 ** 70}, {2 ** 70}, 1'])
+    def test_degenerate_constant_ranges(self, bounds):
+        code = f"""
+def strategy(df):
+    signals = pd.Series(0, index=df.index)
+    for k in range({bounds}):
+        for i in range(len(df)):
+            signals.iloc[i] = 1
+    return signals
+"""
+        report = analyze_cost(code)
+
+        assert [f['kind'] for f in report.findings] == ['row_loop', 'scalar_write']
+
+    def test_analyzer_failures_mean_no_findings(self, monkeypatch):
+        def fail(self, node):
+            raise RecursionError()
+
+        monkeypatch.setattr(code_cost._Analyzer, 'visit', fail)
+
+        assert not analyze_cost('def strategy(df):\n    return df')
@@ -0,0 +1,127 @@
+"""Tests for trading costs in metrics and the trade ledger."""
+
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils.costs import bar_costs, parse_costs, DEFAULT_COSTS
+from app.utils.metrics import bar_returns, calculate_metrics, calculate_performance, metrics_kernel
+from app.utils.trades import trade_ledger
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(31)
+    close = 100 * np.exp(rng.standard_normal(1000).cumsum() * 0.01)
+    return pd.DataFrame({'Close': close}, index=pd.date_range('2022-01-03', periods=len(close), freq='D'))
+
+
+@pytest.fixture
+def signals(bars):
+    values = np.repeat(np.random.default_rng(32).choice([-1.0, 0.0, 1.0], 100), 10)
+    return pd.Series(values, index=bars.index)
+
+
+class TestParseCosts:
+    """Tests for parse_costs."""
+
+    def test_defaults_are_frictionless(self):
+        assert parse_costs(None) == DEFAULT_COSTS
+        assert bar_costs(np.ones(5), parse_costs(None)) is None
+        assert bar_costs(np.ones(5), None) is None
+
+    def test_fills_in_defaults(self):
+        costs = parse_costs({'slippage_bps': 2, 'borrow_rate': 0.05})
+
+        assert costs == {**DEFAULT_COSTS, 'slippage_bps': 2.0, 'borrow_rate': 0.05}
+
+    @pytest.mark.parametrize('settings', [
+        {'fees': 1}, {'slippage_bps': -1}, {'spread_bps': '2'}, {'commission': True},
+        {'capital': 0}, {'borrow_rate': float('nan')}, [1, 2],
+    ])
+    def test_rejects_bad_settings(self, settings):
+        with pytest.raises(ValueError):
+            parse_costs(settings)
+
+
+class TestBarCosts:
+    """Tests for bar_costs."""
+
+    def test_fills_and_holding_costs(self):
+        position = np.array([np.nan, 0, 1, 1, 1, -1, -1, 0, 2, 2])
+        costs = parse_costs({
+            'commission': 10, 'capital': 10_000, 'commission_bps': 1, 'slippage_bps': 2, 'spread_bps': 2,
+            'borrow_rate': 0.0252, 'financing_rate': 0.0504,
+        })
+
+        charges = bar_costs(position, costs, periods_per_year=252)
+
+        fill = 4 / 10_000
+        fixed = 10 / 10_000
+        expected = [
+            0, 0,
+            fill + fixed, 0, fill + fixed,                        # long: open, hold, close
+            fill + fixed + 0.0001, fill + fixed + 0.0001,         # short: borrow every bar
+            0,
+            2 * fill + fixed + 0.0002, 0.0002,                    # 2x long, still open at the end
+        ]
+        np.testing.assert_allclose(charges, expected)
+
+    def test_resizes_pay_for_the_size_traded(self):
+        position = np.array([1, 2, 2, 0.5, 0.5, -0.5, 0])
+        costs = parse_costs({'commission': 10, 'capital': 10_000, 'slippage_bps': 10})
+
+        charges = bar_costs(position, costs)
+
+        fill = 10 / 10_000
+        fixed = 10 / 10_000
+        expected = [
+            fill + fixed,                            # open 1
+            fill + fixed,                            # 1 -> 2 adds 1
+            1.5 * fill + fixed,                      # 2 -> 0.5 cuts 1.5, on the last bar at 2
+            0,
+            0.5 * fill + fixed,                      # close 0.5 before reversing
+            2 * (0.5 * fill + fixed),                # open -0.5, close it on the same bar
+            0,
+        ]
+        np.testing.assert_allclose(charges, expected)
+        fills = np.abs(np.diff(position, prepend=0)).sum()
+        assert (charges.sum() - 6 * fixed) == pytest.approx(fills * fill)
+
+
+class TestCostsInMetrics:
+    """Tests for costs in calculate_metrics and trade_ledger."""
+
+    def test_subtracted_from_strategy_returns(self, bars, signals):
+        costs = parse_costs({'slippage_bps': 5, 'borrow_rate': 0.02})
+        position = signals.shift(1).to_numpy()
+        net = np.nan_to_num(position * bar_returns(bars)) - bar_costs(position, costs)
+
+        metrics, curve = calculate_performance(bars, signals, costs=costs)
+
+        assert curve[-1]['value'] == round(np.prod(1 + net[1:]), 4)
+        assert metrics['total_return'] == round((np.prod(1 + net[1:]) - 1) * 100, 2)
+        assert metrics['total_return'] < calculate_metrics(bars, signals)['total_return']
+
+    def test_frictionless_by_default(self, bars, signals):
+        assert calculate_metrics(bars, signals, costs=parse_costs({})) == calculate_metrics(bars, signals)
+
+    def test_charges_on_skipped_bars_move_to_the_next(self):
+        returns = np.array([np.nan, 0.01, np.nan, 0.02, 0.01])
+        signal = np.array([np.nan, 1, 1, 1, 1])
+        charges = np.array([0, 0.001, 0.002, 0, 0.003])
+
+        _, equity, valid = metrics_kernel(returns, signal, costs=charges)
+
+        assert valid.tolist() == [False, True, False, True, True]
+        np.testing.assert_allclose(equity, np.cumprod([1.009, 1.018, 1.007]))
+
+    def test_trade_returns_compound_to_the_equity_curve(self, bars, signals):
+        costs = parse_costs({'commission': 5, 'spread_bps': 3, 'borrow_rate': 0.04})
+
+        ledger = trade_ledger(bars, signals, costs)
+
+        _, curve = calculate_performance(bars, signals, costs=costs)
+        assert np.prod(ledger['return'] + 1) == pytest.approx(curve[-1]['value'], abs=1e-4)
+        frictionless = trade_ledger(bars, signals)
+        assert (ledger['costs'] > 0).all()
+        assert (ledger['return'] < frictionless['return']).all()
@@ -0,0 +1,100 @@
+"""Tests for the cost review in the critique tool."""
+
+import pytest
+
+# The agent tools need the Anthropic SDK and the RAG stack
+pytest.importorskip('app.agent.tools.critique')
+
+from app.agent.tools.critique import CritiqueTool, COST_REVIEW_BARS, COST_REVIEW_MAX_SECONDS
+from app.agent.types import CritiqueEvaluation, CritiqueResult, CritiqueStatus, DraftStrategy
+from app.utils.code_cost import analyze_cost
+
+
+ROW_LOOP = """
+def strategy(df):
+    out = pd.Series(0, index=df.index)
+    for i in range(len(df)):
+        for j in range(i, len(df)):
+            out.iloc[j] = 1
+    return out
+"""
+
+APPLY = """
+def strategy(df):
+    return df['Close'].apply(lambda x: 1 if x > 100 else 0)
+"""
+
+VECTORIZED = """
+def strategy(df):
+    fast = df['Close'].rolling(10).mean()
+    slow = df['Close'].rolling(50).mean()
+    return pd.Series(np.where(fast > slow, 1, 0), index=df.index)
+"""
+
+
+def make_draft(code):
+    return DraftStrategy(
+        name='Test', description='', strategy_type='trend', components=[],
+        entry_rules=[], exit_rules=[], risk_management=[], code=code,
+    )
+
+
+def make_result(overall_pass=True, instructions=None):
+    evaluations = {'CLARITY': CritiqueEvaluation('CLARITY', CritiqueStatus.PASS, 'Clear rules')}
+    return CritiqueResult(evaluations=evaluations, overall_pass=overall_pass, refinement_instructions=instructions)
+
+
+@pytest.fixture
+def tool():
+    return CritiqueTool(anthropic_client=None)
+
+
+class TestReviewCost:
+    """Tests for CritiqueTool._review_cost."""
+
+    def test_row_loop_fails_with_instructions(self, tool):
+        assert analyze_cost(ROW_LOOP).estimate_seconds(COST_REVIEW_BARS) > COST_REVIEW_MAX_SECONDS
+
+        result = tool._review_cost(make_result(instructions='Name the exits.'), make_draft(ROW_LOOP))
+
+        vectorized = result.evaluations['VECTORIZED']
+        assert vectorized.status == CritiqueStatus.FAIL
+        assert 'line 4' in vectorized.notes
+        assert result.overall_pass is False
+        assert result.needs_refinement
+        first, second = result.refinement_instructions.split('\n')
+        assert first == 'Name the exits.'
+        assert second.startswith('Vectorize the code.')
+
+    def test_borderline_code_is_partial(self, tool):
+        assert 0 < analyze_cost(APPLY).estimate_seconds(COST_REVIEW_BARS) <= COST_REVIEW_MAX_SECONDS
+
+        result = tool._review_cost(make_result(), make_draft(APPLY))
+
+        assert result.evaluations['VECTORIZED'].status == CritiqueStatus.PARTIAL
+        assert 'line 3' in result.evaluations['VECTORIZED'].notes
+        assert result.overall_pass is True
+        assert result.refinement_instructions is None
+
+    def test_vectorized_code_leaves_verdict_unchanged(self, tool):
+        result = tool._review_cost(make_result(instructions='Name the exits.'), make_draft(VECTORIZED))
+
+        assert result.evaluations['VECTORIZED'].status == CritiqueStatus.PASS
+        assert result.evaluations['CLARITY'].status == CritiqueStatus.PASS
+        assert result.overall_pass is True
+        assert result.refinement_instructions == 'Name the exits.'
+
+    @pytest.mark.parametrize('code', [None, 'def strategy(df:\n'])
+    def test_missing_or_broken_code_is_left_alone(self, tool, code):
+        result = tool._review_cost(make_result(), make_draft(code))
+
+        assert set(result.evaluations) == {'CLARITY'}
+        assert result.overall_pass is True
+
+    def test_code_the_analysis_cannot_size_passes(self, tool):
+        code = "def strategy(df):\n    for k in range(0, 10, 0):\n        pass\n    return df['Close']\n"
+
+        result = tool._review_cost(make_result(), make_draft(code))
+
+        assert result.evaluations['VECTORIZED'].status == CritiqueStatus.PASS
+        assert result.overall_pass is True
@@ -0,0 +1,660 @@
+"""Tests for market data caching."""
+
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+import pytest
+import pandas as pd
+import numpy as np
+from app.services import data_service
+from app.services.providers import yahoo, LocalDirectoryProvider, SyntheticProvider
+from app.services.data_service import DataService, prune_cache
+from app.services.bar_store import BarStore, merge_ranges, missing_ranges
+from app.services.compact import compact_bars
+from app.services.cache_manifest import CacheManifest
+from app.services.mmap_store import MmapStore
+from app.services.intervals import periods_per_year, source_interval
+from app.services.resample import resample_bars
+from app.utils.lru import ByteLRUCache
+
+
+def make_bars(start, end):
+    """Business-day OHLCV bars covering [start, end)."""
+    dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name='Date')
+    # Prices depend only on the date so separately fetched pieces line up
+    closes = 100 + (dates - pd.Timestamp('2000-01-01')).days.to_numpy() * 0.01
+    return pd.DataFrame({
+        'Open': closes - 1,
+        'High': closes + 1,
+        'Low': closes - 2,
+        'Close': closes,
+        'Volume': np.full(len(dates), 1000, dtype='int64'),
+    }, index=dates)
+
+
+def is_memory_mapped(series):
+    """True if the Series' values are a view onto a np.memmap."""
+    values = series.to_numpy()
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Replace yf.download with an offline fake that records its calls."""
+    calls = []
+
+    def fake_download(ticker, start, end, **kwargs):
+        calls.append((ticker, str(start)[:10], str(end)[:10]))
+        if isinstance(ticker, str):
+            return make_bars(start, end)
+
+        # Batched call: columns grouped by ticker, unknown symbols all-NaN
+        frames = {}
+        for t in ticker:
+            bars = make_bars(start, end)
+            frames[t] = bars * np.nan if t == 'BAD' else bars
+        return pd.concat(frames, axis=1)
+
+    monkeypatch.setattr(yahoo.yf, 'download', fake_download)
+    return calls
+
+
+@pytest.fixture
+def memory_cache():
+    return ByteLRUCache(64 * 1024 * 1024, data_service._history_nbytes)
+
+
+@pytest.fixture
+def service(tmp_path, memory_cache):
+    return DataService(cache_dir=tmp_path, memory_cache=memory_cache)
+
+
+class TestBarStore:
+    """Tests for the Parquet bar store."""
+
+    def test_round_trip_keeps_index_and_dtypes(self, tmp_path):
+        store = BarStore(tmp_path)
+        bars = make_bars('2023-01-02', '2023-02-01')
+        store.merge('SPY', bars, [('2023-01-02', '2023-02-01')])
+
+        df, coverage = store.read('SPY')
+        assert isinstance(df.index, pd.DatetimeIndex)
+        assert df['Close'].dtype == np.float64
+        assert df['Volume'].dtype == np.int64
+        assert coverage == [(pd.Timestamp('2023-01-02'), pd.Timestamp('2023-02-01'))]
+        pd.testing.assert_frame_equal(df, bars, check_freq=False)
+
+    def test_read_missing_ticker(self, tmp_path):
+        df, coverage = BarStore(tmp_path).read('NOPE')
+        assert df is None
+        assert coverage == []
+
+    def test_merge_ranges(self):
+        ts = pd.Timestamp
+        ranges = [(ts('2023-03-01'), ts('2023-04-01')), (ts('2023-01-01'), ts('2023-02-01')),
+                  (ts('2023-02-01'), ts('2023-02-15'))]
+        assert merge_ranges(ranges) == [
+            (ts('2023-01-01'), ts('2023-02-15')),
+            (ts('2023-03-01'), ts('2023-04-01')),
+        ]
+
+    def test_missing_ranges(self):
+        ts = pd.Timestamp
+        coverage = [(ts('2023-02-01'), ts('2023-03-01')), (ts('2023-04-01'), ts('2023-05-01'))]
+        assert missing_ranges(coverage, ts('2023-01-01'), ts('2023-06-01')) == [
+            (ts('2023-01-01'), ts('2023-02-01')),
+            (ts('2023-03-01'), ts('2023-04-01')),
+            (ts('2023-05-01'), ts('2023-06-01')),
+        ]
+        assert missing_ranges(coverage, ts('2023-02-10'), ts('2023-02-20')) == []
+
+
+class TestMmapStore:
+    """Tests for the memory-mapped history store."""
+
+    def test_round_trip_is_memory_mapped(self, tmp_path):
+        store = MmapStore(tmp_path)
+        bars = make_bars('2023-01-02', '2023-02-01')
+        coverage = [(pd.Timestamp('2023-01-02'), pd.Timestamp('2023-02-01'))]
+        store.publish('SPY', bars, coverage)
+
+        df, loaded_coverage = store.load('SPY')
+
+        pd.testing.assert_frame_equal(df, bars, check_freq=False)
+        assert loaded_coverage == coverage
+        assert is_memory_mapped(df['Close'])
+        assert df['Close'].to_numpy().flags.writeable is False
+
+    def test_republish_replaces_old_version(self, tmp_path):
+        store = MmapStore(tmp_path)
+        coverage = [(pd.Timestamp('2023-01-02'), pd.Timestamp('2023-03-01'))]
+        store.publish('SPY', make_bars('2023-01-02', '2023-02-01'), coverage)
+        store.publish('SPY', make_bars('2023-01-02', '2023-03-01'), coverage)
+
+        df, _ = store.load('SPY')
+        assert len(df) == len(make_bars('2023-01-02', '2023-03-01'))
+        assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 1
+
+    def test_load_missing_ticker(self, tmp_path):
+        df, coverage = MmapStore(tmp_path).load('NOPE')
+        assert df is None
+        assert coverage == []
+
+
+class TestGetData:
+    """Tests for DataService.get_data caching."""
+
+    def test_miss_then_hit(self, service, downloads):
+        first = service.get_data('SPY', '2023-01-01', '2023-06-01')
+        second = service.get_data('SPY', '2023-01-01', '2023-06-01')
+
+        assert first['success'] and second['success']
+        assert len(downloads) == 1
+        pd.testing.assert_frame_equal(first['data'], second['data'], check_freq=False)
+
+    def test_sub_range_is_sliced_from_cache(self, service, downloads):
+        service.get_data('SPY', '2019-01-01', '2024-06-01')
+        result = service.get_data('SPY', '2020-01-01', '2024-01-01')
+
+        assert len(downloads) == 1
+        df = result['data']
+        assert df.index[0] >= pd.Timestamp('2020-01-01')
+        assert df.index[-1] < pd.Timestamp('2024-01-01')
+
+    def test_only_missing_head_and_tail_are_fetched(self, service, downloads):
+        service.get_data('SPY', '2023-03-01', '2023-06-01')
+        result = service.get_data('SPY', '2023-01-01', '2023-09-01')
+
+        assert downloads[1:] == [
+            ('SPY', '2023-01-01', '2023-03-01'),
+            ('SPY', '2023-06-01', '2023-09-01'),
+        ]
+        pd.testing.assert_frame_equal(
+            result['data'], compact_bars(make_bars('2023-01-01', '2023-09-01')), check_freq=False
+        )
+
+    def test_legacy_csv_is_migrated(self, service, downloads, tmp_path):
+        legacy = make_bars('2023-01-02', '2023-03-01')
+        legacy.to_csv(tmp_path / 'SPY_2023-01-02_2023-03-01.csv')
+
+        result = service.get_data('SPY', '2023-01-02', '2023-03-01')
+
+        assert result['success']
+        assert downloads == []
+        assert not (tmp_path / 'SPY_2023-01-02_2023-03-01.csv').exists()
+        assert (tmp_path / 'SPY_1d.parquet').exists()
+        assert len(result['data']) == len(legacy)
+
+    def test_invalid_dates(self, service, downloads):
+        result = service.get_data('SPY', '2023-06-01', '2023-01-01')
+        assert result['success'] is False
+        assert downloads == []
+
+
+class TestMemoryCache:
+    """Tests for the in-process history cache in front of the Parquet store."""
+
+    def test_hit_does_not_touch_disk(self, service, downloads, memory_cache, tmp_path):
+        service.get_data('SPY', '2023-01-01', '2023-06-01')
+        (tmp_path / 'SPY_1d.parquet').unlink()
+
+        result = service.get_data('SPY', '2023-02-01', '2023-03-01')
+
+        assert result['success']
+        assert len(downloads) == 1
+        assert memory_cache.hits == 1
+
+    # pandas-ta turns on pandas' copy-on-write when it is imported
+    @pytest.mark.parametrize('copy_on_write', [False, True])
+    def test_returned_frames_are_read_only(self, service, downloads, copy_on_write):
+        with pd.option_context('mode.copy_on_write', copy_on_write):
+            df = service.get_data('SPY', '2023-01-01', '2023-06-01')['data']
+            first = df.iloc[0, 0]
+
+            if copy_on_write:
+                # The write goes to a copy of the cached values
+                df.iloc[0, 0] = -1.0
+            else:
+                with pytest.raises(ValueError):
+                    df.iloc[0, 0] = -1.0
+
+            # Adding columns only affects the caller's frame
+            df['signal'] = 1
+            again = service.get_data('SPY', '2023-01-01', '2023-06-01')['data']
+            assert again.iloc[0, 0] == first
+            assert 'signal' not in again.columns
+        assert again['Open'].iloc[0] != -1.0
+
+    def test_disk_is_reloaded_when_memory_does_not_cover(self, tmp_path, downloads, memory_cache):
+        writer = DataService(cache_dir=tmp_path, memory_cache=ByteLRUCache(1 << 20, data_service._history_nbytes))
+        reader = DataService(cache_dir=tmp_path, memory_cache=memory_cache)
+
+        reader.get_data('SPY', '2023-01-01', '2023-02-01')
+        writer.get_data('SPY', '2023-01-01', '2023-06-01')
+        reader.get_data('SPY', '2023-01-01', '2023-06-01')
+
+        assert len(downloads) == 2
+
+    def test_new_process_maps_published_history(self, tmp_path, downloads, memory_cache):
+        DataService(cache_dir=tmp_path, memory_cache=memory_cache).get_data('SPY', '2023-01-01', '2023-06-01')
+        (tmp_path / 'SPY_1d.parquet').unlink()
+
+        # Fresh memory cache, as in a newly forked worker
+        fresh = DataService(cache_dir=tmp_path, memory_cache=ByteLRUCache(1 << 20, data_service._history_nbytes))
+        result = fresh.get_data('SPY', '2023-02-01', '2023-03-01')
+
+        assert result['success']
+        assert len(downloads) == 1
+        assert is_memory_mapped(result['data']['Close'])
+
+
+class TestConcurrentFetch:
+    """Tests for request coalescing and atomic cache writes."""
+
+    def test_identical_requests_share_one_download(self, service, downloads, monkeypatch):
+        fake_download = yahoo.yf.download
+
+        def slow_download(*args, **kwargs):
+            time.sleep(0.2)
+            return fake_download(*args, **kwargs)
+
+        monkeypatch.setattr(yahoo.yf, 'download', slow_download)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(service.get_data('SPY', '2023-01-01', '2023-06-01')))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(downloads) == 1
+        assert all(r['success'] for r in results)
+        assert len({id(r['data']) for r in results}) == 4
+
+    def test_no_temp_files_left_behind(self, service, downloads, tmp_path):
+        service.get_data('SPY', '2023-01-01', '2023-06-01')
+        service.get_data('SPY', '2023-01-01', '2023-09-01')
+
+        assert not list(tmp_path.glob('*.tmp'))
+        assert not list(tmp_path.glob('.*.tmp'))
+
+
+class TestProviders:
+    """Tests for the non-network market data providers."""
+
+    def test_synthetic_ranges_are_consistent(self):
+        provider = SyntheticProvider(seed=7)
+        wide = provider.fetch('SPY', pd.Timestamp('2019-01-01'), pd.Timestamp('2022-01-01'))
+        narrow = provider.fetch('SPY', pd.Timestamp('2020-01-01'), pd.Timestamp('2021-01-01'))
+
+        pd.testing.assert_frame_equal(wide.loc[narrow.index], narrow)
+
+    def test_synthetic_bars_are_valid(self):
+        df = SyntheticProvider().generate(5000, interval='5m')
+
+        assert len(df) == 5000
+        assert df.index.is_monotonic_increasing
+        assert (df['High'] >= df[['Open', 'Close']].max(axis=1)).all()
+        assert (df['Low'] <= df[['Open', 'Close']].min(axis=1)).all()
+        assert (df['Volume'] > 0).all()
+
+    def test_synthetic_seed_and_ticker_change_path(self):
+        a = SyntheticProvider(seed=1).generate(100)
+        b = SyntheticProvider(seed=2).generate(100)
+        c = SyntheticProvider(seed=1).generate(100, ticker='QQQ')
+
+        assert not np.allclose(a['Close'], b['Close'])
+        assert not np.allclose(a['Close'], c['Close'])
+
+    def test_local_directory_provider(self, tmp_path):
+        make_bars('2023-01-02', '2023-06-01').to_csv(tmp_path / 'SPY.csv')
+        provider = LocalDirectoryProvider(tmp_path)
+
+        df = provider.fetch('SPY', pd.Timestamp('2023-02-01'), pd.Timestamp('2023-03-01'))
+
+        assert df.index[0] == pd.Timestamp('2023-02-01')
+        assert df.index[-1] < pd.Timestamp('2023-03-01')
+        assert provider.fetch('QQQ', pd.Timestamp('2023-02-01'), pd.Timestamp('2023-03-01')).empty
+
+    def test_service_with_synthetic_provider_is_offline(self, tmp_path, memory_cache, downloads):
+        service = DataService(cache_dir=tmp_path, memory_cache=memory_cache, provider=SyntheticProvider())
+
+        result = service.get_data('SPY', '2023-01-01', '2023-06-01')
+
+        assert result['success']
+        assert downloads == []
+        assert (tmp_path / 'synthetic_seed42' / 'SPY_1d.parquet').exists()
+
+
+class TestGetDataMany:
+    """Tests for DataService.get_data_many."""
+
+    def test_misses_are_fetched_in_one_call(self, service, downloads):
+        results = service.get_data_many(['SPY', 'QQQ', 'IWM'], '2023-01-01', '2023-06-01')
+
+        assert downloads == [(['SPY', 'QQQ', 'IWM'], '2023-01-01', '2023-06-01')]
+        assert all(r['success'] for r in results.values())
+        pd.testing.assert_frame_equal(
+            results['QQQ']['data'], compact_bars(make_bars('2023-01-01', '2023-06-01')), check_freq=False
+        )
+
+    def test_cache_hits_are_not_downloaded(self, service, downloads):
+        service.get_data('SPY', '2023-01-01', '2023-06-01')
+        results = service.get_data_many(['SPY', 'QQQ'], '2023-01-01', '2023-06-01')
+
+        assert downloads[1:] == [(['QQQ'], '2023-01-01', '2023-06-01')]
+        assert results['SPY']['success'] and results['QQQ']['success']
+
+    def test_bad_symbol_does_not_fail_batch(self, service, downloads):
+        results = service.get_data_many(['SPY', 'BAD'], '2023-01-01', '2023-06-01')
+
+        assert results['SPY']['success'] is True
+        assert results['BAD']['success'] is False
+        assert 'BAD' in results['BAD']['error']
+        assert list(results) == ['SPY', 'BAD']
+
+
+class TestIntervals:
+    """Tests for intraday intervals and resampling."""
+
+    def test_source_interval(self):
+        assert source_interval('1h') == '5m'
+        assert source_interval('15m') == '5m'
+        assert source_interval('5m') == '5m'
+        assert source_interval('1m') == '1m'
+        assert source_interval('1wk') == '1d'
+        assert source_interval('1d') == '1d'
+        assert source_interval('4h', intraday_base='1h') == '1h'
+        with pytest.raises(ValueError):
+            source_interval('4h', intraday_base='4h')
+        with pytest.raises(ValueError):
+            source_interval('3h')
+
+    def test_source_interval_within_provider_history(self):
+        history = yahoo.YahooProvider.intraday_history
+        today = pd.Timestamp.today().normalize()
+        recent, old = today - pd.Timedelta(days=20), today - pd.Timedelta(days=200)
+
+        assert source_interval('1h', start=recent, history_days=history) == '5m'
+        assert source_interval('1h', start=old, history_days=history) == '1h'
+        assert source_interval('4h', start=old, history_days=history) == '1h'
+        assert source_interval('1d', start=old, history_days=history) == '1d'
+        # Out of every interval's reach: the longest history is the best try
+        assert source_interval('4h', start=today - pd.Timedelta(days=1000), history_days=history) == '1h'
+
+    def test_periods_per_year(self):
+        assert periods_per_year('1d') == 252
+        assert periods_per_year('1wk') == 52
+        assert periods_per_year('1h') == 252 * 7
+        assert periods_per_year('5m') == 252 * 78
+
+    def test_resample_matches_pandas(self):
+        df = SyntheticProvider().generate(2000, interval='5m')
+
+        expected = df.resample('60min', offset='30min').agg({
+            'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum',
+        }).dropna()
+        expected['Volume'] = expected['Volume'].astype('int64')
+
+        pd.testing.assert_frame_equal(resample_bars(df, '1h'), expected, check_freq=False)
+
+    def test_weekly_bars_start_on_monday(self):
+        weekly = resample_bars(make_bars('2023-01-02', '2023-03-01'), '1wk')
+
+        assert (weekly.index.dayofweek == 0).all()
+        assert weekly['Open'].iloc[0] == make_bars('2023-01-02', '2023-01-03')['Open'].iloc[0]
+
+    def test_hourly_is_derived_from_cached_base(self, tmp_path, memory_cache, monkeypatch):
+        provider = SyntheticProvider()
+        calls = []
+        fetch = provider.fetch
+        monkeypatch.setattr(provider, 'fetch', lambda *a: calls.append(a[3]) or fetch(*a))
+        service = DataService(cache_dir=tmp_path, memory_cache=memory_cache, provider=provider)
+
+        five = service.get_data('SPY', '2023-03-01', '2023-03-08', interval='5m')
+        hourly = service.get_data('SPY', '2023-03-01', '2023-03-08', interval='1h')
+
+        assert five['success'] and hourly['success']
+        assert calls == ['5m']
+        assert hourly['data'].index[0] == pd.Timestamp('2023-03-01 09:30')
+        assert hourly['data']['Volume'].sum() == five['data']['Volume'].sum()
+
+    def test_hourly_older_than_base_history_is_fetched_natively(self, tmp_path, memory_cache, monkeypatch):
+        provider = SyntheticProvider()
+        provider.intraday_history = yahoo.YahooProvider.intraday_history
+        calls = []
+        fetch = provider.fetch
+        monkeypatch.setattr(provider, 'fetch', lambda *a: calls.append(a[3]) or fetch(*a))
+        service = DataService(cache_dir=tmp_path, memory_cache=memory_cache, provider=provider)
+        start = pd.Timestamp.today().normalize() - pd.Timedelta(days=120)
+        end = start + pd.Timedelta(days=7)
+
+        hourly = service.get_data('SPY', f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}", interval='1h')
+        four = service.get_data('SPY', f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}", interval='4h')
+
+        assert hourly['success'] and four['success']
+        assert calls == ['1h']
+        assert four['data']['Volume'].sum() == hourly['data']['Volume'].sum()
+
+    # 20 days back is resampled from 5m bars, 400 days back fetched as 1h bars
+    @pytest.mark.parametrize('ages', [(20, 400), (400, 20)])
+    def test_hourly_both_resampled_and_native(self, tmp_path, memory_cache, ages):
+        provider = SyntheticProvider()
+        provider.intraday_history = yahoo.YahooProvider.intraday_history
+        service = DataService(cache_dir=tmp_path, memory_cache=memory_cache, provider=provider)
+        today = pd.Timestamp.today().normalize()
+
+        for age in ages:
+            start = today - pd.Timedelta(days=age)
+            end = start + pd.Timedelta(days=7)
+            for _ in range(2):
+                result = service.get_data('SPY', f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}", interval='1h')
+
+                assert result['success'], result['error']
+                assert result['data'].index[0] >= start
+                assert (result['data'].index.minute == 30).all()
+
+    def test_unsupported_interval(self, service, downloads):
+        result = service.get_data('SPY', '2023-01-01', '2023-06-01', interval='3h')
+
+        assert result['success'] is False
+        assert downloads == []
+
+
+class TestCompactDtypes:
+    """Tests for the compact in-memory dtype policy."""
+
+    def test_prices_become_float32_and_extra_columns_are_dropped(self):
+        bars = make_bars('2023-01-02', '2023-02-01')
+        bars['Adj Close'] = bars['Close']
+
+        df = compact_bars(bars)
+
+        assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+        assert (df.dtypes[:4] == np.float32).all()
+        assert df['Volume'].dtype == np.int32
+        assert np.abs(df['Close'].to_numpy(np.float64) - bars['Close']).max() <= 0.005
+
+    def test_large_prices_and_volumes_keep_wide_dtypes(self):
+        bars = make_bars('2023-01-02', '2023-02-01')
+        bars[['Open', 'High', 'Low', 'Close']] += 600_000.01
+        bars['Volume'] = 3_000_000_000
+
+        df = compact_bars(bars)
+
+        assert (df.dtypes[:4] == np.float64).all()
+        assert df['Volume'].dtype == np.int64
+        pd.testing.assert_frame_equal(df, bars[df.columns])
+
+    def test_service_halves_cached_bytes(self, tmp_path, memory_cache, downloads):
+        wide = DataService(cache_dir=tmp_path, memory_cache=memory_cache, compact=False)
+        narrow = DataService(cache_dir=tmp_path, memory_cache=memory_cache)
+
+        full = wide.get_data('SPY', '2023-01-01', '2023-06-01')['data']
+        small = narrow.get_data('SPY', '2023-01-01', '2023-06-01')['data']
+
+        assert full['Close'].dtype == np.float64
+        assert small['Close'].dtype == np.float32
+        assert small.memory_usage(index=False).sum() * 2 == full.memory_usage(index=False).sum()
+        # Parquet keeps full precision, so only one download was needed
+        assert len(downloads) == 1
+
+
+class TestCacheManifest:
+    """Tests for the cache manifest, TTL refresh and disk-budget eviction."""
+
+    def test_writes_are_recorded(self, service, downloads, tmp_path):
+        service.get_data('SPY', '2023-01-01', '2023-06-01')
+
+        entry = service.store.manifest.get('SPY', '1d')
+        assert entry['path'] == 'SPY_1d.parquet'
+        assert entry['bytes'] == (tmp_path / 'SPY_1d.parquet').stat().st_size
+        assert entry['coverage'] == [(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-06-01'))]
+
+    def test_evict_least_recently_used_first(self, tmp_path):
+        store = BarStore(tmp_path)
+        for ticker in ('SPY', 'QQQ', 'IWM'):
+            store.write(ticker, make_bars('2023-01-02', '2023-06-01'), [])
+        store.touch('SPY')
+        store.manifest.flush()
+
+        removed = store.evict(max_bytes=store.manifest.total_bytes() - 1)
+
+        assert removed == [('QQQ', '1d')]
+        assert not store.path_for('QQQ').exists()
+        assert [e['ticker'] for e in store.manifest.entries()] == ['IWM', 'SPY']
+
+    def test_stale_recent_bars_are_refetched(self, service, downloads, monkeypatch):
+        service.get_data('SPY', '2023-01-01', '2023-06-01')
+        service.get_data('SPY', '2023-01-01', '2023-06-01')
+        assert len(downloads) == 1
+
+        # Pretend the last fetch happened on 2023-06-01, two days ago
+        with service.store.manifest._connect() as db:
+            db.execute('UPDATE datasets SET refreshed_at = ?', (pd.Timestamp('2023-06-01').timestamp(),))
+        service.refresh_ttl = 3600
+
+        service.get_data('SPY', '2023-01-01', '2023-06-01')
+        assert downloads[1] == ('SPY', '2023-05-27', '2023-06-01')
+
+        # Requests that end before the recent bars never refetch
+        service.get_data('SPY', '2023-01-01', '2023-05-01')
+        assert len(downloads) == 2
+
+    def test_disk_budget_evicts_other_datasets(self, tmp_path, memory_cache, downloads):
+        service = DataService(cache_dir=tmp_path, memory_cache=memory_cache)
+        service.get_data('SPY', '2023-01-01', '2023-06-01')
+        service.disk_cache_bytes = 1
+
+        service.get_data('QQQ', '2023-01-01', '2023-06-01')
+
+        assert [e['ticker'] for e in service.store.manifest.entries()] == ['QQQ']
+        assert not (tmp_path / 'SPY_1d.parquet').exists()
+        assert service.mmap_store.load('SPY')[0] is None
+
+    def test_reindex_adds_unknown_files(self, tmp_path):
+        BarStore(tmp_path).write('SPY', make_bars('2023-01-02', '2023-06-01'), [])
+        (tmp_path / 'manifest.sqlite').unlink()
+
+        store = BarStore(tmp_path)
+        store.manifest = CacheManifest(tmp_path / 'manifest.sqlite')
+
+        assert store.reindex() == 1
+        assert store.manifest.get('SPY', '1d')['bytes'] > 0
+        assert store.reindex() == 0
+
+
+DATA_CACHE_SCRIPT = Path(__file__).parent.parent / 'scripts' / 'data_cache.py'
+
+
+class TestPruneCache:
+    """Tests for prune_cache and scripts/data_cache.py prune."""
+
+    @pytest.fixture
+    def cache_dir(self, tmp_path):
+        store = BarStore(tmp_path)
+        for ticker in ('SPY', 'QQQ', 'IWM'):
+            store.write(ticker, make_bars('2023-01-02', '2023-06-01'), [])
+        store.manifest.flush()
+        # Last used an hour, a day and a week ago
+        with store.manifest._connect() as db:
+            for ticker, age in (('SPY', 3600), ('QQQ', 86400), ('IWM', 7 * 86400)):
+                db.execute('UPDATE datasets SET accessed_at = ? WHERE ticker = ?', (time.time() - age, ticker))
+        return tmp_path
+
+    def cached(self, cache_dir):
+        return sorted(e['ticker'] for e in BarStore(cache_dir).manifest.entries())
+
+    def run_script(self, *args):
+        return subprocess.run(
+            [sys.executable, str(DATA_CACHE_SCRIPT), 'prune', *args], capture_output=True, text=True, timeout=120
+        )
+
+    def test_byte_budget(self, cache_dir):
+        total = BarStore(cache_dir).manifest.total_bytes()
+
+        removed = prune_cache(cache_dir, max_bytes=total - 1)
+
+        assert removed == [('IWM', '1d')]
+        assert self.cached(cache_dir) == ['QQQ', 'SPY']
+        assert not (cache_dir / 'IWM_1d.parquet').exists()
+
+    def test_idle_limit(self, cache_dir):
+        assert prune_cache(cache_dir, max_idle=2 * 86400) == [('IWM', '1d')]
+        assert prune_cache(cache_dir, max_idle=600) == [('QQQ', '1d'), ('SPY', '1d')]
+        assert self.cached(cache_dir) == []
+
+    def test_keep(self, cache_dir):
+        removed = prune_cache(cache_dir, max_bytes=0, keep={('QQQ', '1d')})
+
+        assert removed == [('IWM', '1d'), ('SPY', '1d')]
+        assert self.cached(cache_dir) == ['QQQ']
+
+    def test_dry_run(self, cache_dir):
+        removed = prune_cache(cache_dir, max_idle=600, dry_run=True)
+
+        assert removed == [('IWM', '1d'), ('QQQ', '1d'), ('SPY', '1d')]
+        assert self.cached(cache_dir) == ['IWM', 'QQQ', 'SPY']
+
+    def test_no_limit_is_an_error(self, cache_dir):
+        with pytest.raises(ValueError):
+            prune_cache(cache_dir)
+        with pytest.raises(ValueError):
+            prune_cache(cache_dir, max_bytes=0, remove_all=True)
+
+        assert self.cached(cache_dir) == ['IWM', 'QQQ', 'SPY']
+
+    def test_remove_all(self, cache_dir):
+        removed = prune_cache(cache_dir, tickers={'SPY', 'QQQ'}, remove_all=True)
+
+        assert removed == [('QQQ', '1d'), ('SPY', '1d')]
+        assert self.cached(cache_dir) == ['IWM']
+
+    def test_script_needs_a_limit_or_all(self, cache_dir):
+        result = self.run_script('--cache-dir', str(cache_dir))
+
+        assert result.returncode == 2
+        assert '--all' in result.stderr
+        assert self.run_script('--cache-dir', str(cache_dir), '--all', '--max-mb', '1').returncode == 2
+        assert self.cached(cache_dir) == ['IWM', 'QQQ', 'SPY']
+
+    def test_script_limits_dry_run_and_all(self, cache_dir):
+        result = self.run_script('--cache-dir', str(cache_dir), '--idle-days', '2', '--dry-run')
+        assert result.returncode == 0
+        assert 'would remove' in result.stdout and 'IWM_1d' in result.stdout
+        assert self.cached(cache_dir) == ['IWM', 'QQQ', 'SPY']
+
+        assert self.run_script('--cache-dir', str(cache_dir), '--idle-days', '2').returncode == 0
+        assert self.cached(cache_dir) == ['QQQ', 'SPY']
+
+        assert self.run_script('--cache-dir', str(cache_dir), '--ticker', 'spy', '--all').returncode == 0
+        assert self.cached(cache_dir) == ['QQQ']
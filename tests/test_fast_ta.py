@@ -0,0 +1,220 @@
+"""Tests for the NumPy indicator fast paths."""
+
+import types
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils import fast_ta
+from app.utils.ta_cache import install, CachedIndicators
+
+
+# The pandas-ta release the fast paths reproduce (pinned in
+# requirements.txt); with any other, verify() leaves the indicators whose
+# formulas differ to pandas-ta
+PANDAS_TA_VERSION = '0.4.71b0'
+
+
+def make_bars(n=3000, dtype=np.float64, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    # A flat stretch, as in thin intraday markets
+    close[n // 2:n // 2 + 40] = close[n // 2 - 1]
+    spread = np.abs(rng.standard_normal(n))
+    spread[n // 2:n // 2 + 40] = 0
+    return pd.DataFrame({
+        'Open': close,
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+    }, index=pd.date_range('2020-01-01', periods=n, freq='h', name='Date')).astype(dtype)
+
+
+def assert_matches(result, expected):
+    if isinstance(expected, pd.DataFrame):
+        assert list(result.columns) == list(expected.columns)
+    else:
+        assert result.name == expected.name
+    assert result.index.equals(expected.index)
+    np.testing.assert_allclose(
+        result.to_numpy(np.float64), expected.to_numpy(np.float64), rtol=1e-7, atol=1e-9
+    )
+
+
+class TestKernels:
+    """The NumPy kernels against the pandas operations pandas-ta uses."""
+
+    @pytest.mark.parametrize('n', [1, 2, 14, 200, 5000])
+    def test_rolling_mean(self, n):
+        close = make_bars(12000)['Close']
+        close.iloc[:7] = np.nan
+        close.iloc[4000] = np.nan
+
+        # pandas-ta's sma: a convolution with ones(n) / n
+        expected = np.r_[np.full(n - 1, np.nan), np.convolve(close.to_numpy(), np.ones(n) / n, 'valid')]
+
+        np.testing.assert_allclose(fast_ta._rolling_mean(close.to_numpy(), n), expected, rtol=1e-9, atol=1e-9)
+
+    @pytest.mark.parametrize('n,ddof', [(2, 0), (20, 0), (20, 1), (100, 1)])
+    def test_rolling_var(self, n, ddof):
+        close = make_bars()['Close']
+
+        expected = close.rolling(n).var(ddof)
+
+        np.testing.assert_allclose(fast_ta._rolling_var(close.to_numpy(), n, ddof), expected, rtol=1e-7, atol=1e-9)
+
+    @pytest.mark.parametrize('n', [1, 3, 20, 999])
+    def test_rolling_extremes(self, n):
+        high = make_bars()['High']
+
+        np.testing.assert_array_equal(fast_ta._rolling_extreme(high.to_numpy(), n, np.maximum), high.rolling(n).max())
+        np.testing.assert_array_equal(fast_ta._rolling_extreme(high.to_numpy(), n, np.minimum), high.rolling(n).min())
+
+    @pytest.mark.parametrize('length', [1, 2, 10, 200])
+    def test_ema_matches_ewm(self, length):
+        close = make_bars(20000)['Close']
+
+        expected = close.ewm(span=length, adjust=False).mean()
+
+        np.testing.assert_allclose(fast_ta._ema(close.to_numpy(), length, presma=False), expected, rtol=1e-10)
+
+    @pytest.mark.parametrize('length', [1, 2, 14, 200])
+    def test_rma_matches_ewm(self, length):
+        values = make_bars(20000)['Close'].diff()
+
+        expected = values.ewm(alpha=1 / length, adjust=False).mean()
+
+        np.testing.assert_allclose(fast_ta._rma(values.to_numpy(), length), expected, rtol=1e-10)
+
+    def test_gaps_are_left_to_pandas_ta(self):
+        values = make_bars()['Close'].to_numpy().copy()
+        values[100] = np.nan
+
+        with pytest.raises(fast_ta.Unsupported):
+            fast_ta._ema(values, 10)
+
+
+class TestRouting:
+    """Routing calls to the fast paths and back to pandas-ta."""
+
+    @pytest.fixture
+    def module(self):
+        calls = []
+
+        def fallback(name):
+            def indicator(*args, **kwargs):
+                calls.append(name)
+            return indicator
+
+        module = types.SimpleNamespace(**{name: fallback(name) for name in fast_ta.INDICATORS})
+        module.calls = calls
+        return module
+
+    def test_fast_path_is_used(self, module):
+        ta = install(module, None, {'rsi': fast_ta.rsi})
+
+        result = ta.rsi(make_bars()['Close'], length=14)
+
+        assert module.calls == []
+        assert result.name == 'RSI_14'
+
+    def test_unsupported_options_fall_back(self, module):
+        ta = install(module, None, {'rsi': fast_ta.rsi})
+        close = make_bars()['Close']
+
+        ta.rsi(close, mamode='ema')
+        ta.rsi(close, talib=True)
+        ta.rsi(close, fillna=0)
+        ta.rsi(close.iloc[:5], length=10)
+
+        assert module.calls == ['rsi', 'rsi', 'rsi', 'rsi']
+
+    def test_frame_columns_are_found_case_insensitively(self):
+        df = make_bars()
+        df.columns = [c.lower() for c in df.columns]
+
+        result = fast_ta.call_frame(fast_ta.atr, df, (), {'length': 10})
+
+        assert_matches(result, fast_ta.atr(df['high'], df['low'], df['close'], length=10))
+
+    def test_frame_calls_honor_column_arguments(self):
+        df = make_bars()
+        df['Mid'] = (df['High'] + df['Low']) / 2
+
+        result = fast_ta.call_frame(fast_ta.rsi, df, (20,), {'close': 'Mid'})
+
+        assert_matches(result, fast_ta.rsi(df['Mid'], 20))
+
+    def test_frame_append_is_left_to_pandas_ta(self):
+        with pytest.raises(fast_ta.Unsupported):
+            fast_ta.call_frame(fast_ta.rsi, make_bars(), (), {'append': True})
+
+    def test_verify_drops_indicators_that_differ(self):
+        def rsi(close, length=None, **kwargs):
+            return fast_ta.rsi(close, length) * 1.001
+
+        module = types.SimpleNamespace(macd=fast_ta.macd, rsi=rsi)
+
+        assert fast_ta.verify(module) == {'macd': fast_ta.macd}
+        ta = CachedIndicators(module, None, {'macd', 'rsi'}, fast_ta.verify(module))
+        assert ta.rsi is rsi
+
+    def test_offset_shifts_result(self):
+        close = make_bars()['Close']
+
+        result = fast_ta.rsi(close, 10, offset=3)
+
+        assert_matches(result, fast_ta.rsi(close, 10).shift(3))
+
+
+CASES = [
+    ('rsi', {}), ('rsi', {'length': 2}), ('rsi', {'length': 7, 'scalar': 1, 'drift': 3}),
+    ('macd', {}), ('macd', {'fast': 8, 'slow': 21, 'signal': 5}),
+    ('bbands', {}), ('bbands', {'length': 20}), ('bbands', {'length': 20, 'lower_std': 1.5, 'upper_std': 2.5, 'ddof': 1}),
+    ('atr', {}), ('atr', {'length': 5, 'drift': 2}),
+    ('stoch', {}), ('stoch', {'k': 5, 'd': 3, 'smooth_k': 1}),
+    ('adx', {}), ('adx', {'length': 10, 'signal_length': 20, 'adxr_length': 4}),
+    ('donchian', {}), ('donchian', {'lower_length': 10, 'upper_length': 55}),
+    ('kc', {}), ('kc', {'length': 10, 'scalar': 1.5}), ('kc', {'tr': False}),
+]
+
+
+def target_pandas_ta():
+    """pandas-ta, if the installed release is the one the fast paths target."""
+    pandas_ta = pytest.importorskip('pandas_ta')
+    version = str(getattr(pandas_ta, 'version', ''))
+    if not version.startswith(PANDAS_TA_VERSION):
+        pytest.skip(f'pandas-ta {version} is not {PANDAS_TA_VERSION}')
+    return pandas_ta
+
+
+class TestPandasTaEquivalence:
+    """The fast paths reproduce pandas-ta itself."""
+
+    @pytest.mark.parametrize('dtype', [np.float64, np.float32])
+    @pytest.mark.parametrize('name,params', CASES)
+    def test_matches_pandas_ta(self, name, params, dtype):
+        pandas_ta = target_pandas_ta()
+        df = make_bars(dtype=dtype)
+        fn = fast_ta.INDICATORS[name]
+        inputs = [df[col.capitalize()] for col in fn.inputs]
+
+        assert_matches(fn(*inputs, **params), getattr(pandas_ta, name)(*inputs, talib=False, **params))
+
+    def test_all_indicators_verify(self):
+        pandas_ta = target_pandas_ta()
+
+        assert set(fast_ta.verify(pandas_ta)) == set(fast_ta.INDICATORS)
+
+    def test_any_release_gets_its_own_results(self):
+        # With whatever pandas-ta is installed: indicators that do not
+        # verify are not routed, and every call matches pandas-ta
+        pandas_ta = pytest.importorskip('pandas_ta')
+        verified = fast_ta.verify(pandas_ta)
+        ta = CachedIndicators(pandas_ta, None, set(fast_ta.INDICATORS), verified)
+        df = make_bars()
+
+        for name, fn in fast_ta.INDICATORS.items():
+            if name not in verified:
+                assert getattr(ta, name) is getattr(pandas_ta, name)
+            inputs = [df[col.capitalize()] for col in fn.inputs]
+            assert_matches(getattr(ta, name)(*inputs), getattr(pandas_ta, name)(*inputs))
@@ -0,0 +1,159 @@
+"""Tests for moving strategy row loops into JIT kernels."""
+
+import ast
+import builtins
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils import jit_loops
+from app.utils.code_cost import analyze_cost
+from app.utils.jit_loops import compile_with_kernels, plan_loops
+
+needs_numba = pytest.mark.skipif(not jit_loops.available(), reason='numba is not installed')
+
+STOP = """
+def strategy(df):
+    close = df['Close'].to_numpy()
+    n = len(close)
+    signals = np.zeros(n)
+    stop = 0.0
+    held = False
+    for i in range(1, n):
+        if held:
+            stop = max(stop, close[i] - 2.0)
+            if close[i] < stop:
+                held = False
+        elif close[i] > close[i - 1] + 0.5:
+            held = True
+            stop = close[i] - 2.0
+        if held:
+            signals[i] = 1
+    return pd.Series(signals, index=df.index)
+"""
+
+
+def plans(code):
+    tree = ast.parse(code)
+    return [(loop.lineno, inputs, outputs) for loop, inputs, outputs in plan_loops(tree, analyze_cost(code, tree))]
+
+
+def run(code, df, kernels=None):
+    namespace = {'pd': pd, 'np': np, **(kernels or {})}
+    exec(code, namespace)
+    return namespace['strategy'](df)
+
+
+@pytest.fixture
+def bars():
+    close = 100 + np.random.default_rng(5).standard_normal(5000).cumsum()
+    return pd.DataFrame({'Close': close}, index=pd.date_range('2020-01-01', periods=len(close), freq='min'))
+
+
+class TestPlanLoops:
+    """Tests for plan_loops."""
+
+    def test_numeric_loop_and_its_names(self):
+        assert plans(STOP) == [(8, ['close', 'held', 'n', 'signals', 'stop'], ['held', 'stop'])]
+
+    def test_pandas_loops_are_left_alone(self):
+        code = """
+def strategy(df):
+    signals = pd.Series(0, index=df.index)
+    for i in range(len(df)):
+        signals.iloc[i] = 1
+    return signals
+"""
+        assert plans(code) == []
+
+    def test_loop_variables_used_after_the_loop(self):
+        code = """
+def strategy(df):
+    close = df['Close'].values
+    for i in range(len(close)):
+        last = close[i]
+    return pd.Series(last, index=df.index)
+"""
+        assert plans(code) == []
+
+    def test_names_other_than_np_and_builtins(self):
+        code = """
+def strategy(df):
+    close = df['Close'].values
+    out = np.zeros(len(close))
+    for i in range(len(close)):
+        out[i] = np.sign(close[i]) + ta.value
+    return pd.Series(out, index=df.index)
+"""
+        assert plans(code) == []
+
+    def test_row_loops_inside_other_loops(self):
+        code = """
+def strategy(df):
+    close = df['Close'].values
+    out = np.zeros(len(close))
+    for length in [5, 10]:
+        total = 0.0
+        for i in range(len(close)):
+            total += close[i]
+            out[i] += total / length
+    return pd.Series(out, index=df.index)
+"""
+        assert plans(code) == [(7, ['close', 'length', 'out', 'total'], ['total'])]
+
+
+class TestCompileWithKernels:
+    """Tests for compile_with_kernels and JitKernel."""
+
+    def test_same_signals_as_interpreted(self, bars):
+        code, kernels = compile_with_kernels(STOP, builtins.__dict__)
+
+        result = run(code, bars, kernels)
+
+        assert list(kernels) == ['_jit_loop_8']
+        pd.testing.assert_series_equal(result, run(STOP, bars))
+        assert result.sum() > 100
+        assert kernels['_jit_loop_8'].jitted == jit_loops.available()
+
+    def test_non_numpy_arguments_run_interpreted(self, bars):
+        code = STOP.replace("df['Close'].to_numpy()", "df['Close'].tolist()")
+        code_object, kernels = compile_with_kernels(code, builtins.__dict__)
+
+        result = run(code_object, bars, kernels)
+
+        pd.testing.assert_series_equal(result, run(STOP, bars))
+        assert not kernels['_jit_loop_8'].jitted
+
+    @needs_numba
+    def test_falls_back_when_numba_cannot_compile(self, bars):
+        code = """
+def strategy(df):
+    close = df['Close'].to_numpy()
+    out = np.zeros(len(close))
+    last = 0.0
+    for i in range(len(close)):
+        last = (close[i], 1.0)
+        out[i] = last[0]
+    return pd.Series(out, index=df.index)
+"""
+        code_object, kernels = compile_with_kernels(code, builtins.__dict__)
+
+        result = run(code_object, bars, kernels)
+
+        pd.testing.assert_series_equal(result, run(code, bars))
+        kernel = kernels['_jit_loop_6']
+        assert kernel.error and not kernel.jitted
+
+    @needs_numba
+    def test_index_errors_raise_as_in_python(self):
+        code = """
+def strategy(df):
+    close = df['Close'].to_numpy()
+    out = np.zeros(len(close))
+    for i in range(len(close)):
+        out[i + 1] = close[i]
+    return pd.Series(out, index=df.index)
+"""
+        code_object, kernels = compile_with_kernels(code, builtins.__dict__)
+
+        with pytest.raises(IndexError):
+            run(code_object, pd.DataFrame({'Close': np.arange(10.0)}), kernels)
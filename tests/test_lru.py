@@ -0,0 +1,83 @@
+"""Tests for the byte-bounded LRU cache."""
+
+import threading
+import pytest
+from app.utils.lru import ByteLRUCache
+
+
+@pytest.fixture
+def cache():
+    """Cache of strings weighed by their length, 10 bytes total."""
+    return ByteLRUCache(10, len)
+
+
+class TestByteLRUCache:
+    """Tests for ByteLRUCache."""
+
+    def test_get_and_put(self, cache):
+        cache.put('a', 'xxx')
+        assert cache.get('a') == 'xxx'
+        assert cache.get('b') is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.put('a', 'aaaa')
+        cache.put('b', 'bbbb')
+        cache.get('a')
+        cache.put('c', 'cccc')
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert cache.evictions == 1
+        assert cache.stats()['bytes'] == 8
+
+    def test_oversized_entry_is_not_cached(self, cache):
+        cache.put('big', 'x' * 11)
+        assert 'big' not in cache
+        assert cache.stats()['bytes'] == 0
+
+    def test_replacing_key_updates_size(self, cache):
+        cache.put('a', 'aaaa')
+        cache.put('a', 'aa')
+        assert cache.stats()['bytes'] == 2
+        assert len(cache) == 1
+
+    def test_resize_evicts(self, cache):
+        cache.put('a', 'aaaa')
+        cache.put('b', 'bbbb')
+        cache.resize(5)
+        assert len(cache) == 1
+        assert 'b' in cache
+
+    def test_on_remove_sees_every_dropped_entry(self):
+        removed = []
+        cache = ByteLRUCache(10, len, on_remove=lambda k, v: removed.append(k))
+
+        cache.put('a', 'aaaa')
+        cache.put('b', 'bbbb')
+        cache.put('a', 'aa')          # replaced
+        cache.put('c', 'cccccc')      # evicts b
+        assert cache.put('d', 'x' * 11) is False
+        cache.pop('c')
+        cache.clear()
+
+        assert removed == ['a', 'b', 'd', 'c', 'a']
+
+    def test_concurrent_access(self):
+        cache = ByteLRUCache(1000, len)
+
+        def worker(n):
+            for i in range(500):
+                cache.put((n, i % 20), 'x' * (i % 7))
+                cache.get((n, (i + 3) % 20))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = cache.stats()
+        assert stats['bytes'] <= 1000
+        assert stats['hits'] + stats['misses'] == 8 * 500
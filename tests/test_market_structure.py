@@ -0,0 +1,179 @@
+"""Tests for the market structure helpers against plain loops."""
+
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils.market_structure import swing_highs, swing_lows, structure, cisd, protected_swings
+
+
+@pytest.fixture
+def bars():
+    n = 3000
+    rng = np.random.default_rng(11)
+    close = 100 + rng.standard_normal(n).cumsum()
+    open_ = np.r_[close[0], close[:-1]] + rng.standard_normal(n) * 0.2
+    index = pd.date_range('2020-01-01', periods=n, freq='5min')
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + rng.random(n),
+        'Low': np.minimum(open_, close) - rng.random(n),
+        'Close': close,
+    }, index=index)
+
+
+def nan(value):
+    return value != value
+
+
+class TestSwings:
+    """Tests for swing_highs and swing_lows."""
+
+    @staticmethod
+    def reference(high, left, right):
+        out = [np.nan] * len(high)
+        for i in range(left + right, len(high)):
+            pivot = i - right
+            if all(high[pivot] > h for h in high[pivot - left:pivot]) and \
+                    all(high[pivot] >= h for h in high[pivot + 1:i + 1]):
+                out[i] = high[pivot]
+        return out
+
+    @pytest.mark.parametrize('left, right', [(2, 2), (1, 0), (5, 3)])
+    def test_matches_loop(self, bars, left, right):
+        highs = swing_highs(bars['High'], left, right)
+        lows = swing_lows(bars['Low'], left, right)
+
+        np.testing.assert_array_equal(highs, self.reference(bars['High'].tolist(), left, right))
+        np.testing.assert_array_equal(-lows, self.reference((-bars['Low']).tolist(), left, right))
+        assert highs.index.equals(bars.index)
+        assert highs.notna().sum() > 100
+
+    def test_confirmed_right_bars_later(self):
+        high = pd.Series([1, 2, 3, 3, 2, 1, 1.0])
+
+        assert swing_highs(high).tolist()[4] == 3
+        assert swing_highs(high).notna().tolist() == [False, False, False, False, True, False, False]
+
+    @pytest.mark.parametrize('n', [0, 1, 3, 4])
+    def test_series_shorter_than_lookback(self, bars, n):
+        high = pd.Series([1.0, 2.0, 3.0, 2.0][:n])
+
+        assert swing_highs(high, left=1, right=3).isna().all()
+        assert swing_lows(high, left=3, right=1).isna().all()
+        assert len(structure(bars.iloc[:n], left=2, right=3)) == n
+        assert len(protected_swings(bars.iloc[:n], left=2, right=3)) == n
+
+    def test_rejects_bad_lookback(self, bars):
+        with pytest.raises(ValueError):
+            swing_highs(bars['High'], left=0)
+
+
+class TestStructure:
+    """Tests for structure."""
+
+    def test_matches_loop(self, bars):
+        result = structure(bars, 3, 2)
+
+        swing_high = swing_highs(bars['High'], 3, 2).tolist()
+        swing_low = swing_lows(bars['Low'], 3, 2).tolist()
+        last_high = last_low = high_side = low_side = np.nan
+        broke_high = broke_low = False
+        last_break = 0
+        for i, close in enumerate(bars['Close']):
+            row = result.iloc[i]
+            hh = lh = hl = ll = False
+            if not nan(swing_high[i]):
+                hh, lh = swing_high[i] > last_high, swing_high[i] <= last_high
+                last_high, broke_high = swing_high[i], False
+            if not nan(swing_low[i]):
+                hl, ll = swing_low[i] >= last_low, swing_low[i] < last_low
+                last_low, broke_low = swing_low[i], False
+            high_side = 1 if hh else -1 if lh else high_side
+            low_side = 1 if hl else -1 if ll else low_side
+
+            bos_up = not broke_high and close > last_high
+            bos_down = not broke_low and close < last_low
+            broke_high, broke_low = broke_high or bos_up, broke_low or bos_down
+
+            assert [row['hh'], row['lh'], row['hl'], row['ll']] == [hh, lh, hl, ll]
+            np.testing.assert_equal([row['last_high'], row['last_low']], [last_high, last_low])
+            assert row['trend'] == (high_side if high_side == low_side else 0)
+            assert [row['bos_up'], row['bos_down']] == [bos_up, bos_down]
+            assert [row['mss_up'], row['mss_down']] == [bos_up and last_break == -1, bos_down and last_break == 1]
+            last_break = 1 if bos_up else -1 if bos_down else last_break
+
+        assert result['bos_up'].sum() > 50 and result['mss_down'].sum() > 10
+
+    def test_does_not_look_ahead(self, bars):
+        full = {fn: fn(bars) for fn in (structure, cisd, protected_swings)}
+
+        for n in (500, 1234, 2999):
+            for fn, result in full.items():
+                pd.testing.assert_frame_equal(fn(bars.iloc[:n]), result.iloc[:n])
+
+
+class TestCisd:
+    """Tests for cisd."""
+
+    def test_matches_loop(self, bars):
+        result = cisd(bars)
+
+        open_, close = bars['Open'].tolist(), bars['Close'].tolist()
+        up_level = down_level = np.nan
+        fired_up = fired_down = False
+        for i in range(len(bars)):
+            if i and close[i - 1] < open_[i - 1] and not (i > 1 and close[i - 2] < open_[i - 2]):
+                up_level, fired_up = open_[i - 1], False
+            if i and close[i - 1] > open_[i - 1] and not (i > 1 and close[i - 2] > open_[i - 2]):
+                down_level, fired_down = open_[i - 1], False
+            up = not fired_up and close[i] > up_level
+            down = not fired_down and close[i] < down_level
+            fired_up, fired_down = fired_up or up, fired_down or down
+
+            row = result.iloc[i]
+            assert [row['cisd_up'], row['cisd_down']] == [up, down]
+            np.testing.assert_equal([row['up_level'], row['down_level']], [up_level, down_level])
+
+        assert result['cisd_up'].sum() > 100
+
+
+class TestProtectedSwings:
+    """Tests for protected_swings."""
+
+    def test_matches_loop(self, bars):
+        result = protected_swings(bars)
+
+        swings = structure(bars)
+        shifts = cisd(bars)
+        low, close = bars['Low'].tolist(), bars['Close'].tolist()
+        swept = False
+        lowest = np.inf
+        level = np.nan
+        for i in range(len(bars)):
+            swept = swept or low[i] < swings['last_low'].iloc[i]
+            lowest = min(lowest, low[i])
+            new = bool(shifts['cisd_up'].iloc[i]) and swept
+            if new:
+                level = lowest
+            if close[i] < level:
+                level = np.nan
+            if shifts['cisd_up'].iloc[i]:
+                swept, lowest = False, np.inf
+
+            assert result['new_protected_low'].iloc[i] == new
+            np.testing.assert_equal(result['protected_low'].iloc[i], level)
+
+        assert result['new_protected_low'].sum() > 20
+        assert result['protected_high'].notna().any()
+
+    def test_bias_follows_the_latest_level(self, bars):
+        result = protected_swings(bars)
+
+        latest = pd.Series(
+            np.where(result['new_protected_low'], 1.0, np.where(result['new_protected_high'], -1.0, np.nan)),
+            index=bars.index,
+        ).ffill().fillna(0)
+        both = result['new_protected_low'] & result['new_protected_high']
+
+        assert not both.any()
+        assert result['bias'].tolist() == latest.astype(int).tolist()
@@ -3,7 +3,10 @@
 import pytest
 import pandas as pd
 import numpy as np
-from app.utils.metrics import calculate_metrics, calculate_equity_curve, _empty_metrics
+from app.utils.metrics import (
+    batch_metrics, bar_returns, calculate_metrics, calculate_equity_curve, calculate_performance,
+    metrics_kernel, _empty_metrics
+)
 
 
 @pytest.fixture
@@ -88,6 +91,21 @@ class TestCalculateMetrics:
         result = calculate_metrics(sample_df, signals)
         assert result['num_trades'] > 0
 
+    def test_annualization_uses_periods_per_year(self, sample_df, all_long_signals):
+        """Intraday bars annualize with more periods per year."""
+        daily = calculate_metrics(sample_df, all_long_signals)
+        hourly = calculate_metrics(sample_df, all_long_signals, periods_per_year=252 * 7)
+
+        assert hourly['total_return'] == daily['total_return']
+        assert hourly['sharpe_ratio'] == pytest.approx(daily['sharpe_ratio'] * np.sqrt(7), abs=0.05)
+        assert hourly['cagr'] > daily['cagr']
+
+    def test_float32_prices_match_float64(self, sample_df, all_long_signals):
+        """Compact float32 prices give the same metrics as float64."""
+        compact = sample_df.astype({'Open': 'float32', 'High': 'float32', 'Low': 'float32', 'Close': 'float32'})
+
+        assert calculate_metrics(compact, all_long_signals) == calculate_metrics(sample_df, all_long_signals)
+
 
 class TestCalculateEquityCurve:
     """Tests for calculate_equity_curve function."""
@@ -122,6 +140,140 @@ class TestCalculateEquityCurve:
         if result:
             assert 0.9 <= result[0]['value'] <= 1.1
 
+    def test_intraday_dates_include_time(self, sample_df, all_long_signals):
+        """Intraday bars keep their time of day."""
+        intraday = sample_df.set_index(pd.date_range('2023-01-02 09:30', periods=20, freq='5min'))
+        signals = all_long_signals.set_axis(intraday.index)
+
+        result = calculate_equity_curve(intraday, signals)
+        assert result[0]['date'] == '2023-01-02 09:35'
+
+
+class TestMetricsKernel:
+    """Tests for metrics_kernel and calculate_performance."""
+
+    @pytest.fixture
+    def bars(self):
+        rng = np.random.default_rng(3)
+        close = 100 * np.exp(rng.standard_normal(500).cumsum() * 0.01)
+        index = pd.date_range('2023-01-02 09:30', periods=len(close), freq='5min', tz='America/New_York')
+        df = pd.DataFrame({'Close': close, 'Volume': 1000.0}, index=index)
+        df.iloc[[40, 41, 300], 0] = np.nan
+        df.iloc[200, 1] = np.nan
+        return df
+
+    @staticmethod
+    def reference(df, signals):
+        """Strategy returns as the pandas version computed them."""
+        df = df.copy()
+        df['returns'] = df['Close'].ffill().pct_change()
+        df['signal'] = signals.shift(1)
+        df['strategy_returns'] = df['signal'] * df['returns']
+        return df.dropna()
+
+    def test_matches_pandas(self, bars):
+        signals = pd.Series(np.random.default_rng(4).choice([-1, 0, 1], len(bars)), index=bars.index)
+        expected = self.reference(bars, signals)
+        strategy_returns = expected['strategy_returns']
+        trades = strategy_returns[expected['signal'] != 0]
+
+        metrics, curve = calculate_performance(bars, signals)
+
+        assert len(curve) == len(expected) == len(bars) - 5
+        assert curve[0]['date'] == expected.index[0].strftime('%Y-%m-%d %H:%M')
+        assert curve[-1]['value'] == round((1 + strategy_returns).prod(), 4)
+        assert metrics['num_trades'] == int((expected['signal'].diff() != 0).sum())
+        assert metrics['win_rate'] == round((trades > 0).mean() * 100, 2)
+        cumulative = (1 + strategy_returns).cumprod()
+        assert metrics['max_drawdown'] == round(((cumulative / cumulative.cummax()).min() - 1) * 100, 2)
+        assert metrics == calculate_metrics(bars, signals)
+        assert curve == calculate_equity_curve(bars, signals)
+
+    def test_signals_on_another_index_are_aligned(self, bars):
+        signals = pd.Series(1, index=bars.index)
+
+        partial = calculate_metrics(bars, signals.iloc[100:])
+
+        assert partial == calculate_metrics(bars.iloc[100:], signals.iloc[100:])
+
+    def test_arrays_in(self):
+        returns = np.array([np.nan, 0.1, -0.05, 0.02, np.nan, 0.01])
+        signal = np.array([np.nan, 1, 1, -1, 1, 0])
+
+        metrics, equity, valid = metrics_kernel(returns, signal)
+
+        assert valid.tolist() == [False, True, True, True, False, True]
+        np.testing.assert_allclose(equity, np.cumprod([1.1, 0.95, 0.98, 1.0]))
+        assert metrics['num_trades'] == 3
+        assert metrics['win_rate'] == pytest.approx(100 / 3, abs=0.01)
+        assert metrics['max_drawdown'] == round((0.95 * 0.98 - 1) * 100, 2)
+
+    def test_nothing_to_count(self):
+        metrics, equity, valid = metrics_kernel(np.full(3, np.nan), np.ones(3))
+
+        assert metrics == _empty_metrics()
+        assert len(equity) == 0 and not valid.any()
+
+
+class TestBatchMetrics:
+    """Tests for batch_metrics."""
+
+    @pytest.fixture
+    def bars(self):
+        rng = np.random.default_rng(8)
+        close = 100 * np.exp(rng.standard_normal(400).cumsum() * 0.01)
+        df = pd.DataFrame({'Close': close}, index=pd.date_range('2023-01-02', periods=len(close), freq='h'))
+        df.iloc[[10, 11, 250], 0] = np.nan
+        return df
+
+    @staticmethod
+    def expected(df, signals):
+        metrics = calculate_metrics(df, pd.Series(signals, index=df.index))
+        return {k: np.inf if v == 'inf' else v for k, v in metrics.items()}
+
+    def test_rows_match_calculate_metrics(self, bars, monkeypatch):
+        rng = np.random.default_rng(9)
+        signals = rng.choice([-1.0, 0.0, 1.0], (40, len(bars)))
+        signals[5, 100:120] = np.nan
+        signals[6] = 1
+        signals[7] = 0
+        # Several chunks, so rows are batched as well
+        monkeypatch.setattr('app.utils.metrics.BATCH_ELEMENTS', len(bars) * 7)
+
+        table = batch_metrics(bar_returns(bars), signals)
+
+        assert list(table.columns) == list(_empty_metrics())
+        assert table['num_trades'].dtype == np.int64
+        for i, row in enumerate(signals):
+            assert table.iloc[i].to_dict() == self.expected(bars, row), f"variant {i}"
+
+    def test_dense_rows_match_calculate_metrics(self, bars):
+        bars = bars.ffill()
+        signals = np.random.default_rng(10).choice([-1.0, 0.0, 1.0], (5, len(bars)))
+
+        table = batch_metrics(bar_returns(bars), signals, periods_per_year=24 * 252)
+
+        for i, row in enumerate(signals):
+            expected = calculate_metrics(bars, pd.Series(row, index=bars.index), periods_per_year=24 * 252)
+            assert table.iloc[i].to_dict() == expected
+
+    def test_names_label_rows(self, bars):
+        signals = np.vstack([np.ones(len(bars)), -np.ones(len(bars)), np.zeros(len(bars))])
+
+        table = batch_metrics(bar_returns(bars), signals, names=['long', 'short', 'flat'])
+
+        assert list(table.index) == ['long', 'short', 'flat']
+        assert table.loc['flat'].to_dict() == _empty_metrics() | {'num_trades': 1}
+
+    def test_variants_without_counted_bars(self):
+        table = batch_metrics(np.array([np.nan, 0.1, 0.2]), np.full((2, 3), np.nan))
+
+        assert table.to_dict('records') == [_empty_metrics()] * 2
+
+    def test_rejects_signals_of_another_length(self, bars):
+        with pytest.raises(ValueError):
+            batch_metrics(bar_returns(bars), np.ones((2, len(bars) - 1)))
+
 
 class TestEmptyMetrics:
     """Tests for _empty_metrics function."""
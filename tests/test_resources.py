@@ -0,0 +1,69 @@
+"""Tests for per-run resource accounting and limits."""
+
+import resource
+import time
+import tracemalloc
+import pytest
+from app.utils.resources import CpuLimitExceeded, metered_run
+
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    yield
+    tracemalloc.stop()
+
+
+class TestMeteredRun:
+    """Tests for metered_run."""
+
+    def test_reports_usage(self):
+        usage = {}
+        with metered_run(usage):
+            values = [float(i) for i in range(100_000)]
+            start = time.process_time()
+            while time.process_time() - start < 0.05:
+                pass
+
+        assert usage['cpu_seconds'] >= 0.05
+        assert usage['wall_seconds'] >= usage['cpu_seconds'] * 0.5
+        assert usage['peak_rss_bytes'] > 0
+        assert usage['alloc_peak_bytes'] >= 100_000 * 24
+        assert usage['alloc_net_bytes'] >= 100_000 * 24
+        del values
+
+    def test_allocation_tracing_can_be_off(self):
+        usage = {}
+        with metered_run(usage, trace_allocations=False):
+            pass
+
+        assert usage['alloc_peak_bytes'] is None
+
+    def test_usage_is_filled_on_error(self):
+        usage = {}
+        with pytest.raises(ValueError):
+            with metered_run(usage):
+                raise ValueError('bad')
+
+        assert usage['wall_seconds'] >= 0
+
+    def test_cpu_limit(self):
+        before = resource.getrlimit(resource.RLIMIT_CPU)
+        usage = {}
+        with pytest.raises(CpuLimitExceeded):
+            with metered_run(usage, cpu_seconds=1):
+                while True:
+                    pass
+
+        # SIGXCPU can arrive a little before getrusage counts the full second
+        assert usage['cpu_seconds'] >= 0.9
+        assert resource.getrlimit(resource.RLIMIT_CPU) == before
+
+    def test_memory_limit(self):
+        np = pytest.importorskip('numpy')
+        before = resource.getrlimit(resource.RLIMIT_AS)
+        with pytest.raises(MemoryError):
+            with metered_run({}, memory_bytes=64 * 1024 * 1024):
+                np.ones(64 * 1024 * 1024)
+
+        assert resource.getrlimit(resource.RLIMIT_AS) == before
+        np.ones(16 * 1024 * 1024)
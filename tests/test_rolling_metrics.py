@@ -0,0 +1,94 @@
+"""Tests for rolling-window performance analytics."""
+
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils.costs import parse_costs
+from app.utils.metrics import calculate_equity_curve, calculate_metrics
+from app.utils.rolling_metrics import rolling_kernel, rolling_metrics, rolling_points, ROLLING_COLUMNS
+
+
+def reference(strategy_returns, signal, window, periods_per_year):
+    """Each window's metrics recomputed from scratch."""
+    rows = []
+    for end in range(window, len(strategy_returns) + 1):
+        returns, held = strategy_returns[end - window:end], signal[end - window:end] != 0
+        std = returns.std(ddof=1)
+        equity = np.cumprod(np.r_[1, 1 + returns])
+        rows.append([
+            returns.mean() / std * np.sqrt(periods_per_year) if std > 0 else 0,
+            std * np.sqrt(periods_per_year) * 100,
+            ((equity / np.maximum.accumulate(equity)).min() - 1) * 100,
+            ((returns > 0) & held).sum() / held.sum() * 100 if held.any() else 0,
+        ])
+    return np.array(rows).reshape(-1, 4)
+
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(41)
+    close = 100 * np.exp(rng.standard_normal(600).cumsum() * 0.01)
+    df = pd.DataFrame({'Close': close}, index=pd.date_range('2021-01-04', periods=len(close), freq='D'))
+    df.iloc[[50, 51], 0] = np.nan
+    return df
+
+
+@pytest.fixture
+def signals(bars):
+    values = np.repeat(np.random.default_rng(42).choice([-1.0, 0.0, 1.0], 60), 10)
+    return pd.Series(values, index=bars.index)
+
+
+class TestRollingKernel:
+    """Tests for rolling_kernel."""
+
+    @pytest.mark.parametrize('n, window', [(500, 37), (500, 2), (120, 40), (99, 33), (20, 20), (19, 20)])
+    def test_matches_windows_recomputed(self, n, window):
+        rng = np.random.default_rng(n + window)
+        signal = rng.choice([-1.0, 0.0, 1.0], n)
+        signal[10:60] = 0
+        strategy_returns = rng.standard_normal(n) * 0.01 * signal
+
+        series = rolling_kernel(strategy_returns, signal, window, 252)
+
+        table = np.column_stack([series[column] for column in ROLLING_COLUMNS])
+        assert np.isnan(table[:window - 1]).all()
+        np.testing.assert_allclose(table[window - 1:], reference(strategy_returns, signal, window, 252), rtol=1e-6)
+
+    def test_rejects_short_windows(self):
+        with pytest.raises(ValueError):
+            rolling_kernel(np.zeros(10), np.zeros(10), 1)
+
+
+class TestRollingMetrics:
+    """Tests for rolling_metrics and rolling_points."""
+
+    def test_on_the_equity_curve_bars(self, bars, signals):
+        table = rolling_metrics(bars, signals, 100)
+
+        curve = calculate_equity_curve(bars, signals)
+        assert list(table.columns) == list(ROLLING_COLUMNS)
+        assert len(table) == len(curve)
+        assert table.index[0].strftime('%Y-%m-%d') == curve[0]['date']
+
+    def test_full_window_matches_calculate_metrics(self, bars, signals):
+        costs = parse_costs({'slippage_bps': 5})
+        metrics = calculate_metrics(bars, signals, costs=costs)
+
+        table = rolling_metrics(bars, signals, len(calculate_equity_curve(bars, signals)), costs=costs)
+
+        last = table.iloc[-1]
+        assert round(last['sharpe_ratio'], 2) == metrics['sharpe_ratio']
+        assert round(last['max_drawdown'], 2) == metrics['max_drawdown']
+        assert round(last['win_rate'], 2) == metrics['win_rate']
+
+    def test_points_from_the_first_full_window(self, bars, signals):
+        table = rolling_metrics(bars, signals, 100)
+
+        points = rolling_points(table)
+
+        assert len(points) == len(table) - 99
+        assert list(points[0]) == ['date', *ROLLING_COLUMNS]
+        assert points[0]['date'] == table.index[99].strftime('%Y-%m-%d')
+        assert points[-1]['max_drawdown'] == round(table['max_drawdown'].iloc[-1], 4)
+        assert rolling_points(rolling_metrics(bars.iloc[:50], signals.iloc[:50], 100)) == []
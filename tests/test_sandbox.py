@@ -1,9 +1,13 @@
 """Tests for sandbox execution."""
 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pytest
 import pandas as pd
 import numpy as np
-from app.utils.sandbox import execute_strategy, SandboxError
+from app.utils import sandbox
+from app.utils.sandbox import execute_strategy, compile_strategy, SandboxError, SandboxPool
 
 
 @pytest.fixture
@@ -97,6 +101,30 @@ def strategy(df):
         result = execute_strategy(code, sample_df)
         assert result['success'] is True
 
+    def test_can_use_strategy_helpers(self, sample_df):
+        """Stateful helpers are available without import."""
+        code = """
+def strategy(df):
+    fast = df['Close'].rolling(2).mean()
+    slow = df['Close'].rolling(4).mean()
+    return positions(long_entry=crossover(fast, slow), long_exit=crossunder(fast, slow))
+"""
+        result = execute_strategy(code, sample_df)
+        assert result['success'] is True
+        assert set(result['signals']) <= {0, 1}
+        assert result['cost']['warnings'] == []
+
+    def test_can_use_market_structure(self, sample_df):
+        """Market structure helpers are available without import."""
+        code = """
+def strategy(df):
+    ms = structure(df, left=1, right=1)
+    return latch(ms['bos_up'], ms['bos_down']).astype(int)
+"""
+        result = execute_strategy(code, sample_df)
+        assert result['success'] is True
+        assert set(result['signals']) <= {0, 1}
+
     def test_can_use_safe_builtins(self, sample_df):
         """Strategy should have access to safe builtins."""
         code = """
@@ -184,6 +212,326 @@ def strategy(df):
         pd.testing.assert_series_equal(sample_df['Close'], original_close)
 
 
+class TestCompileStrategy:
+    """Tests for compile-once strategy handles."""
+
+    code = """
+def strategy(df):
+    return pd.Series(np.where(df['Close'] > df['Open'], 1, 0), index=df.index)
+"""
+
+    def test_same_source_returns_same_handle(self):
+        assert compile_strategy(self.code) is compile_strategy(self.code)
+
+    def test_formatting_does_not_change_key(self):
+        reformatted = """
+# Long when the bar closes up
+def strategy(df):
+    return pd.Series(np.where(df['Close'] > df['Open'],
+                              1, 0), index=df.index)
+"""
+        changed = self.code.replace('1, 0', '1, -1')
+
+        assert compile_strategy(reformatted).key == compile_strategy(self.code).key
+        assert compile_strategy(changed).key != compile_strategy(self.code).key
+
+    def test_invalid_code_raises(self):
+        with pytest.raises(SandboxError):
+            compile_strategy("def strategy(df)\n    return df")
+        with pytest.raises(SandboxError, match="No 'strategy' function"):
+            compile_strategy("def other(df):\n    return df")
+
+    def test_run_many(self, sample_df):
+        handle = compile_strategy(self.code)
+        frames = [sample_df, sample_df.iloc[:5], sample_df * 2]
+
+        results = handle.run_many(frames)
+
+        assert [r['success'] for r in results] == [True, True, True]
+        assert [len(r['signals']) for r in results] == [10, 5, 10]
+        pd.testing.assert_series_equal(results[0]['signals'], handle.run(sample_df)['signals'])
+
+
+class TestSandboxPool:
+    """Tests for the worker process pool."""
+
+    def test_timeout_kills_and_replaces_worker(self, sample_df):
+        """A runaway strategy is killed and the pool keeps working."""
+        pool = SandboxPool(workers=1)
+        try:
+            busy = """
+def strategy(df):
+    while True:
+        pass
+"""
+            start = time.perf_counter()
+            signals, error, _ = pool.run(busy, sample_df, timeout_seconds=1)
+            assert signals is None
+            assert 'timed out' in error
+            assert time.perf_counter() - start < 5
+
+            ok = """
+def strategy(df):
+    return pd.Series(1, index=df.index)
+"""
+            signals, error, _ = pool.run(ok, sample_df, timeout_seconds=10)
+            assert error is None
+            assert (signals == 1).all()
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.skipif(not os.path.exists('/proc/self/stat'), reason='needs /proc')
+    def test_workers_are_not_forked_from_the_server(self, sample_df):
+        """Workers, respawns included, come from the fork server, not this (threaded) process."""
+        def parent_pid(pool):
+            with open(f'/proc/{pool._idle.queue[0].process.pid}/stat') as f:
+                return int(f.read().rsplit(')', 1)[1].split()[1])
+
+        pool = SandboxPool(workers=1, max_tasks=1)
+        try:
+            assert parent_pid(pool) != os.getpid()
+            ok = """
+def strategy(df):
+    return pd.Series(1, index=df.index)
+"""
+            _, error, _ = pool.run(ok, sample_df, timeout_seconds=30)
+
+            assert error is None
+            assert parent_pid(pool) != os.getpid()
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.skipif((os.cpu_count() or 1) < 2, reason='needs two CPUs')
+    def test_runs_in_parallel(self, sample_df):
+        """Two workers run two slow strategies side by side."""
+        pool = SandboxPool(workers=2)
+        try:
+            slow = """
+def strategy(df):
+    total = 0
+    for i in range(3_000_000):
+        total += i
+    return pd.Series(1, index=df.index)
+"""
+            pool.run(slow, sample_df, timeout_seconds=30)
+            start = time.perf_counter()
+            pool.run(slow, sample_df, timeout_seconds=30)
+            single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(2) as executor:
+                results = list(executor.map(lambda _: pool.run(slow, sample_df, 30), range(2)))
+            both = time.perf_counter() - start
+
+            assert all(error is None for _, error, _ in results)
+            assert both < single * 1.8
+        finally:
+            pool.shutdown()
+
+    def test_workers_are_recycled(self, sample_df):
+        """Workers are replaced after max_tasks runs."""
+        pool = SandboxPool(workers=1, max_tasks=2)
+        try:
+            code = """
+def strategy(df):
+    return pd.Series(1, index=df.index)
+"""
+            pids = []
+            for _ in range(4):
+                worker = pool._idle.queue[0]
+                pids.append(worker.process.pid)
+                pool.run(code, sample_df, timeout_seconds=10)
+
+            assert pids[0] == pids[1]
+            assert pids[1] != pids[2]
+        finally:
+            pool.shutdown()
+
+
+class TestResourceLimits:
+    """Tests for per-run resource accounting and limits."""
+
+    def test_resources_are_reported(self, sample_df):
+        """Every run reports what it used."""
+        code = """
+def strategy(df):
+    values = [float(i) for i in range(200_000)]
+    return pd.Series(1, index=df.index)
+"""
+        result = execute_strategy(code, sample_df)
+
+        resources = result['resources']
+        assert result['success'] is True
+        assert resources['wall_seconds'] > 0
+        assert resources['cpu_seconds'] > 0
+        assert resources['peak_rss_bytes'] > 0
+        assert resources['alloc_peak_bytes'] > 200_000 * 24
+
+    def test_failed_runs_report_resources(self, sample_df):
+        """Resources come back with errors too."""
+        code = """
+def strategy(df):
+    raise ValueError('bad')
+"""
+        result = execute_strategy(code, sample_df)
+
+        assert result['success'] is False
+        assert result['resources']['wall_seconds'] >= 0
+
+    def test_cpu_limit_stops_runaway_code(self, sample_df):
+        """Code over its CPU time is stopped inside the worker, which survives."""
+        pool = SandboxPool(workers=1, cpu_seconds=1)
+        try:
+            busy = """
+def strategy(df):
+    while True:
+        pass
+"""
+            pid = pool._idle.queue[0].process.pid
+            start = time.perf_counter()
+            signals, error, resources = pool.run(busy, sample_df, timeout_seconds=30)
+
+            assert signals is None
+            assert 'CPU time limit' in error
+            assert time.perf_counter() - start < 10
+            # SIGXCPU can arrive a little before getrusage counts the full second
+            assert resources['cpu_seconds'] >= 0.9
+            assert pool._idle.queue[0].process.pid == pid
+        finally:
+            pool.shutdown()
+
+    def test_memory_limit_stops_large_allocations(self, sample_df):
+        """Allocations past the memory limit fail without killing the worker."""
+        pool = SandboxPool(workers=1, memory_bytes=256 * 1024 * 1024)
+        try:
+            greedy = """
+def strategy(df):
+    big = np.ones(1024 * 1024 * 1024)
+    return pd.Series(1, index=df.index)
+"""
+            signals, error, _ = pool.run(greedy, sample_df, timeout_seconds=30)
+            assert signals is None
+            assert 'Memory limit of 256 MB exceeded' in error
+
+            ok = """
+def strategy(df):
+    return pd.Series(np.ones(len(df)), index=df.index)
+"""
+            signals, error, _ = pool.run(ok, sample_df, timeout_seconds=30)
+            assert error is None
+        finally:
+            pool.shutdown()
+
+    def test_configured_timeout_is_the_default(self, sample_df):
+        """execute_strategy uses the configured timeout."""
+        busy = """
+def strategy(df):
+    while True:
+        pass
+"""
+        sandbox.configure(timeout_seconds=1, cpu_seconds=60)
+        try:
+            result = execute_strategy(busy, sample_df)
+        finally:
+            sandbox.configure(timeout_seconds=120, cpu_seconds=0)
+
+        assert result['success'] is False
+        assert 'timed out after 1 seconds' in result['error']
+
+
+class TestCostAnalysis:
+    """Tests for the static cost check before runs."""
+
+    LOOP = """
+def strategy(df):
+    signals = pd.Series(0, index=df.index)
+    for i in range(len(df)):
+        signals.iloc[i] = 1
+    return signals
+"""
+
+    def test_row_wise_code_is_flagged(self, sample_df):
+        """Loops over the bars run but come back with warnings."""
+        result = execute_strategy(self.LOOP, sample_df)
+
+        assert result['success'] is True
+        assert result['cost']['estimated_seconds'] > 0
+        assert [(w['kind'], w['line']) for w in result['cost']['warnings']] == [('scalar_write', 5), ('row_loop', 4)]
+
+    def test_vectorized_code_has_no_warnings(self, sample_df):
+        code = """
+def strategy(df):
+    return pd.Series(np.where(df['Close'] > df['Open'], 1, 0), index=df.index)
+"""
+        result = execute_strategy(code, sample_df)
+
+        assert result['cost'] == {'estimated_seconds': 0.0, 'warnings': []}
+
+    def test_rejects_code_over_the_estimate_limit(self, sample_df):
+        """Over the limit, the strategy fails without running."""
+        sandbox.configure(max_estimated_seconds=1e-6)
+        try:
+            result = execute_strategy(self.LOOP, sample_df)
+        finally:
+            sandbox.configure(max_estimated_seconds=0)
+
+        assert result['success'] is False
+        assert 'Strategy rejected' in result['error']
+        assert 'line 5' in result['error']
+        assert result['resources'] is None
+
+
+    def test_zero_step_range_fails_the_run(self, sample_df):
+        """Code the cost analysis cannot size still runs (and fails) in the sandbox."""
+        code = """
+def strategy(df):
+    for k in range(0, 10, 0):
+        pass
+    return pd.Series(1, index=df.index)
+"""
+        result = execute_strategy(code, sample_df)
+
+        assert result['success'] is False
+        assert 'must not be zero' in result['error']
+
+
+class TestJitLoops:
+    """Tests for the opt-in JIT compilation of row loops."""
+
+    LOOP = """
+def strategy(df):
+    close = df['Close'].to_numpy()
+    signals = np.zeros(len(close))
+    for i in range(1, len(close)):
+        if close[i] > close[i - 1]:
+            signals[i] = 1
+    return pd.Series(signals, index=df.index)
+"""
+
+    def test_same_signals_with_jit_loops(self, sample_df):
+        interpreted = execute_strategy(self.LOOP, sample_df)
+        sandbox.configure(jit_loops=True)
+        try:
+            compiled = execute_strategy(self.LOOP, sample_df)
+        finally:
+            sandbox.configure(jit_loops=False)
+
+        assert compile_strategy(self.LOOP).jit_spans == ((5, 7),)
+        assert compiled['success'] is True
+        pd.testing.assert_series_equal(compiled['signals'], interpreted['signals'])
+
+    @pytest.mark.skipif(not sandbox.jit_loops.available(), reason='numba is not installed')
+    def test_jit_loops_are_not_held_to_the_estimate(self, sample_df):
+        sandbox.configure(max_estimated_seconds=1e-9, jit_loops=True)
+        try:
+            result = execute_strategy(self.LOOP, sample_df)
+        finally:
+            sandbox.configure(max_estimated_seconds=0, jit_loops=False)
+
+        assert result['success'] is True
+        assert result['cost']['warnings']
+
+
 class TestSandboxError:
     """Tests for SandboxError exception."""
 
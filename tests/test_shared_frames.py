@@ -0,0 +1,149 @@
+"""Tests for handing frames to worker processes through shared memory."""
+
+import multiprocessing
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils import shared_frames
+from app.utils.shared_frames import SharedFrameStore, attach_frame, column_key
+
+
+def make_frame(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({
+        'Open': close.astype('float32'),
+        'Close': close,
+        'Volume': rng.integers(1, 1000, n).astype('int32'),
+    }, index=pd.date_range('2023-01-02 09:30', periods=n, freq='5min', name='Date'))
+
+
+def read_only(df):
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy(copy=True)
+        values.flags.writeable = False
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def segment_exists(handle):
+    return (shared_frames.SHM_DIR / handle['name']).exists()
+
+
+def column_sum(handle, queue):
+    queue.put(float(attach_frame(handle)['Close'].sum()))
+
+
+@pytest.fixture
+def store():
+    store = SharedFrameStore(64 * 1024 * 1024)
+    yield store
+    store.clear()
+
+
+class TestSharedFrameStore:
+    """Tests for SharedFrameStore and attach_frame."""
+
+    def test_round_trip(self, store):
+        df = make_frame()
+        handle = store.publish(df)
+
+        attached = attach_frame(handle)
+
+        pd.testing.assert_frame_equal(attached, df, check_freq=False)
+        store.release(handle)
+
+    def test_same_data_reuses_segment(self, store):
+        first = store.publish(make_frame())
+        second = store.publish(make_frame())
+        other = store.publish(make_frame(seed=1))
+
+        assert first['name'] == second['name']
+        assert other['name'] != first['name']
+        for handle in (first, second, other):
+            store.release(handle)
+
+    def test_read_only_frames_are_hashed_once(self, store, monkeypatch):
+        df = read_only(make_frame())
+        handle = store.publish(df.iloc[10:500].copy(deep=False))
+        store.release(handle)
+
+        calls = []
+        blake2b = shared_frames.hashlib.blake2b
+        monkeypatch.setattr(shared_frames.hashlib, 'blake2b', lambda **kw: calls.append(1) or blake2b(**kw))
+
+        again = store.publish(df.iloc[10:500].copy(deep=False))
+        assert again['name'] == handle['name']
+        assert calls == []
+        store.release(again)
+
+    def test_worker_writes_stay_private(self, store):
+        df = make_frame()
+        handle = store.publish(df)
+
+        attached = attach_frame(handle)
+        attached.loc[attached.index[0], 'Close'] = -1.0
+
+        assert attach_frame(handle)['Close'].iloc[0] == df['Close'].iloc[0]
+        store.release(handle)
+
+    def test_other_process_sees_frame(self, store):
+        df = make_frame()
+        handle = store.publish(df)
+        ctx = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        queue = ctx.Queue()
+
+        process = ctx.Process(target=column_sum, args=(handle, queue))
+        process.start()
+        result = queue.get(timeout=30)
+        process.join()
+
+        assert result == pytest.approx(df['Close'].sum())
+        store.release(handle)
+
+    def test_eviction_waits_for_release(self):
+        df = make_frame()
+        store = SharedFrameStore(20 * 1024 * 1024)
+        handle = store.publish(df)
+
+        store.resize(0)
+        assert segment_exists(handle)
+
+        store.release(handle)
+        assert not segment_exists(handle)
+
+    def test_object_columns_are_not_shared(self, store):
+        df = make_frame()
+        df['Note'] = 'x'
+
+        assert store.publish(df) is None
+
+
+class TestColumnKey:
+    """Tests for column_key."""
+
+    def test_attached_columns_are_keyed_by_dataset(self, store):
+        handle = store.publish(make_frame())
+
+        first, second = attach_frame(handle), attach_frame(handle)
+
+        key = column_key(first['Close'].to_numpy())
+        assert key is not None and key[0] == handle['key']
+        assert column_key(second['Close'].to_numpy()) == key
+        assert column_key(first['Open'].to_numpy()) != key
+        store.release(handle)
+
+    def test_written_columns_lose_their_key(self, store):
+        # Long enough that the columns share no pages
+        handle = store.publish(make_frame(20_000))
+        attached = attach_frame(handle)
+
+        attached.loc[attached.index[10_000], 'Close'] = -1.0
+
+        assert column_key(attached['Close'].to_numpy()) is None
+        assert column_key(attached['Open'].to_numpy()) is not None
+        store.release(handle)
+
+    def test_other_arrays_have_no_key(self):
+        assert column_key(make_frame()['Close'].to_numpy()) is None
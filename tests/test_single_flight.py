@@ -0,0 +1,49 @@
+"""Tests for single-flight call coalescing."""
+
+import threading
+import time
+import pytest
+from app.utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight."""
+
+    def test_concurrent_calls_run_once(self):
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+
+        def caller():
+            results.append(flight.do('key', work))
+
+        threads = [threading.Thread(target=caller) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert [value for value, _ in results] == ['value'] * 5
+        assert sum(1 for _, shared in results if not shared) == 1
+
+    def test_sequential_calls_run_again(self):
+        flight = SingleFlight()
+        assert flight.do('key', lambda: 1) == (1, False)
+        assert flight.do('key', lambda: 2) == (2, False)
+
+    def test_error_is_shared_and_key_released(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError('boom')
+
+        with pytest.raises(RuntimeError):
+            flight.do('key', fail)
+        assert flight.do('key', lambda: 'ok') == ('ok', False)
@@ -0,0 +1,171 @@
+"""Tests for the vectorized strategy helpers against plain loops."""
+
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils.strategy_helpers import (
+    crossover, crossunder, bars_since, latch, positions, entry_price, trailing_stop
+)
+
+
+@pytest.fixture
+def bars():
+    n = 2000
+    rng = np.random.default_rng(7)
+    close = 100 + rng.standard_normal(n).cumsum()
+    index = pd.date_range('2020-01-01', periods=n, freq='h')
+    return pd.DataFrame({
+        'High': close + rng.random(n),
+        'Low': close - rng.random(n),
+        'Close': close,
+    }, index=index)
+
+
+def flags(index, p, seed):
+    return pd.Series(np.random.default_rng(seed).random(len(index)) < p, index=index)
+
+
+class TestEvents:
+    """Tests for crossover, crossunder and bars_since."""
+
+    def test_crossover_and_crossunder(self, bars):
+        fast = bars['Close'].rolling(5).mean()
+        slow = bars['Close'].rolling(20).mean()
+
+        up = crossover(fast, slow)
+        down = crossunder(fast, slow)
+
+        for i in range(1, len(bars)):
+            assert up.iloc[i] == (fast.iloc[i] > slow.iloc[i] and fast.iloc[i - 1] <= slow.iloc[i - 1])
+            assert down.iloc[i] == (fast.iloc[i] < slow.iloc[i] and fast.iloc[i - 1] >= slow.iloc[i - 1])
+        assert not up.iloc[0] and not down.iloc[0]
+
+    def test_crossover_of_a_level(self, bars):
+        up = crossover(bars['Close'], 100)
+
+        assert up.equals(crossover(bars['Close'], pd.Series(100.0, index=bars.index)))
+
+    def test_bars_since(self, bars):
+        event = flags(bars.index, 0.02, 1)
+        event.iloc[:50] = False
+
+        result = bars_since(event)
+
+        last = None
+        for i, happened in enumerate(event):
+            if happened:
+                last = i
+            expected = np.nan if last is None else i - last
+            np.testing.assert_equal(result.iloc[i], expected)
+
+
+class TestPositions:
+    """Tests for latch, positions and entry_price."""
+
+    def test_latch(self, bars):
+        entry = flags(bars.index, 0.05, 2)
+        exit = flags(bars.index, 0.05, 3)
+
+        expected, held = [], False
+        for e, x in zip(entry, exit):
+            held = True if e else False if x else held
+            expected.append(held)
+
+        assert latch(entry, exit).tolist() == expected
+
+    def test_positions(self, bars):
+        long_entry, long_exit, short_entry, short_exit = (flags(bars.index, 0.03, seed) for seed in range(4, 8))
+
+        expected, state = [], 0
+        for le, lx, se, sx in zip(long_entry, long_exit, short_entry, short_exit):
+            if le != se:
+                state = 1 if le else -1
+            elif not (le and se):
+                if (lx and state == 1) or (sx and state == -1):
+                    state = 0
+            expected.append(state)
+
+        result = positions(long_entry, long_exit, short_entry, short_exit)
+
+        assert result.tolist() == expected
+
+    def test_positions_long_only(self, bars):
+        entry = flags(bars.index, 0.05, 8)
+        exit = flags(bars.index, 0.05, 9)
+
+        assert positions(long_entry=entry, long_exit=exit).tolist() == latch(entry, exit).astype(int).tolist()
+
+    def test_positions_needs_a_condition(self):
+        with pytest.raises(ValueError):
+            positions()
+
+    def test_entry_price(self, bars):
+        position = positions(flags(bars.index, 0.03, 10), flags(bars.index, 0.03, 11),
+                             flags(bars.index, 0.03, 12), flags(bars.index, 0.03, 13))
+
+        result = entry_price(position, bars['Close'])
+
+        price, previous = np.nan, 0
+        for i, side in enumerate(position):
+            if side != previous:
+                price = bars['Close'].iloc[i] if side else np.nan
+            previous = side
+            np.testing.assert_equal(result.iloc[i], price if side else np.nan)
+
+
+class TestTrailingStop:
+    """Tests for trailing_stop."""
+
+    @staticmethod
+    def reference(entry, price, distance, direction, touch):
+        """The stop as a per-bar loop would compute it."""
+        held = []
+        in_trade = False
+        stop = None
+        exit_bar = -1
+        for i in range(len(entry)):
+            if in_trade and stop is not None and (touch[i] <= stop if direction == 1 else touch[i] >= stop):
+                in_trade = False
+                exit_bar = i
+            elif not in_trade and entry[i] and i != exit_bar:
+                in_trade = True
+                stop = None
+            if in_trade:
+                level = price[i] - direction * distance[i]
+                if not np.isnan(level):
+                    stop = level if stop is None else (max(stop, level) if direction == 1 else min(stop, level))
+            held.append(direction if in_trade else 0)
+        return held
+
+    @pytest.mark.parametrize('direction', [1, -1])
+    def test_matches_loop(self, bars, direction):
+        entry = flags(bars.index, 0.02, 14)
+        distance = (bars['High'] - bars['Low']).rolling(14).mean() * 2
+        touch = bars['Low'] if direction == 1 else bars['High']
+
+        result = trailing_stop(entry, bars['Close'], distance, direction=direction,
+                               low=bars['Low'], high=bars['High'])
+
+        expected = self.reference(entry.to_numpy(), bars['Close'].to_numpy(), distance.to_numpy(),
+                                  direction, touch.to_numpy())
+        assert result.tolist() == expected
+        assert result.abs().sum() > 100
+
+    def test_long_trades_outlast_the_search_window(self):
+        close = pd.Series(np.arange(1000.0))
+        entry = pd.Series(False, index=close.index)
+        entry.iloc[0] = True
+
+        result = trailing_stop(entry, close, 5.0)
+
+        assert result.tolist() == [1] * 1000
+
+    def test_constant_distance_on_closes(self):
+        close = pd.Series([10, 11, 12, 13, 12, 11.5, 14, 13.9])
+        entry = pd.Series([1, 0, 0, 0, 0, 1, 0, 0]).astype(bool)
+
+        assert trailing_stop(entry, close, 1.0).tolist() == [1, 1, 1, 1, 0, 1, 1, 1]
+
+    def test_rejects_bad_direction(self, bars):
+        with pytest.raises(ValueError):
+            trailing_stop(flags(bars.index, 0.1, 0), bars['Close'], 1.0, direction=0)
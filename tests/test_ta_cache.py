@@ -0,0 +1,139 @@
+"""Tests for memoized pandas-ta indicators."""
+
+import types
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils.ta_cache import IndicatorCache, CachedIndicators, _cached_accessor, _indicator_inputs
+
+
+@pytest.fixture
+def df():
+    dates = pd.date_range('2023-01-02', periods=200, freq='B', name='Date')
+    close = 100 + np.random.default_rng(0).standard_normal(200).cumsum()
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close}, index=dates)
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def ta(calls):
+    """Fake pandas-ta module with one counted indicator."""
+    def sma(close, length=10, offset=None):
+        calls.append(length)
+        return close.rolling(length).mean().rename(f'SMA_{length}')
+
+    module = types.SimpleNamespace(sma=sma, Category={'overlap': ['sma']}, version='test')
+    return CachedIndicators(module, IndicatorCache(16 * 1024 * 1024), {'sma'})
+
+
+class TestIndicatorCache:
+    """Tests for IndicatorCache and the module proxy."""
+
+    def test_identical_calls_hit(self, ta, calls, df):
+        first = ta.sma(df['Close'], length=20)
+        second = ta.sma(df['Close'], 20)
+        third = ta.sma(df['Close'].copy(), length=20)
+
+        assert calls == [20]
+        pd.testing.assert_series_equal(first, second)
+        pd.testing.assert_series_equal(first, third)
+
+    def test_different_params_or_data_miss(self, ta, calls, df):
+        ta.sma(df['Close'], length=20)
+        ta.sma(df['Close'], length=50)
+        ta.sma(df['Close'] * 2, length=20)
+        ta.sma(df['Close'].iloc[1:], length=20)
+
+        assert calls == [20, 50, 20, 20]
+
+    def test_results_are_private_copies(self, ta, df):
+        first = ta.sma(df['Close'], length=20)
+        first[:] = 0
+
+        assert ta.sma(df['Close'], length=20).iloc[-1] != 0
+
+    def test_in_place_edits_change_fingerprint(self, ta, calls, df):
+        ta.sma(df['Close'], length=20)
+        df.loc[df.index[-1], 'Close'] = 0
+        result = ta.sma(df['Close'], length=20)
+
+        assert calls == [20, 20]
+        assert result.iloc[-1] == pytest.approx(df['Close'].iloc[-20:].mean())
+
+    def test_other_attributes_pass_through(self, ta):
+        assert ta.version == 'test'
+
+    def test_memory_bound(self, calls, df):
+        cache = IndicatorCache(df['Close'].memory_usage(index=True, deep=True) * 2)
+        ta = CachedIndicators(types.SimpleNamespace(sma=lambda close, length: calls.append(length) or close), cache, {'sma'})
+
+        for length in (1, 2, 3, 1):
+            ta.sma(df['Close'], length)
+
+        assert calls == [1, 2, 3, 1]
+        assert cache.stats()['evictions'] >= 1
+
+
+class TestCachedAccessor:
+    """Tests for the caching df.ta accessor."""
+
+    @pytest.fixture
+    def accessor(self, calls):
+        class FakeAccessor:
+            def __init__(self, df):
+                self._df = df
+
+            def sma(self, length=10, append=False, **kwargs):
+                calls.append(length)
+                result = self._df[kwargs.get('close', 'Close')].rolling(length).mean()
+                if append:
+                    self._df[f'SMA_{length}'] = result
+                return result
+
+            def constants(self):
+                return 'not an indicator'
+
+        inputs = {'sma': _indicator_inputs(lambda close, length=None, offset=None, **kwargs: None)}
+        return _cached_accessor(FakeAccessor, IndicatorCache(16 * 1024 * 1024), {'sma'}, inputs=inputs)
+
+    def test_accessor_calls_are_cached(self, accessor, calls, df):
+        accessor(df).sma(length=20)
+        accessor(df.copy()).sma(20)
+
+        assert calls == [20]
+
+    def test_added_columns_do_not_change_key(self, accessor, calls, df):
+        accessor(df).sma(length=20)
+        df['signal'] = 1
+        accessor(df).sma(length=20)
+
+        assert calls == [20]
+
+    def test_columns_the_indicator_does_not_read_are_not_keyed(self, accessor, calls, df):
+        accessor(df).sma(length=20)
+        df['High'] = df['High'] + 1
+        accessor(df).sma(length=20)
+
+        assert calls == [20]
+
+    def test_named_source_column_is_fingerprinted(self, accessor, calls, df):
+        df['Mid'] = (df['High'] + df['Low']) / 2
+        accessor(df).sma(length=20, close='Mid')
+        df['Mid'] = df['Mid'] + 1
+        accessor(df).sma(length=20, close='Mid')
+
+        assert calls == [20, 20]
+
+    def test_append_bypasses_cache(self, accessor, calls, df):
+        accessor(df).sma(length=20)
+        accessor(df).sma(length=20, append=True)
+
+        assert calls == [20, 20]
+        assert 'SMA_20' in df.columns
+
+    def test_non_indicators_pass_through(self, accessor, df):
+        assert accessor(df).constants() == 'not an indicator'
@@ -0,0 +1,162 @@
+"""Tests for the trade ledger and trade metrics."""
+
+import json
+import pytest
+import pandas as pd
+import numpy as np
+from app.utils.metrics import calculate_equity_curve
+from app.utils.trades import trade_ledger, trade_metrics, ledger_columns, LEDGER_COLUMNS
+
+
+@pytest.fixture
+def bars():
+    n = 2000
+    rng = np.random.default_rng(21)
+    close = 100 * np.exp(rng.standard_normal(n).cumsum() * 0.01)
+    index = pd.date_range('2024-01-02 09:30', periods=n, freq='5min', tz='America/New_York')
+    df = pd.DataFrame({
+        'High': close * (1 + rng.random(n) * 0.01),
+        'Low': close * (1 - rng.random(n) * 0.01),
+        'Close': close,
+    }, index=index)
+    df.iloc[[300, 301, 1500], 2] = np.nan
+    return df
+
+
+@pytest.fixture
+def signals(bars):
+    rng = np.random.default_rng(22)
+    # Held for a few bars at a time
+    values = np.repeat(rng.choice([-1.0, 0.0, 1.0, np.nan], 400, p=[0.3, 0.3, 0.35, 0.05]), 5)
+    return pd.Series(values, index=bars.index)
+
+
+def reference(df, signals):
+    """Trades found one bar at a time."""
+    close = df['Close'].ffill().tolist()
+    high, low = df['High'].tolist(), df['Low'].tolist()
+    held = [0.0] + [0.0 if s != s else s for s in signals.tolist()[:-1]]
+    trades = []
+    for i in range(1, len(df)):
+        if held[i] != 0 and held[i] != held[i - 1]:
+            trades.append({'entry_index': i - 1, 'position': held[i], 'growth': 1.0,
+                           'highest': close[i], 'lowest': close[i]})
+        if held[i] != 0:
+            trade = trades[-1]
+            trade['exit_index'] = i
+            if close[i - 1] == close[i - 1] and df['Close'].iloc[i] == df['Close'].iloc[i]:
+                trade['growth'] *= 1 + held[i] * (close[i] / close[i - 1] - 1)
+            trade['highest'] = max(trade['highest'], high[i], close[i])
+            trade['lowest'] = min(trade['lowest'], low[i], close[i])
+    return trades
+
+
+class TestTradeLedger:
+    """Tests for trade_ledger."""
+
+    def test_matches_loop(self, bars, signals):
+        ledger = trade_ledger(bars, signals)
+        expected = reference(bars, signals)
+
+        assert list(ledger.columns) == list(LEDGER_COLUMNS)
+        assert len(ledger) == len(expected) > 100
+        assert ledger['entry_index'].tolist() == [t['entry_index'] for t in expected]
+        assert ledger['exit_index'].tolist() == [t['exit_index'] for t in expected]
+        assert ledger['position'].tolist() == [t['position'] for t in expected]
+        np.testing.assert_allclose(ledger['return'], [t['growth'] - 1 for t in expected], rtol=1e-12)
+
+        entry = np.array([bars['Close'].ffill().iloc[t['entry_index']] for t in expected])
+        long = ledger['side'].to_numpy() > 0
+        highest = np.array([t['highest'] for t in expected]) / entry - 1
+        lowest = np.array([t['lowest'] for t in expected]) / entry - 1
+        np.testing.assert_allclose(ledger['mfe'], np.maximum(np.where(long, highest, -lowest), 0))
+        np.testing.assert_allclose(ledger['mae'], np.minimum(np.where(long, lowest, -highest), 0))
+        assert (ledger['bars'] == ledger['exit_index'] - ledger['entry_index']).all()
+        assert ledger['entry_time'].tolist() == bars.index[ledger['entry_index']].tolist()
+
+    def test_returns_compound_to_the_equity_curve(self, bars, signals):
+        bars = bars.ffill()
+
+        ledger = trade_ledger(bars, signals)
+
+        curve = calculate_equity_curve(bars, signals)
+        assert np.prod(ledger['return'] + 1) == pytest.approx(curve[-1]['value'], abs=1e-4)
+
+    def test_trade_open_at_the_end(self):
+        df = pd.DataFrame({'Close': [10.0, 11, 12, 11, 13]}, index=pd.date_range('2024-01-01', periods=5))
+        signals = pd.Series([1, 1, 0, -1, -1], index=df.index)
+
+        ledger = trade_ledger(df, signals)
+
+        assert ledger[['entry_index', 'exit_index', 'side', 'bars']].values.tolist() == [[0, 2, 1, 2], [3, 4, -1, 1]]
+        assert ledger['open'].tolist() == [False, True]
+        np.testing.assert_allclose(ledger['return'], [0.2, -(13 / 11 - 1)])
+        # Without High/Low, excursions come from the closes
+        np.testing.assert_allclose(ledger['mfe'], [0.2, 0])
+        np.testing.assert_allclose(ledger['mae'], [0, -(13 / 11 - 1)])
+
+    def test_no_trades(self, bars):
+        ledger = trade_ledger(bars, pd.Series(0, index=bars.index))
+
+        assert list(ledger.columns) == list(LEDGER_COLUMNS)
+        assert len(ledger) == 0
+        assert trade_metrics(ledger)['num_trades'] == 0
+        assert trade_ledger(bars.iloc[:0], pd.Series(dtype=float)).empty
+
+
+class TestTradeMetrics:
+    """Tests for trade_metrics."""
+
+    def test_counts_trades_not_bars(self):
+        ledger = pd.DataFrame({
+            'side': [1, -1, 1, 1, -1],
+            'bars': [3, 1, 4, 2, 10],
+            'return': [0.02, -0.01, -0.03, 0.05, -0.01],
+            'costs': [0.001, 0.001, 0.002, 0.001, 0.001],
+            'mae': [-0.01, -0.02, -0.04, 0.0, -0.02],
+            'mfe': [0.03, 0.0, 0.01, 0.06, 0.01],
+        })
+
+        metrics = trade_metrics(ledger)
+
+        assert metrics['num_trades'] == 5
+        assert (metrics['num_long'], metrics['num_short']) == (3, 2)
+        assert metrics['win_rate'] == 40.0
+        assert metrics['avg_win'] == 3.5
+        assert metrics['avg_loss'] == round(-0.05 / 3 * 100, 4)
+        assert metrics['profit_factor'] == round(0.07 / 0.05, 2)
+        assert metrics['max_consecutive_losses'] == 2
+        assert metrics['avg_bars_held'] == 4.0
+        assert metrics['best_trade'] == 5.0 and metrics['worst_trade'] == -3.0
+        assert metrics['total_costs'] == 0.6
+
+    def test_only_winners(self):
+        ledger = pd.DataFrame({'side': [1], 'bars': [2], 'return': [0.1], 'costs': [0.0], 'mae': [0.0], 'mfe': [0.1]})
+
+        assert trade_metrics(ledger)['profit_factor'] == 'inf'
+
+
+class TestLedgerColumns:
+    """Tests for ledger_columns."""
+
+    def test_json_ready(self, bars, signals):
+        ledger = trade_ledger(bars, signals)
+
+        columns = ledger_columns(ledger)
+
+        assert list(columns) == list(LEDGER_COLUMNS)
+        assert all(len(values) == len(ledger) for values in columns.values())
+        assert columns['entry_time'][0] == ledger['entry_time'].iloc[0].strftime('%Y-%m-%d %H:%M')
+        json.dumps(columns)
+
+    def test_non_finite_values_become_none(self):
+        df = pd.DataFrame({'Close': [0.0, 0.0, 5.0, 6.0, 6.0]}, index=pd.date_range('2024-01-01', periods=5))
+        signals = pd.Series([1, 1, 0, 1, 0], index=df.index)
+        ledger = trade_ledger(df, signals)
+        assert not np.isfinite(ledger['mfe'].iloc[0])
+
+        columns = ledger_columns(ledger)
+
+        assert columns['mfe'][0] is None and columns['mae'][0] is None
+        assert columns['return'][1] == 0.0
+        json.dumps(columns, allow_nan=False)